@@ -1,8 +1,12 @@
-from curses.ascii import isdigit
+import os
 import sys
 import json
-import time
-from clients.centralized.http_client import HttpClient
+import threading
+from clients.sidecar.sidecar_client import get_client
+from clients.centralized.job_stream import JobStream
+from clients.centralized.job_watcher import TERMINAL_STATES
+from clients.centralized.sweep import SweepRunner, load_sweep
+from storage.local_store import get_store
 
 
 class ClientGUI:
@@ -14,17 +18,33 @@ class ClientGUI:
         self.jobs_id = []
         self.results = {}
         try:
-            self.client = HttpClient()
+            self.client = get_client()
         except Exception as e:
             print("Error al inicializar cliente: " + str(e))
             sys.exit(1)
+        self.store = get_store(self.client.cfg)
+        self.datasets_id = self.store.dataset_ids()
+        self.jobs_id = self.store.training_ids()
+        # progress events when the server streams them, polling otherwise
+        self.watcher = JobStream(self.client)
+        self.watcher.subscribe(self._on_status_change)
+        self.watcher.start()
+        # the menu shows without waiting for the stored statuses to refresh
+        threading.Thread(target=self._track_unfinished, daemon=True).start()
         self.run()
 
+    def _track_unfinished(self):
+        for id, status in self._unfinished_statuses().items():
+            self.watcher.track(id, status)
+
     def _show_menu(self):
         print("\n=== DistIA - Menú Principal ===")
         print("1. Subir dataset")
         print("2. Crear entrenamiento")
         print("3. Ver estado de un entrenamiento")
+        print("4. Lanzar barrido de entrenamientos")
+        print("5. Mejores modelos por dataset")
+        print("6. Ejecutar flujo de trabajo")
         # print("4. Listar entrenamientos")
         # print("5. Descargar modelo")
         # print("6. Actualizar lista de servidores")
@@ -43,7 +63,9 @@ class ClientGUI:
                     print("✅ Dataset subido correctamente:")
                     id = response.get("dataset_id")
                     print("Id del dataset: " + id)
-                    self.datasets_id.append(id)
+                    if id not in self.datasets_id:
+                        self.datasets_id.append(id)
+                    self.store.add_dataset(id, os.path.basename(file_path))
                 except Exception as e:
                     print("❌ Error:", e)
 
@@ -58,6 +80,11 @@ class ClientGUI:
                     id = response.get("training_id")
                     print("Id del entrenamiento: " + id)
                     self.jobs_id.append(id)
+                    self.store.add_trainings(
+                        {"id": id, "model": m, "task": task, "dataset_id": dataset_id}
+                        for m in models
+                    )
+                    self.watcher.track(id)
                 except Exception as e:
                     print("❌ Error:", e)
 
@@ -72,6 +99,63 @@ class ClientGUI:
                 except Exception as e:
                     print("❌ Error:", e)
 
+            # ============ Sweep ================
+            elif option == "4":
+                file_path = input("Ruta del archivo del barrido: ").strip()
+                try:
+                    specs = load_sweep(file_path)
+                    print(f"Enviando {len(specs)} entrenamientos...")
+                    results = SweepRunner(self.client, self.store).run(specs)
+                    ids = [r["training_id"] for r in results if r["training_id"]]
+                    self.jobs_id += [id for id in ids if id not in self.jobs_id]
+                    self.watcher.track_many(ids)
+                    print(f"✅ Entrenamientos creados: {len(ids)}")
+                    for r in results:
+                        if not r["training_id"]:
+                            print("❌ Error:", r["error"])
+                except Exception as e:
+                    print("❌ Error:", e)
+
+            # ========= Leaderboard =============
+            elif option == "5":
+                # pandas is only loaded when the leaderboard is asked for
+                from analytics.results_table import get_results_table
+
+                table = get_results_table(self.client.cfg, self.client.username)
+                metrics = table.metrics()
+                if not metrics:
+                    print("No hay resultados de entrenamientos terminados")
+                    continue
+                self._print_list_option(metrics)
+                index = input("Selecciona una metrica (0 por defecto): ").strip()
+                metric = (
+                    metrics[int(index)]
+                    if index.isdigit() and int(index) < len(metrics)
+                    else metrics[0]
+                )
+                print(table.leaderboard(metric).to_string(index=False))
+
+            # ========== Workflow ===============
+            elif option == "6":
+                from clients.centralized.workflow import WorkflowRunner, load_workflow
+
+                file_path = input("Ruta del archivo del flujo: ").strip()
+                try:
+                    workflow = load_workflow(file_path)
+                    results = WorkflowRunner(
+                        self.client, workflow, store=self.store
+                    ).run()
+                    self.datasets_id = self.store.dataset_ids()
+                    self.jobs_id = self.store.training_ids()
+                    failed = [r for r in results.values() if r["error"]]
+                    print(f"✅ Cadenas completas: {len(results) - len(failed)}")
+                    for r in failed:
+                        print(
+                            f"❌ Error en {r['error']['stage']}:", r["error"]["error"]
+                        )
+                except Exception as e:
+                    print("❌ Error:", e)
+
             # elif option == "4":
             #     try:
             # pass
@@ -95,6 +179,7 @@ class ClientGUI:
 
             elif option == "0":
                 print("👋 Saliendo...")
+                self.watcher.stop()
                 break
             else:
                 print("Opción no válida. Intenta de nuevo.")
@@ -116,10 +201,7 @@ class ClientGUI:
             print(row)
 
     def _insNumber(self, s: str) -> bool:
-        res = True
-        for c in s:
-            res = res and isdigit(c)
-        return res
+        return s.isascii() and s.isdigit()
 
     def _get_dataset_id(self):
         self._print_list_option(self.datasets_id)
@@ -182,19 +264,6 @@ class ClientGUI:
             if len(indexs) > 0:
                 return [models[ind] for ind in indexs]
 
-    def _update_models(self):
-        while True:
-            try:
-                response = self.client.get_models("regression")
-                self.regression_models = response.get("models", [])
-                response = self.client.get_models("classification")
-                self.classification_models = response.get("models", [])
-            except Exception as e:
-                pass
-            finally:
-                time.sleep(300)
-                # print("❌ Error al obtener modelos:", e)
-
     def _get_job_id(self):
         self._print_list_option(self.jobs_id)
         job_index = 0
@@ -236,6 +305,34 @@ class ClientGUI:
         for model in results.get("results", []):
             self._print_results_single_model(model)
 
+    def _unfinished_statuses(self):
+        # the events subscription lists every tracked id, the stored
+        # statuses are refreshed first so finished trainings stay out of it
+        statuses = {
+            id: status
+            for id, status in self.store.training_statuses().items()
+            if status not in TERMINAL_STATES
+        }
+        try:
+            responses = self.client.get_jobs_status(statuses)
+        except Exception as e:
+            print("Error consultando estados:", e)
+            return statuses
+        current = {
+            id: r["status"]
+            for id, r in responses.items()
+            if isinstance(r, dict) and r.get("status")
+        }
+        self.store.update_statuses(current)
+        statuses.update(current)
+        return {id: s for id, s in statuses.items() if s not in TERMINAL_STATES}
+
+    def _on_status_change(self, job_id, old_status, new_status):
+        self.store.update_statuses({job_id: new_status})
+        id = job_id if len(job_id) <= 10 else job_id[0:10] + "..."
+        print("\n🔔 Entrenamiento " + id)
+        self._print_status(new_status)
+
     def _print_status(self, status):
         s = ""
         if status == "completed":
@@ -1,21 +1,32 @@
 import streamlit as st
-import pandas as pd
-import time, sys
+import os, pathlib, shutil, tempfile
 
-from clients.centralized.http_client import HttpClient
+from clients.sidecar.sidecar_client import get_client
+from clients.centralized.job_watcher import JobWatcher, TERMINAL_STATES
+from clients.centralized.job_stream import JobStream
+from storage.local_store import get_store
+from GUI.streamlit.tasks import BackgroundTasks, Task
 
 
 class ST_App:
     def __init__(self):
         try:
-            self.client = HttpClient()
+            # one client per browser session, a proxy to the local daemon
+            # when it runs. Otherwise it finds the server and gets its token
+            # in background while the page renders
+            if "client" not in st.session_state:
+                st.session_state.client = get_client()
+            self.client = st.session_state.client
         except Exception as e:
             st.error(f"Error al inicializar cliente: {e}")
 
         self.tasks = self.client.cfg.get("tasks", ["classification", "regression"])
-        self.datasets_path: str = self.client.cfg.get("datasets_data_path")
-        self.trainings_path: str = self.client.cfg.get("trainings_data_path")
         self.results_path: str = self.client.cfg.get("results_data_path")
+        self.store = get_store(self.client.cfg)
+        ui = self.client.cfg.get("ui", {})
+        self.ui_workers = ui.get("workers", 4)
+        self.refresh_interval = ui.get("refresh_interval", 1.0)
+        self.models_max_age = ui.get("models_max_age", 300)
 
         self.init_app()
 
@@ -27,6 +38,8 @@ class ST_App:
             initial_sidebar_state=self.client.cfg.get("SIDEBAR", "expanded"),
         )
         st.title(self.client.cfg.get("TITTLE", "AI Training Platform"))
+        if self.client.wait_ready(timeout=0) and self.client.start_error:
+            st.error(f"Error al inicializar cliente: {self.client.start_error}")
         self.show_content_app()
 
     def show_content_app(self):
@@ -42,148 +55,387 @@ class ST_App:
         with Predicts_page:
             self.show_predicts_page()
 
+    # ========= Background work =========
+
+    def get_background(self) -> BackgroundTasks:
+        # one pool per browser session, network calls never run in the script
+        if "background" not in st.session_state:
+            st.session_state.background = BackgroundTasks(self.ui_workers)
+        return st.session_state.background
+
+    def fetch(self, key: str, label: str, fn, *args, max_age: float = None):
+        """Result of fn(*args) computed in background, None while it runs.
+        Failed results and results older than max_age are fetched again"""
+        background = self.get_background()
+        task = background.get(key)
+        if (
+            task is None
+            or (task.done() and task.error() is not None)
+            or (task.done() and max_age is not None and task.age() > max_age)
+        ):
+            task = background.submit(key, label, lambda _, *a: fn(*a), *args)
+        return task.result() if task.done() and task.error() is None else None
+
+    def show_task(self, key: str, on_done=None):
+        """Progress of a background task. The fragment refreshes itself until
+        the task finishes, then reruns the page once to show the new data"""
+        task = self.get_background().get(key)
+        if task is None:
+            return
+        running = not task.done()
+        run_every = self.refresh_interval if running else None
+        st.fragment(self._task_fragment, run_every=run_every)(key, on_done, running)
+
+    def _task_fragment(self, key: str, on_done, running: bool):
+        task = self.get_background().get(key)
+        if task is None:
+            return
+        if not task.done():
+            text = f"{task.message or task.label} ({task.elapsed():.0f}s)"
+            if task.progress is None:
+                st.info(f"⏳ {text}")
+            else:
+                st.progress(task.progress, text=text)
+            return
+        if running:
+            st.rerun()
+        if task.error() is not None:
+            st.error(f"{task.label} failed: {task.error()}")
+        elif on_done is not None:
+            on_done(task.result())
+
+    def show_live(self, render, *keys: str):
+        """Renders `render` in a fragment that refreshes while any of the
+        tasks in `keys` runs, so partial results show up as they arrive"""
+        running = self.get_background().running(*keys)
+        run_every = self.refresh_interval if running else None
+        st.fragment(render, run_every=run_every)()
+
+    # ========= Datasets =========
+
     def show_datasets_page(self):
         st.header("Uploaded Datasets")
-        self.show_table(self.datasets_path)
+        self.show_live(lambda: self.show_table(self.store.datasets()), "upload")
         with st.expander("Upload New Dataset", expanded=False):
             uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
+            if uploaded_file is not None:
+                self.show_preview(uploaded_file)
             dataset_name = st.text_input("Dataset Name", value="My Dataset")
+            columns = None
+            optimize = st.checkbox(
+                "Optimize before upload",
+                value=self.client.cfg.get("preprocess", {}).get("enabled", False),
+                help="Drops unused columns, downcasts types and sends a "
+                "compact columnar file",
+            )
+            if optimize and uploaded_file is not None:
+                import pandas as pd
+
+                header = list(pd.read_csv(uploaded_file, nrows=0).columns)
+                uploaded_file.seek(0)
+                columns = st.multiselect("Columns to upload", header, default=header)
             if (
                 st.button("Upload Dataset")
                 and uploaded_file is not None
                 and dataset_name != ""
             ):
-                with st.spinner("Uploading dataset..."):
-                    try:
-                        temp_path = f"data/tmp/{uploaded_file.name}"
-                        with open(temp_path, "wb") as f:
-                            f.write(uploaded_file.getvalue())
-                            f.close()
-                        response = self.client.upload_dataset(temp_path)
-                        id = response.get("dataset_id")
-                        self.add_row(self.datasets_path, f"\n{id},{dataset_name}")
-                        st.success(f"Dataset uploaded successfully! ID: {id}")
-                    except Exception as e:
-                        st.error(f"Error uploading dataset: {e}")
-                    finally:
-                        st.rerun()
+                # every script run gets a new UploadedFile over the same bytes,
+                # so the worker can read this one without a copy
+                self.get_background().submit(
+                    "upload",
+                    f"Uploading {uploaded_file.name}",
+                    self._upload_dataset,
+                    uploaded_file,
+                    dataset_name,
+                    columns or None,
+                    optimize,
+                )
+            self.show_task("upload", self._show_uploaded)
+
+    def show_preview(self, uploaded_file):
+        # only the previewed rows are parsed, the profile is one streaming
+        # pass in background
+        from analytics.dataset_profile import preview, profile_config
+
+        opts = profile_config(self.client.cfg)
+        frames = preview(
+            uploaded_file,
+            opts["preview_rows"],
+            opts["seed"],
+            opts["exact_sample_bytes"],
+        )
+        tabs = st.tabs(["Head", "Tail", "Sample"])
+        for tab, frame in zip(tabs, frames.values()):
+            with tab:
+                st.dataframe(frame, hide_index=True)
+        if st.button("Profile columns"):
+            self.get_background().submit(
+                "profile",
+                f"Profiling {uploaded_file.name}",
+                self._profile_dataset,
+                uploaded_file,
+            )
+        self.show_task("profile", self._show_profile)
+
+    def _profile_dataset(self, task: Task, data):
+        from analytics.dataset_profile import profile_csv
+
+        return profile_csv(
+            data, self.client.cfg, lambda p: task.report(p, "Profiling columns")
+        )
+
+    def _show_profile(self, profile: dict):
+        from analytics.dataset_profile import profile_table
+
+        st.caption(f"{profile['rows']} rows, {len(profile['columns'])} columns")
+        st.dataframe(profile_table(profile), hide_index=True)
+
+    def _upload_dataset(self, task: Task, data, dataset_name, columns, optimize):
+        response = self.client.upload_dataset_stream(
+            data, data.name, columns=columns, preprocess=optimize
+        )
+        self.store.add_dataset(response.get("dataset_id"), dataset_name)
+        return response
+
+    def _show_uploaded(self, response: dict):
+        id = response.get("dataset_id")
+        if response.get("deduplicated"):
+            st.success(f"Dataset already uploaded! ID: {id}")
+        else:
+            st.success(f"Dataset uploaded successfully! ID: {id}")
+
+    # ========= Trainings =========
 
     def show_trainings_page(self):
         st.header("Trainings:")
-        self.show_table(self.trainings_path)
+        self.show_live(
+            lambda: self.show_table(self.store.trainings()), "refresh", "create_job"
+        )
         with st.expander("Create New Training", expanded=False) as pannel:
             col1, col2 = st.columns(2)
             with col1:
-                dataset_id = st.selectbox(
-                    "Dataset Id", self.get_ids(self.datasets_path)
-                )
+                dataset_id = st.selectbox("Dataset Id", self.store.dataset_ids())
                 task = st.selectbox("Task Type", self.tasks)
             with col2:
-                try:
-                    models_response = self.client.get_models(task)
-                    available_models = models_response.get("models", [])
-                    selected_models = st.multiselect(
-                        "Select Models",
-                        available_models,
-                        default=available_models[:2] if available_models else [],
-                    )
-                except Exception as e:
-                    st.error(f"Error loading models: {e}")
-                    selected_models = []
+                models_key = f"models:{task}"
+                models_response = self.fetch(
+                    models_key,
+                    f"Loading {task} models",
+                    self.client.get_models,
+                    task,
+                    max_age=self.models_max_age,
+                )
+                available_models = (models_response or {}).get("models", [])
+                selected_models = st.multiselect(
+                    "Select Models",
+                    available_models,
+                    default=available_models[:2] if available_models else [],
+                    disabled=models_response is None,
+                )
+                if models_response is None:
+                    self.show_task(models_key)
             if st.button("Start Training") and dataset_id and selected_models and task:
-                with st.spinner("Creating training job..."):
-                    try:
-                        response = self.client.create_job(
-                            dataset_id=dataset_id,
-                            task=task,
-                            models=selected_models,
-                        )
-                        id = response.get("training_id")
-                        st.success(f"Training job created! Job ID: {id}")
-                        row = ""
-                        status = self.client.get_job_status(id).get("status", "unknown")
-                        for model in selected_models:
-                            row += f"\n{id},{task},{model},{status}"
-                        self.add_row(self.trainings_path, row)
-                    except Exception as e:
-                        st.error(f"Error creating training job: {e}")
-                    finally:
-                        st.rerun()
+                self.get_background().submit(
+                    "create_job",
+                    "Creating training job",
+                    self._create_training,
+                    dataset_id,
+                    task,
+                    selected_models,
+                )
+            self.show_task(
+                "create_job",
+                lambda id: st.success(f"Training job created! Job ID: {id}"),
+            )
         if st.button("Refresh Status"):
-            try:
-                status = {}
-                for id in self.get_ids(self.trainings_path):
-                    response = self.client.get_job_status(id)["status"]
-                    status[id] = response
-                df = pd.DataFrame(pd.read_csv(self.trainings_path))
-                df["status"] = df["id"].map(status)
-                df.to_csv(self.trainings_path, index=False)
-            except Exception as e:
-                st.error(f"Error updating Status: {e}")
-            finally:
-                st.rerun()
+            self.get_background().submit(
+                "refresh",
+                "Refreshing status",
+                self._refresh_statuses,
+                self.get_watcher(),
+            )
+        self.show_task("refresh")
+
+    def _create_training(self, task: Task, dataset_id, training_task, models):
+        response = self.client.create_job(
+            dataset_id=dataset_id,
+            task=training_task,
+            models=models,
+        )
+        id = response.get("training_id")
+        status = self.client.get_job_status(id).get("status", "unknown")
+        self.store.add_trainings(
+            {
+                "id": id,
+                "model": model,
+                "task": training_task,
+                "status": status,
+                "dataset_id": dataset_id,
+            }
+            for model in models
+        )
+        return id
+
+    def _refresh_statuses(self, task: Task, watcher: JobWatcher):
+        statuses = self.store.training_statuses()
+        for id, status in statuses.items():
+            watcher.track(id, status)
+        task.report(message=f"Checking {len(watcher.pending())} trainings")
+        # the watcher's subscriber saves every batch as it arrives
+        watcher.poll(force=True)
+        self.store.update_statuses({id: s for id, s in watcher.statuses().items() if s})
+
+    def get_watcher(self) -> JobWatcher:
+        # one watcher per browser session, it remembers which jobs are done
+        if "job_watcher" not in st.session_state:
+            watcher = JobWatcher(self.client)
+            store = self.store
+            watcher.subscribe(lambda id, old, new: store.update_statuses({id: new}))
+            st.session_state.job_watcher = watcher
+        return st.session_state.job_watcher
+
+    # ========= Results =========
 
     def show_results_page(self):
         st.header("Training Results")
 
-        id = st.selectbox("Training Id", self.get_ids(self.trainings_path))
+        id = st.selectbox("Training Id", self.store.training_ids())
+        if id:
+            self.show_progress(id)
 
         if id and st.button("Get Results"):
-            with st.spinner("Fetching results..."):
-                try:
-                    status_response = self.client.get_job_status(id)
-                    status = status_response.get("status")
-
-                    if status == "completed":
-
-                        results: dict = self.client.get_results(id)
-
-                        if results:
-
-                            with st.container(border=True):
-                                st.subheader("Train Results:")
-
-                                col1, col2 = st.columns(2)
-
-                                with col1:
-                                    st.write(
-                                        f"**Created at :**  {results.get("created_at", "None")}"
-                                    )
-                                    st.write(
-                                        f"**Started at :**  {results.get("started_at", "None")}"
-                                    )
-                                    st.write(
-                                        f"**Completed at :**  {results.get("completed_at", "None")}"
-                                    )
-                                with col2:
-                                    st.write(
-                                        f"**Train Type :**  {results.get("train_type", "None")}"
-                                    )
-                                    st.write(
-                                        f"**Status :**  {results.get("status", "None")}"
-                                    )
-                                    st.write(
-                                        f"**Error :**  {results.get("error", "None")}"
-                                    )
-
-                                for model in results.get("results", []):
-                                    with st.expander(
-                                        f"Model: {model.get("model_name")}"
-                                    ):
-                                        metrics = (
-                                            model.get("metrics", {})
-                                            if isinstance(model, dict)
-                                            else {}
-                                        )
-                                        st.dataframe(metrics)
-
-                    elif status == "failed":
-                        st.error("Train failed. Please check the server logs.")
-                    else:
-                        st.info(f"Train is still running, Please wait ⏳")
-
-                except Exception as e:
-                    st.error(f"⛔ Error fetching results: {e}")
+            self.get_background().submit(
+                f"results:{id}", "Fetching results", self._fetch_results, id
+            )
+        if id:
+            self.show_task(f"results:{id}", self._show_results)
+
+        self.show_leaderboard()
+
+    def get_stream(self) -> JobStream:
+        # one event stream per browser session for the trainings shown live
+        if "job_stream" not in st.session_state:
+            stream = JobStream(self.client)
+            store = self.store
+            stream.subscribe(lambda id, old, new: store.update_statuses({id: new}))
+            st.session_state.job_stream = stream.start()
+        return st.session_state.job_stream
+
+    def show_progress(self, id: str):
+        """Live status, per model progress and intermediate metrics of a
+        training, refreshed while it runs"""
+        stream = self.get_stream()
+        stream.track(id, self.store.training_statuses().get(id))
+        running = stream.statuses().get(id) not in TERMINAL_STATES
+        run_every = self.refresh_interval if running else None
+        st.fragment(self._progress_fragment, run_every=run_every)(id, running)
+
+    def _progress_fragment(self, id: str, running: bool):
+        stream = self.get_stream()
+        status = stream.statuses().get(id)
+        if running and status in TERMINAL_STATES:
+            # rerun the page once so the fragment stops refreshing
+            st.rerun()
+        event = stream.latest(id)
+        if event is None:
+            if status not in TERMINAL_STATES:
+                st.info(f"Waiting for updates, status: {status or 'unknown'}")
+            return
+        progress = event.get("progress")
+        text = f"Status: {status}"
+        if progress is None:
+            st.info(text)
+        else:
+            st.progress(float(progress), text=f"{text} ({progress:.0%})")
+        models = event.get("models") or []
+        if models:
+            self.show_table(
+                [
+                    {
+                        "model": model.get("model_name"),
+                        "status": model.get("status"),
+                        "progress": model.get("progress"),
+                        **(model.get("metrics") or {}),
+                    }
+                    for model in models
+                ]
+            )
+
+    def show_leaderboard(self):
+        st.subheader("Leaderboard")
+        # pandas is only loaded once the page needs it
+        from analytics.results_table import get_results_table
+
+        # every finished result fetched so far, no request to the server
+        table = get_results_table(self.client.cfg, self.client.username)
+        metrics = table.metrics()
+        if not metrics:
+            st.info("Metrics of finished trainings show up here once fetched")
+            return
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            metric = st.selectbox("Metric", metrics)
+        with col2:
+            by = st.selectbox("Best per", ["dataset_id", "task", "model"])
+        with col3:
+            top = st.number_input("Top", min_value=1, max_value=100, value=1)
+        self.show_table(table.leaderboard(metric, by=by, top=int(top)))
+
+    def _fetch_results(self, task: Task, id: str):
+        status = self.client.get_job_status(id).get("status")
+        if status != "completed":
+            return status, None
+        task.report(message="Fetching metrics")
+        return status, self.client.get_results(id)
+
+    def _show_results(self, response):
+        import pandas as pd
+
+        status, results = response
+        if status == "completed":
+
+            if results:
+
+                with st.container(border=True):
+                    st.subheader("Train Results:")
+
+                    col1, col2 = st.columns(2)
+
+                    with col1:
+                        st.write(
+                            f"**Created at :**  {results.get('created_at', 'None')}"
+                        )
+                        st.write(
+                            f"**Started at :**  {results.get('started_at', 'None')}"
+                        )
+                        st.write(
+                            f"**Completed at :**  {results.get('completed_at', 'None')}"
+                        )
+                    with col2:
+                        st.write(
+                            f"**Train Type :**  {results.get('train_type', 'None')}"
+                        )
+                        st.write(f"**Status :**  {results.get('status', 'None')}")
+                        st.write(f"**Error :**  {results.get('error', 'None')}")
+
+                    # one row per model, one column per metric
+                    st.dataframe(
+                        pd.DataFrame.from_dict(
+                            {
+                                model.get("model_name"): model.get("metrics") or {}
+                                for model in results.get("results", [])
+                                if isinstance(model, dict)
+                            },
+                            orient="index",
+                        )
+                    )
+
+        elif status == "failed":
+            st.error("Train failed. Please check the server logs.")
+        else:
+            st.info("Train is still running, progress is shown above ⏳")
+
+    # ========= Predictions =========
 
     def show_predicts_page(self):
         st.header("Make Predictions")
@@ -191,9 +443,8 @@ class ST_App:
         col1, col2 = st.columns(2)
 
         with col1:
-            id = st.selectbox("Train ID for Model", self.get_ids(self.trainings_path))
-            df = pd.read_csv(self.trainings_path)
-            model_name = st.selectbox("Model Name", df[df["id"] == id]["model"])
+            id = st.selectbox("Train ID for Model", self.store.training_ids())
+            model_name = st.selectbox("Model Name", self.store.training_models(id))
 
         with col2:
             uploaded_pred_file = st.file_uploader(
@@ -206,37 +457,62 @@ class ST_App:
             and model_name
             and uploaded_pred_file
         ):
-            with st.spinner("Generating predictions..."):
-                try:
-                    temp_path = f"/tmp/pred_{uploaded_pred_file.name}"
-                    with open(temp_path, "wb") as f:
-                        f.write(uploaded_pred_file.getvalue())
-
-                    predictions = self.client.predict(id, model_name, temp_path)
-
-                    st.subheader("Prediction Results")
-                    if isinstance(predictions, dict):
-                        for key, value in predictions.items():
-                            st.write(f"**{key}:** {value}")
-                    else:
-                        st.write(predictions)
-
-                    if st.button("Download Predictions"):
-                        # FALTA
-                        pass
-
-                except Exception as e:
-                    st.error(f"Error generating predictions: {e}")
-
-    def show_table(self, path):
-        data = pd.read_csv(path)
-        df = pd.DataFrame(data)
-        st.dataframe(df)
-
-    def add_row(self, path, row: str):
-        with open(path, "a") as f2:
-            f2.write(f"\n{row}")
-            f2.close()
-
-    def get_ids(self, path):
-        return pd.DataFrame(pd.read_csv(path))["id"].unique()
+            self.get_background().submit(
+                "predict",
+                "Generating predictions",
+                self._predict,
+                id,
+                model_name,
+                uploaded_pred_file,
+            )
+        self.show_task("predict", self._show_predictions)
+
+    def _predict(self, task: Task, id, model_name, uploaded_file):
+        # one file per prediction, sessions uploading files with the same
+        # name don't overwrite each other
+        fd, temp_path = tempfile.mkstemp(
+            prefix="pred_", suffix=f"_{uploaded_file.name}"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                uploaded_file.seek(0)
+                shutil.copyfileobj(uploaded_file, f)
+            return self.client.predict(id, model_name, temp_path)
+        finally:
+            os.remove(temp_path)
+
+    def _show_predictions(self, predictions):
+        st.subheader("Prediction Results")
+        if isinstance(predictions, dict):
+            for key, value in predictions.items():
+                st.write(f"**{key}:** {value}")
+            if predictions.get("output_path"):
+                st.dataframe(self._preview(predictions["output_path"]))
+        else:
+            st.write(predictions)
+
+        output_path = (
+            predictions.get("output_path") if isinstance(predictions, dict) else None
+        )
+        if output_path:
+            # read when the button is clicked, not kept in memory by every
+            # rerun of the page
+            st.download_button(
+                "Download Predictions",
+                data=lambda: pathlib.Path(output_path).read_bytes(),
+                file_name=os.path.basename(output_path),
+            )
+
+    def _preview(self, path: str, rows: int = 100):
+        import pandas as pd
+
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            batches = pq.ParquetFile(path).iter_batches(batch_size=rows)
+            batch = next(batches, None)
+            return batch.to_pandas() if batch is not None else pd.DataFrame()
+        return pd.read_csv(path, nrows=rows)
+
+    def show_table(self, rows: list):
+        st.dataframe(rows)
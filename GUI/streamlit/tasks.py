@@ -0,0 +1,82 @@
+import threading, time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Callable, Optional
+
+
+class Task:
+    """A call running in a BackgroundTasks pool.
+
+    The function gets the task as its first argument and may call
+    `report` to publish progress while it runs.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.progress: Optional[float] = None
+        self.message = ""
+        self.future: Optional[Future] = None
+
+    def report(self, progress: Optional[float] = None, message: str = ""):
+        self.progress = progress
+        self.message = message
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def age(self) -> float:
+        """Seconds since the task finished"""
+        return time.monotonic() - self.finished if self.finished else 0.0
+
+    def error(self) -> Optional[BaseException]:
+        return self.future.exception() if self.done() else None
+
+    def result(self) -> Any:
+        return self.future.result() if self.done() else None
+
+
+class BackgroundTasks:
+    """Network and disk work of one browser session, run off the script
+    thread so a slow server never blocks a rerun.
+
+    Tasks are kept by key until they are replaced. Submitting a key that
+    is still running returns the running task.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._tasks: Dict[str, Task] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, label: str, fn: Callable, *args, **kwargs) -> Task:
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is not None and not task.done():
+                return task
+            task = Task(label)
+            self._tasks[key] = task
+        task.future = self._pool.submit(fn, task, *args, **kwargs)
+        task.future.add_done_callback(
+            lambda _: setattr(task, "finished", time.monotonic())
+        )
+        return task
+
+    def get(self, key: str) -> Optional[Task]:
+        with self._lock:
+            return self._tasks.get(key)
+
+    def running(self, *keys: str) -> bool:
+        with self._lock:
+            tasks = [self._tasks.get(key) for key in keys]
+        return any(task is not None and not task.done() for task in tasks)
+
+    def pop(self, key: str) -> Optional[Task]:
+        with self._lock:
+            return self._tasks.pop(key, None)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,498 @@
+import argparse, hashlib, io, json, math, os, threading
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from typing import Dict, Any, BinaryIO, Callable, Iterator, List, Optional, Union
+
+from clients.centralized.dataset_cache import (
+    DatasetCache,
+    HASH_BLOCK_SIZE,
+    dataset_cache_config,
+    stream_digest,
+)
+
+DEFAULT_PROFILE_CONFIG: Dict[str, Any] = {
+    "cache_dir": "data/cache/profiles",
+    "chunk_rows": 100_000,
+    # values per numeric column kept for the quantiles
+    "sample_size": 10_000,
+    # 2**precision registers per column, ~1.04 / sqrt(2**precision) error
+    "hll_precision": 12,
+    "quantiles": [0.05, 0.25, 0.5, 0.75, 0.95],
+    "preview_rows": 20,
+    # smaller files are sampled exactly instead of by seeking
+    "exact_sample_bytes": 8 * 1024 * 1024,
+    "seed": 42,
+}
+
+Source = Union[str, BinaryIO]
+# progress(fraction of the file read)
+Progress = Callable[[float], None]
+
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def profile_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_PROFILE_CONFIG, **cfg.get("dataset_profile", {})}
+
+
+@contextmanager
+def _binary(source: Source) -> Iterator[BinaryIO]:
+    """Binary file of a path or stream, streams are rewound after use"""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        source.seek(0)
+        try:
+            yield source
+        finally:
+            source.seek(0)
+
+
+def _size(f: BinaryIO) -> int:
+    position = f.tell()
+    size = f.seek(0, os.SEEK_END)
+    f.seek(position)
+    return size
+
+
+def _parse(header: bytes, lines: List[bytes]) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(header + b"".join(lines)))
+
+
+def _line(line: bytes) -> bytes:
+    return line if line.endswith(b"\n") else line + b"\n"
+
+
+# ========= Previews =========
+
+
+def head(source: Source, rows: int = 20) -> pd.DataFrame:
+    with _binary(source) as f:
+        return pd.read_csv(f, nrows=rows)
+
+
+def tail(source: Source, rows: int = 20) -> pd.DataFrame:
+    """Last rows, read backwards from the end of the file in blocks.
+    Rows are lines here, a quoted field spanning lines can be cut"""
+    with _binary(source) as f:
+        header = _line(f.readline())
+        start = f.tell()
+        end = _size(f)
+        data = b""
+        position = end
+        while position > start and data.count(b"\n") <= rows:
+            step = min(TAIL_BLOCK_SIZE, position - start)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+        lines = data.splitlines(keepends=True)
+        if position > start:
+            # the first line read is only the end of a row
+            lines = lines[1:]
+        return _parse(header, [_line(line) for line in lines[-rows:]])
+
+
+def sample(
+    source: Source,
+    rows: int = 20,
+    seed: int = 42,
+    exact_bytes: int = DEFAULT_PROFILE_CONFIG["exact_sample_bytes"],
+) -> pd.DataFrame:
+    """Random rows. Large files are sampled by seeking to random offsets
+    and taking the row that starts after each one, so only the sampled
+    rows are read. Rows right after long rows are a bit more likely, and a
+    quoted field spanning lines can be cut"""
+    with _binary(source) as f:
+        if _size(f) <= exact_bytes:
+            frame = pd.read_csv(f)
+            return frame.sample(min(rows, len(frame)), random_state=seed).sort_index()
+        header = _line(f.readline())
+        start, end = f.tell(), _size(f)
+        rng = np.random.default_rng(seed)
+        picked: Dict[int, bytes] = {}
+        # a few extra draws make up for offsets landing on the same row
+        for offset in np.sort(rng.integers(start, end, rows * 2)):
+            f.seek(offset - 1)
+            f.readline()
+            position = f.tell()
+            line = f.readline()
+            if line and position not in picked:
+                picked[position] = _line(line)
+        positions = sorted(picked)
+        keep = sorted(rng.choice(len(positions), min(rows, len(positions)), False))
+        return _parse(header, [picked[positions[i]] for i in keep])
+
+
+def preview(
+    source: Source,
+    rows: int = 20,
+    seed: int = 42,
+    exact_bytes: int = DEFAULT_PROFILE_CONFIG["exact_sample_bytes"],
+) -> Dict[str, pd.DataFrame]:
+    return {
+        "head": head(source, rows),
+        "tail": tail(source, rows),
+        "sample": sample(source, rows, seed, exact_bytes),
+    }
+
+
+# ========= Profiles =========
+
+
+class HyperLogLog:
+    """Distinct count estimate of 64 bit hashes in 2**precision registers"""
+
+    def __init__(self, precision: int = 12, registers: np.ndarray = None):
+        self.precision = precision
+        self.registers = (
+            registers
+            if registers is not None
+            else np.zeros(1 << precision, dtype=np.uint8)
+        )
+
+    def add(self, hashes: np.ndarray):
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # frexp's exponent is the bit length, 0 for 0
+        bits = np.frexp(rest.astype(np.float64))[1]
+        rank = (64 - p + 1 - bits).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m
+        estimate /= np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # few values, linear counting is more accurate
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+def _kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "int"
+    if pd.api.types.is_float_dtype(series):
+        return "float"
+    return "string"
+
+
+def _merge_kinds(old: Optional[str], new: str) -> str:
+    if old is None or old == new:
+        return new
+    if {old, new} == {"int", "float"}:
+        return "float"
+    return "string"
+
+
+class ColumnProfile:
+    def __init__(self, name: str, precision: int):
+        self.name = name
+        self.kind: Optional[str] = None
+        self.count = 0
+        self.nulls = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.hll = HyperLogLog(precision)
+        # bottom-k sample: the values with the smallest random priorities
+        self.values = np.empty(0, dtype=np.float64)
+        self.priorities = np.empty(0, dtype=np.float64)
+
+    def update(self, series: pd.Series, rng: np.random.Generator, sample_size: int):
+        present = series.dropna()
+        self.nulls += len(series) - len(present)
+        self.count += len(present)
+        if present.empty:
+            return
+        self.kind = _merge_kinds(self.kind, _kind(present))
+        if self.kind in ("int", "float"):
+            values = present.to_numpy(dtype=np.float64)
+            # hashed as floats so 5 and 5.0 are the same value
+            self.hll.add(pd.util.hash_array(values))
+            low, high = float(values.min()), float(values.max())
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+            self._sample(values, rng, sample_size)
+        else:
+            self.hll.add(pd.util.hash_array(present.to_numpy(object)))
+            self.min = self.max = None
+            self.values = self.values[:0]
+            self.priorities = self.priorities[:0]
+
+    def _sample(self, values: np.ndarray, rng: np.random.Generator, size: int):
+        values = np.concatenate([self.values, values])
+        priorities = np.concatenate(
+            [self.priorities, rng.random(len(values) - len(self.values))]
+        )
+        if len(values) > size:
+            keep = np.argpartition(priorities, size)[:size]
+            values, priorities = values[keep], priorities[keep]
+        self.values, self.priorities = values, priorities
+
+    def result(self, quantiles: List[float]) -> Dict[str, Any]:
+        profile = {
+            "name": self.name,
+            "dtype": self.kind or "empty",
+            "count": self.count,
+            "nulls": self.nulls,
+            "min": self.min,
+            "max": self.max,
+            "distinct": min(self.hll.count(), self.count),
+        }
+        if len(self.values):
+            points = np.quantile(self.values, quantiles)
+            profile["quantiles"] = {str(q): float(v) for q, v in zip(quantiles, points)}
+        return profile
+
+
+class Profiler:
+    """Per column profiles of a CSV read in chunks: dtype, nulls, min and
+    max, distinct count (HyperLogLog) and quantiles from a bounded sample.
+
+    Memory depends on the chunk size and the number of columns, not on the
+    file. The state can be saved and loaded to carry on with rows appended
+    to the file later.
+    """
+
+    def __init__(self, precision: int = 12, sample_size: int = 10_000, seed: int = 42):
+        self.precision = precision
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.rows = 0
+        self.columns: Dict[str, ColumnProfile] = {}
+
+    def update(self, frame: pd.DataFrame):
+        self.rows += len(frame)
+        for name in frame.columns:
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = ColumnProfile(name, self.precision)
+            column.update(frame[name], self.rng, self.sample_size)
+
+    def result(self, quantiles: List[float]) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "columns": [column.result(quantiles) for column in self.columns.values()],
+        }
+
+    def state(self) -> Dict[str, np.ndarray]:
+        arrays = {}
+        meta = {"rows": self.rows, "columns": []}
+        for i, column in enumerate(self.columns.values()):
+            meta["columns"].append(
+                {
+                    key: getattr(column, key)
+                    for key in ("name", "kind", "count", "nulls", "min", "max")
+                }
+            )
+            arrays[f"registers_{i}"] = column.hll.registers
+            arrays[f"values_{i}"] = column.values
+            arrays[f"priorities_{i}"] = column.priorities
+        arrays["meta"] = np.array(json.dumps(meta))
+        arrays["rng"] = np.array(json.dumps(self.rng.bit_generator.state))
+        return arrays
+
+    def load(self, arrays: Dict[str, np.ndarray]):
+        meta = json.loads(str(arrays["meta"]))
+        self.rng.bit_generator.state = json.loads(str(arrays["rng"]))
+        self.rows = meta["rows"]
+        self.columns = {}
+        for i, saved in enumerate(meta["columns"]):
+            column = ColumnProfile(saved["name"], self.precision)
+            for key, value in saved.items():
+                setattr(column, key, value)
+            column.hll = HyperLogLog(self.precision, arrays[f"registers_{i}"].copy())
+            column.values = arrays[f"values_{i}"]
+            column.priorities = arrays[f"priorities_{i}"]
+            self.columns[column.name] = column
+
+
+class ProfileCache:
+    """Profiles by sha256 of the file content in `directory`.
+
+    Next to each profile (<sha256>.json) the profiler state (<sha256>.npz)
+    is kept, and paths.json remembers the last profile of every path, so a
+    file that only had rows appended is profiled from where it ended.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(f"{digest}.json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def state(self, digest: str) -> Optional[Dict[str, np.ndarray]]:
+        try:
+            with np.load(self._path(f"{digest}.npz")) as data:
+                return dict(data)
+        except (OSError, ValueError):
+            return None
+
+    def previous(self, path: str) -> Optional[Dict[str, Any]]:
+        digest = self._paths().get(os.path.abspath(path))
+        return self.get(digest) if digest else None
+
+    def _paths(self) -> Dict[str, str]:
+        try:
+            with open(self._path("paths.json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, name: str, write: Callable[[BinaryIO], None]):
+        tmp = self._path(f"{name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, self._path(name))
+
+    def put(self, profile: Dict[str, Any], profiler: Profiler, path: str = None):
+        digest = profile["sha256"]
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(f"{digest}.npz", lambda f: np.savez(f, **profiler.state()))
+            self._write(
+                f"{digest}.json", lambda f: f.write(json.dumps(profile).encode())
+            )
+            if path is not None:
+                paths = self._paths()
+                paths[os.path.abspath(path)] = digest
+                self._write("paths.json", lambda f: f.write(json.dumps(paths).encode()))
+
+
+def _digest(source: Source, cfg: Dict[str, Any]) -> str:
+    if not isinstance(source, str):
+        with _binary(source) as f:
+            return stream_digest(f)
+    cache_cfg = dataset_cache_config(cfg)
+    if cache_cfg["enabled"]:
+        # remembered by size and mtime, an unchanged file isn't hashed again
+        return DatasetCache(cache_cfg["path"]).digest(source)
+    with open(source, "rb") as f:
+        return stream_digest(f)
+
+
+def _prefix_digest(path: str, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while size > 0:
+            block = f.read(min(HASH_BLOCK_SIZE, size))
+            if not block:
+                break
+            digest.update(block)
+            size -= len(block)
+    return digest.hexdigest()
+
+
+def profile_csv(
+    source: Source, cfg: Dict[str, Any] = None, progress: Progress = None
+) -> Dict[str, Any]:
+    """Profile of a CSV in one streaming pass, cached by content hash.
+    A file that grew since its last profile only has the new rows read"""
+    cfg = cfg or {}
+    opts = profile_config(cfg)
+    cache = ProfileCache(opts["cache_dir"])
+    digest = _digest(source, cfg)
+    cached = cache.get(digest)
+    if cached is not None:
+        return cached
+
+    profiler = Profiler(opts["hll_precision"], opts["sample_size"], opts["seed"])
+    offset = 0
+    previous = cache.previous(source) if isinstance(source, str) else None
+    if (
+        previous is not None
+        and previous["ends_with_newline"]
+        and previous["bytes"] < os.path.getsize(source)
+        and _prefix_digest(source, previous["bytes"]) == previous["sha256"]
+    ):
+        state = cache.state(previous["sha256"])
+        if state is not None:
+            profiler.load(state)
+            offset = previous["bytes"]
+
+    with _binary(source) as f:
+        size = _size(f)
+        if offset:
+            names = list(pd.read_csv(f, nrows=0).columns)
+            f.seek(offset)
+            reader = pd.read_csv(
+                f, header=None, names=names, chunksize=opts["chunk_rows"]
+            )
+        else:
+            reader = pd.read_csv(f, chunksize=opts["chunk_rows"])
+        with reader:
+            for chunk in reader:
+                profiler.update(chunk)
+                if progress is not None and size:
+                    progress(min(f.tell() / size, 1.0))
+        f.seek(max(size - 1, 0))
+        ends_with_newline = f.read(1) == b"\n"
+
+    profile = profiler.result(opts["quantiles"])
+    profile.update(
+        {
+            "sha256": digest,
+            "bytes": size,
+            "ends_with_newline": ends_with_newline,
+            "resumed_from": offset,
+        }
+    )
+    cache.put(profile, profiler, source if isinstance(source, str) else None)
+    return profile
+
+
+def profile_table(profile: Dict[str, Any]) -> pd.DataFrame:
+    """One row per column, quantiles as q<value> columns"""
+    rows = []
+    for column in profile["columns"]:
+        row = {k: v for k, v in column.items() if k != "quantiles"}
+        row.update({f"q{q}": v for q, v in column.get("quantiles", {}).items()})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    from config.config_manager import load_config
+
+    parser = argparse.ArgumentParser(description="Vista previa y perfil de un CSV")
+    parser.add_argument("dataset", help="archivo CSV")
+    parser.add_argument("--rows", type=int, help="filas de la vista previa")
+    parser.add_argument(
+        "--no-profile", action="store_true", help="solo la vista previa"
+    )
+    args = parser.parse_args(argv)
+
+    cfg = load_config()
+    opts = profile_config(cfg)
+    rows = args.rows or opts["preview_rows"]
+    for name, frame in preview(
+        args.dataset, rows, opts["seed"], opts["exact_sample_bytes"]
+    ).items():
+        print(f"\n=== {name} ===")
+        print(frame.to_string(index=False))
+    if args.no_profile:
+        return
+    profile = profile_csv(
+        args.dataset,
+        cfg,
+        lambda p: print(f"\rPerfilando... {p:.0%}", end="", flush=True),
+    )
+    print(f"\n\n=== perfil: {profile['rows']} filas ===")
+    print(profile_table(profile).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
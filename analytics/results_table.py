@@ -0,0 +1,162 @@
+import threading
+import pandas as pd
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from clients.centralized.response_cache import get_response_cache
+from clients.centralized.wire_format import columnar
+from storage.local_store import get_store
+
+COLUMNS = ["training_id", "dataset_id", "task", "model", "metric", "value"]
+KEY_COLUMNS = ["training_id", "dataset_id", "task", "model", "metric"]
+RESULTS_SUFFIX = "/results"
+
+# metric names that contain one of these are better when lower
+LOWER_IS_BETTER = ("mse", "mae", "rmse", "loss", "error", "mape")
+
+
+def lower_is_better(metric: str) -> bool:
+    name = metric.lower()
+    return any(word in name for word in LOWER_IS_BETTER)
+
+
+class ResultsTable:
+    """Metrics of every finished training as one long table:
+    training_id, dataset_id, task, model, metric, value.
+
+    Rows come from the finished results kept by the ResponseCache, `refresh`
+    only reads entries added since the last call. Key columns are
+    categoricals, so filters, rankings and leaderboards are vectorized
+    pandas operations over the whole table.
+    """
+
+    def __init__(self, cache=None, store=None):
+        self.cache = cache
+        self.store = store
+        self.frame = pd.DataFrame(columns=COLUMNS).astype({"value": float})
+        self._watermark = 0
+        self._seen: set = set()
+        self._lock = threading.Lock()
+
+    def _rows(self, results: Dict[str, Any], trainings: Dict[str, Dict[str, Any]]):
+        training_id = results.get("training_id")
+        known = trainings.get(training_id, {})
+        dataset_id = results.get("dataset_id") or known.get("dataset_id")
+        task = results.get("train_type") or known.get("task")
+        # results negotiated as Arrow are cached as columns already
+        columns = columnar(results)["columns"]
+        metrics = columns["metric"]
+        models = columns.get("model_name") or [None] * len(metrics)
+        for model, metric, value in zip(models, metrics, columns["value"]):
+            if metric is not None:
+                yield training_id, dataset_id, task, model, metric, value
+
+    def ingest(self, results: Iterable[Dict[str, Any]]) -> int:
+        """Adds the metrics of finished trainings not seen yet, returns the
+        number of new rows"""
+        trainings = {}
+        if self.store is not None:
+            trainings = {t["id"]: t for t in self.store.trainings()}
+        rows = []
+        with self._lock:
+            for r in results:
+                training_id = r.get("training_id")
+                if not training_id or training_id in self._seen:
+                    continue
+                self._seen.add(training_id)
+                rows.extend(self._rows(r, trainings))
+            if not rows:
+                return 0
+            new = pd.DataFrame(rows, columns=COLUMNS)
+            new["value"] = pd.to_numeric(new["value"], errors="coerce")
+            new = new.dropna(subset=["value"])
+            frame = pd.concat(
+                [self.frame.astype({c: object for c in KEY_COLUMNS}), new],
+                ignore_index=True,
+            )
+            self.frame = frame.astype({c: "category" for c in KEY_COLUMNS})
+        return len(new)
+
+    def refresh(self) -> int:
+        """Ingests the results cached since the last refresh"""
+        if self.cache is None:
+            return 0
+        results = []
+        watermark = self._watermark
+        for rowid, _, value in self.cache.permanent(RESULTS_SUFFIX, watermark):
+            watermark = max(watermark, rowid)
+            if isinstance(value, dict):
+                results.append(value)
+        self._watermark = watermark
+        return self.ingest(results)
+
+    def metrics(self) -> List[str]:
+        return sorted(self.frame["metric"].dropna().unique())
+
+    def filter(self, **equals) -> pd.DataFrame:
+        """Rows where every given column equals the value (or is in the list)"""
+        frame = self.frame
+        mask = pd.Series(True, index=frame.index)
+        for column, value in equals.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                mask &= frame[column].isin(value)
+            else:
+                mask &= frame[column] == value
+        return frame[mask]
+
+    def wide(self, **equals) -> pd.DataFrame:
+        """One row per (training, model) and one column per metric"""
+        return self.filter(**equals).pivot_table(
+            index=["training_id", "dataset_id", "task", "model"],
+            columns="metric",
+            values="value",
+            observed=True,
+        )
+
+    def rank(
+        self, metric: str, by: str = "dataset_id", ascending: Optional[bool] = None
+    ) -> pd.DataFrame:
+        """Rows of `metric` with their rank inside each `by` group"""
+        if ascending is None:
+            ascending = lower_is_better(metric)
+        rows = self.filter(metric=metric).copy()
+        rows["rank"] = rows.groupby(by, observed=True)["value"].rank(
+            method="min", ascending=ascending
+        )
+        return rows.sort_values([by, "rank"])
+
+    def leaderboard(
+        self,
+        metric: str,
+        by: str = "dataset_id",
+        top: int = 1,
+        ascending: Optional[bool] = None,
+        **equals,
+    ) -> pd.DataFrame:
+        """Best `top` (training, model) of every `by` group for `metric`,
+        e.g. the best model per dataset"""
+        if ascending is None:
+            ascending = lower_is_better(metric)
+        rows = self.filter(metric=metric, **equals)
+        rows = rows.sort_values("value", ascending=ascending, kind="stable")
+        best = rows.groupby(by, observed=True, sort=False).head(top)
+        return best.sort_values([by, "value"], ascending=[True, ascending]).reset_index(
+            drop=True
+        )
+
+
+_tables: Dict[Tuple[str, str], ResultsTable] = {}
+_lock = threading.Lock()
+
+
+def get_results_table(cfg: Dict[str, Any], user: str) -> ResultsTable:
+    """Process wide table per user, fed from that user's response cache"""
+    key = (cfg.get("store_path", ""), user)
+    with _lock:
+        table = _tables.get(key)
+        if table is None:
+            table = ResultsTable(get_response_cache(cfg, user), get_store(cfg))
+            _tables[key] = table
+    table.refresh()
+    return table
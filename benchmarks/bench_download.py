@@ -0,0 +1,55 @@
+import argparse, os, tempfile, time
+
+from benchmarks.stand_in_server import start_server_process
+from clients.centralized.http_client import HttpClient
+from clients.centralized.downloader import RangeDownloader
+
+
+def measure(name: str, download, size: int):
+    start = time.perf_counter()
+    download()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14} {size / elapsed / 2**20:8.1f} MiB/s  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single stream vs range download")
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--part-mb", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--bandwidth-mb",
+        type=float,
+        default=20,
+        help="per connection server bandwidth, 0 for unlimited",
+    )
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    server, url = start_server_process(
+        model_size=size, bandwidth=int(args.bandwidth_mb * 2**20) or None
+    )
+    client = HttpClient(url)
+    with tempfile.TemporaryDirectory() as tmp:
+        single = RangeDownloader(client, buffer_size=8192)
+        ranged = RangeDownloader(
+            client,
+            part_size=args.part_mb * 1024 * 1024,
+            workers=args.workers,
+        )
+        path = "/api/jobs/bench/model"
+        measure(
+            "single stream",
+            lambda: single._download_single(path, os.path.join(tmp, "single.pkl")),
+            size,
+        )
+        measure(
+            "ranges",
+            lambda: ranged.download(path, os.path.join(tmp, "ranged.pkl")),
+            size,
+        )
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse, time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stand_in_server import start_server, server_url
+from clients.centralized.session import build_session, get_timeout
+
+
+def _run(get, url: str, total: int, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for r in pool.map(lambda _: get(url), range(total)):
+            r.raise_for_status()
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Old vs pooled HTTP session")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    cfg = {"http": {"pool_maxsize": args.workers}}
+    timeout = get_timeout(cfg)
+    server = start_server()
+    base = server_url(server)
+
+    session = build_session(cfg)
+    training_id = session.post(
+        f"{base}/api/v1/training/train",
+        json={"dataset_id": "bench", "train_type": "regression", "model_names": []},
+        timeout=timeout,
+    ).json()["training_id"]
+    url = f"{base}/api/v1/training/train/{training_id}/status"
+
+    before = _run(
+        lambda u: requests.get(u, timeout=timeout), url, args.requests, args.workers
+    )
+    after = _run(
+        lambda u: session.get(u, timeout=timeout), url, args.requests, args.workers
+    )
+    server.shutdown()
+
+    print(f"requests.get  : {before:10.1f} req/s")
+    print(f"pooled session: {after:10.1f} req/s  (x{after / before:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse, json, os, subprocess, sys, tempfile, time
+import requests
+
+from benchmarks.stand_in_server import start_server_process
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# one GUI session: the calls a page makes on every refresh
+SESSION_SCRIPT = """
+import json, statistics, time
+from clients.sidecar.sidecar_client import get_client
+ids = {ids!r}
+time.sleep(max(0, {start_at} - time.time()))
+client = get_client()
+latencies = []
+for _ in range({rounds}):
+    start = time.perf_counter()
+    client.get_models("regression")
+    client.get_jobs_status(ids)
+    client.get_job_status(ids[0])
+    client.get_results(ids[0])
+    latencies.append(time.perf_counter() - start)
+    time.sleep({interval})
+print(json.dumps({{"kind": type(client).__name__, "median": statistics.median(latencies)}}))
+"""
+
+
+def _workdir(url: str, sidecar: bool) -> str:
+    """Temporary cwd with its own caches, pointing at the stand-in"""
+    tmp = tempfile.mkdtemp(prefix="distai-sidecar-")
+    with open(os.path.join(ROOT, "config", "config.json"), "r") as f:
+        cfg = json.load(f)
+    cfg["servers"] = [url]
+    cfg.pop("token", None)
+    cfg["sidecar"] = {**cfg.get("sidecar", {}), "enabled": sidecar}
+    os.makedirs(os.path.join(tmp, "config"))
+    with open(os.path.join(tmp, "config", "config.json"), "w") as f:
+        json.dump(cfg, f, indent=2)
+    return tmp
+
+
+def _trainings(url: str, count: int) -> list:
+    return [
+        requests.post(
+            f"{url}/api/v1/training/train",
+            json={"dataset_id": "bench", "train_type": "regression", "models": ["A"]},
+        ).json()["training_id"]
+        for _ in range(count)
+    ]
+
+
+def run(args, sidecar: bool, port: int) -> dict:
+    server, url = start_server_process(
+        port, latency=args.latency_ms / 1000, training_seconds=args.training_s
+    )
+    cwd = _workdir(url, sidecar)
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    daemon = None
+    try:
+        ids = _trainings(url, args.trainings)
+        if sidecar:
+            daemon = subprocess.Popen(
+                [sys.executable, "-m", "clients.sidecar.daemon"],
+                cwd=cwd,
+                env=env,
+                stdout=subprocess.DEVNULL,
+            )
+            while not os.path.exists(os.path.join(cwd, "data/run/sidecar.sock")):
+                time.sleep(0.05)
+        before = requests.get(f"{url}/stand-in/requests").json()
+        script = SESSION_SCRIPT.format(
+            ids=ids,
+            start_at=time.time() + 2,
+            rounds=args.rounds,
+            interval=args.interval,
+        )
+        start = time.perf_counter()
+        sessions = [
+            subprocess.Popen(
+                [sys.executable, "-c", script],
+                cwd=cwd,
+                env=env,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            for _ in range(args.sessions)
+        ]
+        outputs = [json.loads(s.communicate()[0]) for s in sessions]
+        elapsed = time.perf_counter() - start - 2
+        after = requests.get(f"{url}/stand-in/requests").json()
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+        server.terminate()
+        server.join()
+    upstream = {k: v - before.get(k, 0) for k, v in after.items()}
+    return {
+        "client": outputs[0]["kind"],
+        "upstream": sum(upstream.values()),
+        "by_route": upstream,
+        "median_round_ms": 1000
+        * sorted(o["median"] for o in outputs)[len(outputs) // 2],
+        "elapsed_s": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Direct clients vs sidecar daemon")
+    parser.add_argument("--sessions", type=int, default=12)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--trainings", type=int, default=20)
+    parser.add_argument("--training-s", type=float, default=30)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    print(
+        f"{args.sessions} sessions x {args.rounds} refreshes, "
+        f"server latency {args.latency_ms:.0f} ms"
+    )
+    for i, sidecar in enumerate((False, True)):
+        result = run(args, sidecar, args.port + i)
+        print(
+            f"{result['client']:<14} upstream requests {result['upstream']:6d}   "
+            f"median refresh {result['median_round_ms']:8.1f} ms   "
+            f"wall {result['elapsed_s']:6.2f} s"
+        )
+        print(f"{'':<14} {result['by_route']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+from benchmarks.stand_in_server import start_server_process
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "run",
+    "clients.centralized.http_client",
+    "GUI.console.main",
+    "GUI.streamlit.main",
+]
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+# time from interpreter start to the first menu line of the console GUI
+CONSOLE_SCRIPT = """
+import time
+start = time.perf_counter()
+from GUI.console.main import ClientGUI
+import builtins
+def first_input(prompt=""):
+    print(time.perf_counter() - start, flush=True)
+    raise SystemExit
+builtins.input = first_input
+ClientGUI()
+"""
+
+# time of the first Streamlit script run (all tabs) once streamlit is loaded
+STREAMLIT_SCRIPT = """
+import time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({path!r}, default_timeout=60)
+start = time.perf_counter()
+app.run()
+print(time.perf_counter() - start)
+"""
+
+
+def _python(script: str, cwd: str) -> float:
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def _median_ms(script: str, cwd: str, runs: int) -> float:
+    return round(statistics.median(_python(script, cwd) for _ in range(runs)) * 1000, 1)
+
+
+def _workdir(url: str) -> str:
+    """Temporary cwd whose config points at the stand-in and has no token,
+    so every start does discovery and a token request"""
+    tmp = tempfile.mkdtemp(prefix="distai-startup-")
+    with open(os.path.join(ROOT, "config", "config.json"), "r") as f:
+        cfg = json.load(f)
+    cfg["servers"] = [url]
+    cfg.pop("token", None)
+    os.makedirs(os.path.join(tmp, "config"))
+    with open(os.path.join(tmp, "config", "config.json"), "w") as f:
+        json.dump(cfg, f, indent=2)
+    return tmp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and first paint")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--no-streamlit", action="store_true")
+    args = parser.parse_args()
+
+    server, url = start_server_process(args.port, latency=args.latency_ms / 1000)
+    results = {}
+    try:
+        for module in MODULES:
+            script = IMPORT_SCRIPT.format(module=module)
+            results[f"import {module}"] = _median_ms(script, ROOT, args.runs)
+        cwd = _workdir(url)
+        results["console first menu"] = _median_ms(CONSOLE_SCRIPT, cwd, args.runs)
+        if not args.no_streamlit:
+            script = STREAMLIT_SCRIPT.format(path=os.path.join(ROOT, "run.py"))
+            results["streamlit first run"] = _median_ms(script, cwd, args.runs)
+    finally:
+        server.terminate()
+
+    print(f"server latency: {args.latency_ms:.0f} ms, median of {args.runs} runs")
+    for name, ms in results.items():
+        print(f"{name:<42} {ms:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse, os, random, tempfile, time, tracemalloc
+
+from benchmarks.stand_in_server import start_server_process
+from clients.centralized.http_client import HttpClient
+from clients.centralized.uploader import ChunkedUploader
+
+
+def make_csv(path: str, size_mb: int):
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        f.write("f1,f2,f3,target\n")
+        while f.tell() < size_mb * 1024 * 1024:
+            rows = (
+                f"{rng.getrandbits(53)},{rng.random()},{rng.randint(0, 9)},{rng.randint(0, 1)}\n"
+                for _ in range(10000)
+            )
+            f.writelines(rows)
+
+
+def measure(name: str, upload, size: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = upload()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<12} {size / elapsed / 2**20:8.1f} MiB/s  "
+        f"peak {peak / 2**20:8.1f} MiB  -> {response.get('dataset_id')}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multipart vs chunked upload")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--chunk-mb", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--compression", default="gzip")
+    args = parser.parse_args()
+
+    server, url = start_server_process()
+    client = HttpClient(url)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.csv")
+        make_csv(path, args.size_mb)
+        size = os.path.getsize(path)
+        uploader = ChunkedUploader(
+            client,
+            chunk_size=args.chunk_mb * 1024 * 1024,
+            workers=args.workers,
+            compression=args.compression,
+            state_dir=os.path.join(tmp, "state"),
+        )
+
+        def multipart():
+            with open(path, "rb") as f:
+                return client._upload_multipart(f, "bench.csv")
+
+        measure("multipart", multipart, size)
+        measure("chunked", lambda: uploader.upload(path), size)
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
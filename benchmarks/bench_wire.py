@@ -0,0 +1,76 @@
+import argparse, statistics, time
+import requests
+
+from benchmarks.stand_in_server import start_server_process
+from clients.centralized.wire_format import (
+    WireFormat,
+    available_encodings,
+    available_formats,
+    columnar,
+)
+
+
+def _measure(url: str, wire: WireFormat, rounds: int) -> dict:
+    """Bytes on the wire, decode time (decompression included) and time to
+    long columns of one results payload"""
+    session = requests.Session()
+    sizes, decode, to_columns = [], [], []
+    for _ in range(rounds):
+        r = session.get(url, headers=wire.headers(tabular=True), stream=True)
+        r.raise_for_status()
+        start = time.perf_counter()
+        r.content
+        value = wire.decode(r)
+        decoded = time.perf_counter()
+        columnar(value)
+        done = time.perf_counter()
+        sizes.append(int(r.headers["Content-Length"]))
+        decode.append(decoded - start)
+        to_columns.append(done - start)
+    return {
+        "type": r.headers.get("Content-Type"),
+        "bytes": statistics.median(sizes),
+        "decode_ms": 1000 * statistics.median(decode),
+        "columns_ms": 1000 * statistics.median(to_columns),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Results payload per wire format")
+    parser.add_argument("--models", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    server, base = start_server_process(args.port)
+    try:
+        training_id = requests.post(
+            f"{base}/api/v1/training/train",
+            json={
+                "dataset_id": "bench",
+                "train_type": "regression",
+                "model_names": [f"model_{i}" for i in range(args.models)],
+            },
+        ).json()["training_id"]
+        url = f"{base}/api/v1/training/train/{training_id}/results"
+        encodings = ["identity"] + [
+            e for e in ("gzip", "zstd") if e in available_encodings()
+        ]
+        print(f"{args.models} models, formats {available_formats()}")
+        for fmt in available_formats():
+            for encoding in encodings:
+                cfg = {"formats": [fmt], "encodings": [encoding]}
+                wire = WireFormat({"wire_format": cfg})
+                result = _measure(url, wire, args.rounds)
+                print(
+                    f"{fmt:<8} {encoding:<9} {result['bytes'] / 1024:10.1f} KiB   "
+                    f"decode {result['decode_ms']:8.2f} ms   "
+                    f"to columns {result['columns_ms']:8.2f} ms"
+                )
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
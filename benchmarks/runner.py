@@ -0,0 +1,234 @@
+import argparse, json, os, platform, resource, subprocess, sys, tempfile, time
+import tracemalloc, uuid
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List
+
+from benchmarks.bench_upload import make_csv
+from benchmarks.stand_in_server import start_server_process
+from clients.centralized.http_client import HttpClient
+from clients.centralized.downloader import RangeDownloader
+from clients.centralized.uploader import ChunkedUploader
+
+TRAIN_PATH = "/api/v1/training/train"
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def timed_calls(call: Callable[[int], Any], total: int, workers: int) -> Dict[str, Any]:
+    """Runs `call(i)` total times on `workers` threads: QPS and latencies"""
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            call(i)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for latency, error in outcomes if error is None]
+    return {
+        "requests": total,
+        "errors": sum(1 for _, error in outcomes if error is not None),
+        "qps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def traced(run: Callable[[], int]) -> Dict[str, Any]:
+    """Throughput and peak Python memory of a transfer of `run()` bytes"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        size = run()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "mib_per_s": round(size / elapsed / 2**20, 2),
+        "peak_mib": round(peak / 2**20, 2),
+    }
+
+
+def create_training(client: HttpClient, attempts: int = 5) -> str:
+    """Retried with the same idempotency key when failures are injected"""
+    payload = {"dataset_id": "bench", "train_type": "regression", "model_names": []}
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    for attempt in range(attempts):
+        try:
+            r = client._request("POST", TRAIN_PATH, json=payload, headers=headers)
+            return r.json()["training_id"]
+        except requests.RequestException:
+            if attempt == attempts - 1:
+                raise
+
+
+# ========= Scenarios =========
+
+
+def bench_status(client: HttpClient, args, tmp: str) -> Dict[str, Any]:
+    """Single status polls, straight to the server (no response cache)"""
+    path = f"{TRAIN_PATH}/{create_training(client)}/status"
+    return timed_calls(
+        lambda _: client._request("GET", path, read_only=True),
+        args.requests,
+        args.workers,
+    )
+
+
+def bench_bulk_status(client: HttpClient, args, tmp: str) -> Dict[str, Any]:
+    ids = [create_training(client) for _ in range(args.batch)]
+    rounds = max(1, args.requests // args.batch)
+    result = timed_calls(lambda _: client.get_jobs_status(ids), rounds, args.workers)
+    result["statuses_per_s"] = round(result["qps"] * args.batch, 1)
+    return result
+
+
+def bench_create(client: HttpClient, args, tmp: str) -> Dict[str, Any]:
+    return timed_calls(
+        lambda _: create_training(client), args.requests // 4 or 1, args.workers
+    )
+
+
+def bench_upload(client: HttpClient, args, tmp: str) -> Dict[str, Any]:
+    path = os.path.join(tmp, "bench.csv")
+    make_csv(path, args.size_mb)
+    uploader = ChunkedUploader(client, state_dir=os.path.join(tmp, "state"))
+
+    def run():
+        uploader.upload(path)
+        return os.path.getsize(path)
+
+    return traced(run)
+
+
+def bench_download(client: HttpClient, args, tmp: str) -> Dict[str, Any]:
+    output_path = os.path.join(tmp, "model.pkl")
+
+    def run():
+        RangeDownloader(client).download("/api/jobs/bench/model", output_path)
+        return os.path.getsize(output_path)
+
+    return traced(run)
+
+
+SCENARIOS = {
+    "status": bench_status,
+    "bulk_status": bench_bulk_status,
+    "create": bench_create,
+    "upload": bench_upload,
+    "download": bench_download,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]):
+    print("\nvs baseline", baseline.get("commit") or "")
+    for name, metrics in report["results"].items():
+        before = baseline.get("results", {}).get(name, {})
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            if (
+                isinstance(value, (int, float))
+                and isinstance(old, (int, float))
+                and old
+            ):
+                print(
+                    f"  {name}.{metric:<16} {old:>12} -> {value:<12} {value / old - 1:+.1%}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HttpClient benchmark suite")
+    parser.add_argument(
+        "--only", default=",".join(SCENARIOS), help="comma separated scenarios"
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--model-mb", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--bandwidth-mb", type=float, default=0)
+    parser.add_argument("--failure-rate", type=float, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="JSON report, appended as a line to .jsonl")
+    parser.add_argument("--baseline", help="earlier JSON report to compare with")
+    args = parser.parse_args()
+    baseline = None
+    if args.baseline:
+        # read first, the output may be the same history file
+        with open(args.baseline, "r") as f:
+            if args.baseline.endswith(".jsonl"):
+                baseline = json.loads(f.read().strip().splitlines()[-1])
+            else:
+                baseline = json.load(f)
+
+    server_options = {
+        "model_size": args.model_mb * 2**20,
+        "bandwidth": int(args.bandwidth_mb * 2**20) or None,
+        "latency": args.latency_ms / 1000,
+        "jitter": args.jitter_ms / 1000,
+        "failure_rate": args.failure_rate,
+    }
+    server, url = start_server_process(args.port, **server_options)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "server": server_options,
+        "args": vars(args),
+        "results": {},
+    }
+    try:
+        client = HttpClient(url)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in args.only.split(","):
+                result = SCENARIOS[name](client, args, tmp)
+                report["results"][name] = result
+                print(f"{name:<12} {json.dumps(result)}")
+    finally:
+        server.terminate()
+    report["peak_rss_mib"] = round(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+    )
+
+    if baseline is not None:
+        compare(report, baseline)
+    if args.output:
+        if args.output.endswith(".jsonl"):
+            with open(args.output, "a") as f:
+                f.write(json.dumps(report) + "\n")
+        else:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
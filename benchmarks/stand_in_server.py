@@ -0,0 +1,672 @@
+import argparse, email, gzip, hashlib, json, multiprocessing, os, re, socket, tempfile
+import random, threading, time, urllib.parse, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+
+from clients.centralized.wire_format import ARROW, JSON, MSGPACK, msgpack
+from clients.centralized.wire_format import results_to_arrow
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+COMPRESSORS = {"gzip": lambda body: gzip.compress(body, 6, mtime=0)}
+if zstd is not None:
+    COMPRESSORS["zstd"] = zstd.compress
+
+# smaller bodies are sent as is
+COMPRESS_MIN_SIZE = 1024
+
+
+class StandInState:
+    """In-memory state of the stand-in DistAI server.
+
+    `latency` (+ up to `jitter`) seconds are added to every request and a
+    `failure_rate` fraction of them fail, either with `failure_status` or,
+    with failure_mode "reset", by closing the connection unanswered.
+    /api/ping never fails so the client can still find the node.
+
+    With `check_datasets` trainings of unknown dataset ids get a 404, as
+    after the server deleted or expired the dataset.
+
+    A `training_failure_rate` fraction of the trainings end as failed
+    instead of completed.
+
+    With `token_ttl` tokens expire after that many seconds and requests
+    without a valid one get a 401.
+
+    `wire_formats` and `encodings` are what the server offers when the
+    client accepts them, ["json"] and [] make a plain JSON server.
+    """
+
+    def __init__(
+        self,
+        training_seconds: float = 0.0,
+        model_size: int = 1024 * 1024,
+        bandwidth: Optional[int] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        failure_mode: str = "status",
+        seed: int = 0,
+        token_ttl: Optional[float] = None,
+        cluster: Optional[list] = None,
+        stream_events: bool = True,
+        wire_formats: tuple = ("arrow", "msgpack", "json"),
+        encodings: tuple = ("zstd", "gzip"),
+        training_failure_rate: float = 0.0,
+        check_datasets: bool = False,
+    ):
+        self.lock = threading.Lock()
+        self.training_seconds = training_seconds
+        # bytes per second and per connection for request and model bodies
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.failure_mode = failure_mode
+        self.training_failure_rate = training_failure_rate
+        self.check_datasets = check_datasets
+        self.random = random.Random(seed)
+        self.failures = 0
+        self.token_ttl = token_ttl
+        # token -> expiry, only with token_ttl
+        self.tokens: Dict[str, float] = {}
+        self.token_requests = 0
+        # node urls announced on /api/cluster/nodes, None = this server only
+        self.cluster = cluster
+        self.logical: Dict[str, Dict[str, Any]] = {}
+        # progress events, ids are positions in the log (from 1)
+        self.stream_events = stream_events
+        self.wire_formats = wire_formats
+        self.encodings = encodings
+        self.events: list = []
+        self.snapshots: Dict[str, Dict[str, Any]] = {}
+        self.unauthorized = 0
+        # requests served by route, for benchmarks comparing request rates
+        self.requests: Dict[str, int] = {}
+        self.model = os.urandom(model_size)
+        self.model_sha256 = hashlib.sha256(self.model).hexdigest()
+        self.datasets: Dict[str, Dict[str, Any]] = {}
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.trainings: Dict[str, Dict[str, Any]] = {}
+        # Idempotency-Key -> training_id
+        self.idempotency: Dict[str, str] = {}
+
+    def training(self, training_id: str) -> Optional[Dict[str, Any]]:
+        training = self.trainings.get(training_id)
+        if training is None:
+            return None
+        elapsed = time.monotonic() - training["_created"]
+        if elapsed >= self.training_seconds:
+            status = "failed" if training["_fails"] else "completed"
+        elif elapsed >= self.training_seconds / 4:
+            status = "running"
+        else:
+            status = "pending"
+        # in tenths, so progress events aren't sent on every tick
+        progress = 1.0
+        if self.training_seconds:
+            progress = round(min(1.0, elapsed / self.training_seconds), 1)
+        training["status"] = status
+        training["progress"] = progress
+        for result in training["results"]:
+            result["status"] = status
+            result["progress"] = progress
+            rng = random.Random(f"{training_id}:{result['model_name']}")
+            if status == "completed" and "r2" not in result["metrics"]:
+                result["metrics"] = {"r2": rng.random(), "mse": rng.random() * 10}
+            elif status == "running":
+                # intermediate metrics while the model trains
+                result["metrics"] = {
+                    "loss": round(rng.random() * (1 - 0.8 * progress), 4)
+                }
+        return {k: v for k, v in training.items() if not k.startswith("_")}
+
+    def events_for(self, training_ids, after: int):
+        """Progress events of the trainings with an id above `after`, and
+        whether all of them finished. Snapshots that changed since the last
+        call are appended to the shared event log first"""
+        with self.lock:
+            done = True
+            for training_id in training_ids:
+                training = self.training(training_id)
+                if training is None:
+                    continue
+                event = {
+                    "training_id": training_id,
+                    "status": training["status"],
+                    "progress": training["progress"],
+                    "models": [dict(result) for result in training["results"]],
+                }
+                if self.snapshots.get(training_id) != event:
+                    self.snapshots[training_id] = event
+                    self.events.append((len(self.events) + 1, training_id, event))
+                done = done and training["status"] in ("completed", "failed")
+            wanted = set(training_ids)
+            events = [
+                (event_id, event)
+                for event_id, training_id, event in self.events[after:]
+                if training_id in wanted
+            ]
+        return events, done
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    routes = [
+        ("POST", r"/api/token$", "token"),
+        ("GET", r"/api/ping$", "ping"),
+        ("POST", r"/api/v1/training/dataset/upload$", "upload"),
+        ("POST", r"/api/v1/training/dataset/upload/init$", "upload_init"),
+        (
+            "GET",
+            r"/api/v1/training/dataset/hash/(?P<digest>[0-9a-f]+)$",
+            "dataset_hash",
+        ),
+        ("GET", r"/api/v1/training/dataset/upload/(?P<id>[^/]+)$", "upload_received"),
+        (
+            "PUT",
+            r"/api/v1/training/dataset/upload/(?P<id>[^/]+)/chunks/(?P<index>\d+)$",
+            "upload_chunk",
+        ),
+        (
+            "POST",
+            r"/api/v1/training/dataset/upload/(?P<id>[^/]+)/complete$",
+            "upload_complete",
+        ),
+        ("POST", r"/api/v1/training/dataset/logical$", "logical"),
+        ("POST", r"/api/v1/training/train$", "train"),
+        ("POST", r"/api/v1/training/train/status$", "bulk_status"),
+        ("GET", r"/api/v1/training/train/(?P<id>[^/]+)/status$", "status"),
+        ("GET", r"/api/v1/training/train/(?P<id>[^/]+)/results$", "results"),
+        ("POST", r"/api/v1/training/train/(?P<id>[^/]+)/predict$", "predict"),
+        ("GET", r"/api/v1/training/models/(?P<task>[^/]+)$", "models"),
+        ("GET", r"/api/v1/training/events$", "events"),
+        ("POST", r"/api/v1/training/events$", "events"),
+        ("GET", r"/api/cluster/nodes$", "nodes"),
+        ("GET", r"/api/jobs$", "jobs"),
+        ("GET", r"/api/jobs/(?P<id>[^/]+)/model$", "model"),
+        ("HEAD", r"/api/jobs/(?P<id>[^/]+)/model$", "model"),
+        ("GET", r"/stand-in/requests$", "requests"),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> StandInState:
+        return self.server.state
+
+    def _inject(self, path: str) -> bool:
+        """Latency and failures, True when the request was failed"""
+        state = self.state
+        with state.lock:
+            delay = state.latency + state.jitter * state.random.random()
+            fail = path != "/api/ping" and state.random.random() < state.failure_rate
+            if fail:
+                state.failures += 1
+        if delay:
+            time.sleep(delay)
+        if not fail:
+            return False
+        self._read_body()
+        if state.failure_mode == "reset":
+            self.close_connection = True
+        else:
+            self._send_json({"detail": "Injected failure"}, state.failure_status)
+        return True
+
+    def _unauthorized(self, path: str) -> bool:
+        state = self.state
+        if state.token_ttl is None or path in ("/api/token", "/api/ping"):
+            return False
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        with state.lock:
+            if state.tokens.get(token, 0) > time.time():
+                return False
+            state.unauthorized += 1
+        self._read_body()
+        self._send_json({"detail": "Invalid or expired token"}, 401)
+        return True
+
+    def _dispatch(self, method: str):
+        path = self.path.split("?", 1)[0]
+        if self._inject(path) or self._unauthorized(path):
+            return
+        for m, pattern, name in self.routes:
+            match = re.match(pattern, path)
+            if m == method and match:
+                if name != "requests":
+                    with self.state.lock:
+                        count = self.state.requests.get(name, 0)
+                        self.state.requests[name] = count + 1
+                return getattr(self, f"do_{name}")(**match.groupdict())
+        self._read_body()
+        self._send_json({"detail": "Not Found"}, 404)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_HEAD(self):
+        self._dispatch("HEAD")
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        if not self.state.bandwidth:
+            return self.rfile.read(length) if length else b""
+        block = 64 * 1024
+        body = bytearray()
+        while len(body) < length:
+            body += self.rfile.read(min(block, length - len(body)))
+            time.sleep(block / self.state.bandwidth)
+        return bytes(body)
+
+    def _file_part(self, body: bytes) -> bytes:
+        # content of the "file" field of a multipart/form-data body
+        message = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        for part in message.walk():
+            if part.get_param("name", header="content-disposition") == "file":
+                return part.get_payload(decode=True)
+        return body
+
+    def _negotiate(self, payload, table: bool) -> Tuple[bytes, str]:
+        """Body and Content-Type in the best format both sides know"""
+        accept = self.headers.get("Accept", "")
+        offered = self.state.wire_formats
+        if table and "arrow" in offered and ARROW in accept:
+            try:
+                return results_to_arrow(payload), ARROW
+            except (ImportError, ValueError, TypeError):
+                # no pyarrow, or metrics Arrow can't put in one column
+                pass
+        if "msgpack" in offered and msgpack is not None and MSGPACK in accept:
+            return msgpack.packb(payload), MSGPACK
+        return json.dumps(payload).encode(), JSON
+
+    def _compress(self, body: bytes) -> Tuple[bytes, Optional[str]]:
+        if len(body) < COMPRESS_MIN_SIZE:
+            return body, None
+        accepted = {
+            encoding.split(";")[0].strip()
+            for encoding in self.headers.get("Accept-Encoding", "").split(",")
+        }
+        for encoding in self.state.encodings:
+            if encoding in accepted and encoding in COMPRESSORS:
+                return COMPRESSORS[encoding](body), encoding
+        return body, None
+
+    def _send_json(self, payload, status: int = 200, table: bool = False):
+        """JSON, or MessagePack / Arrow (`table` payloads) when the client
+        accepts them, compressed with the encoding it prefers"""
+        if status == 200:
+            body, content_type = self._negotiate(payload, table)
+        else:
+            body, content_type = json.dumps(payload).encode(), JSON
+        if self.command == "GET" and status == 200:
+            etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        body, encoding = self._compress(body)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Vary", "Accept, Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if self.command == "GET" and status == 200:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_token(self):
+        self._read_body()
+        state = self.state
+        with state.lock:
+            state.token_requests += 1
+        if state.token_ttl is None:
+            return self._send_json({"token": "stand-in-token"})
+        token = uuid.uuid4().hex
+        with state.lock:
+            state.tokens[token] = time.time() + state.token_ttl
+        self._send_json({"token": token, "expires_in": state.token_ttl})
+
+    def do_ping(self):
+        self._send_json({"status": "ok"})
+
+    def do_upload(self):
+        body = self._file_part(self._read_body())
+        dataset_id = str(uuid.uuid4())
+        with self.state.lock:
+            self.state.datasets[dataset_id] = {
+                "size": len(body),
+                "sha256": hashlib.sha256(body).hexdigest(),
+            }
+        self._send_json({"dataset_id": dataset_id})
+
+    def do_dataset_hash(self, digest: str):
+        for dataset_id, dataset in self.state.datasets.items():
+            if dataset["sha256"] == digest:
+                return self._send_json({"dataset_id": dataset_id})
+        self._send_json({"detail": "Dataset not found"}, 404)
+
+    def do_upload_init(self):
+        payload = json.loads(self._read_body() or b"{}")
+        upload_id = str(uuid.uuid4())
+        fd, path = tempfile.mkstemp(prefix="stand_in_upload_")
+        os.close(fd)
+        with self.state.lock:
+            self.state.uploads[upload_id] = {
+                "path": path,
+                "chunk_size": payload["chunk_size"],
+                "received": set(),
+            }
+        self._send_json({"upload_id": upload_id})
+
+    def do_upload_received(self, id: str):
+        upload = self.state.uploads.get(id)
+        if upload is None:
+            return self._send_json({"detail": "Upload not found"}, 404)
+        self._send_json({"received": sorted(upload["received"])})
+
+    def do_upload_chunk(self, id: str, index: str):
+        body = self._read_body()
+        upload = self.state.uploads.get(id)
+        if upload is None:
+            return self._send_json({"detail": "Upload not found"}, 404)
+        if hashlib.sha256(body).hexdigest() != self.headers.get("X-Chunk-Sha256"):
+            return self._send_json({"detail": "Checksum mismatch"}, 422)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        elif self.headers.get("Content-Encoding") == "zstd":
+            import zstandard
+
+            body = zstandard.ZstdDecompressor().decompress(body)
+        fd = os.open(upload["path"], os.O_WRONLY)
+        try:
+            os.pwrite(fd, body, int(index) * upload["chunk_size"])
+        finally:
+            os.close(fd)
+        with self.state.lock:
+            upload["received"].add(int(index))
+        self._send_json({"index": int(index)})
+
+    def do_upload_complete(self, id: str):
+        payload = json.loads(self._read_body() or b"{}")
+        upload = self.state.uploads.get(id)
+        if upload is None:
+            return self._send_json({"detail": "Upload not found"}, 404)
+        if len(upload["received"]) != payload.get("chunks"):
+            return self._send_json({"detail": "Missing chunks"}, 409)
+        digest = hashlib.sha256()
+        with open(upload["path"], "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        if digest.hexdigest() != payload.get("sha256"):
+            return self._send_json({"detail": "Checksum mismatch"}, 422)
+        dataset_id = str(uuid.uuid4())
+        with self.state.lock:
+            self.state.datasets[dataset_id] = {
+                "size": os.path.getsize(upload["path"]),
+                "sha256": digest.hexdigest(),
+            }
+            del self.state.uploads[id]
+        os.remove(upload["path"])
+        self._send_json({"dataset_id": dataset_id})
+
+    def do_train(self):
+        payload = json.loads(self._read_body() or b"{}")
+        key = self.headers.get("Idempotency-Key")
+        with self.state.lock:
+            dataset_id = payload.get("dataset_id")
+            if self.state.check_datasets and not (
+                dataset_id in self.state.datasets or dataset_id in self.state.logical
+            ):
+                return self._send_json({"detail": "Unknown dataset"}, 404)
+            if key in self.state.idempotency:
+                training_id = self.state.idempotency[key]
+                return self._send_json({"training_id": training_id})
+            training_id = str(uuid.uuid4())
+            if key:
+                self.state.idempotency[key] = training_id
+            self.state.trainings[training_id] = {
+                "training_id": training_id,
+                "dataset_id": payload.get("dataset_id"),
+                "train_type": payload.get("train_type"),
+                "params": payload.get("params"),
+                "train_test_split": payload.get("train_test_split"),
+                "seed": payload.get("seed"),
+                "status": "pending",
+                "_created": time.monotonic(),
+                "_fails": self.state.random.random() < self.state.training_failure_rate,
+                "results": [
+                    {"model_name": m, "status": "pending", "metrics": {}}
+                    for m in payload.get("model_names", [])
+                ],
+            }
+        self._send_json({"training_id": training_id})
+
+    def do_status(self, id: str):
+        training = self.state.training(id)
+        if training is None:
+            return self._send_json({"detail": "Training not found"}, 404)
+        self._send_json({"training_id": id, "status": training["status"]})
+
+    def do_bulk_status(self):
+        payload = json.loads(self._read_body() or b"{}")
+        trainings = [self.state.training(id) for id in payload.get("training_ids", [])]
+        statuses = [
+            {"training_id": t["training_id"], "status": t["status"]}
+            for t in trainings
+            if t is not None
+        ]
+        self._send_json({"statuses": statuses})
+
+    def do_results(self, id: str):
+        training = self.state.training(id)
+        if training is None:
+            return self._send_json({"detail": "Training not found"}, 404)
+        self._send_json(training, table=True)
+
+    def do_predict(self, id: str):
+        rows = self._file_part(self._read_body()).decode().strip().splitlines()[1:]
+        self._send_json({"training_id": id, "predictions": [0] * len(rows)})
+
+    def do_models(self, task: str):
+        models = {
+            "regression": ["LinearRegression", "RandomForestRegressor"],
+            "classification": ["LogisticRegression", "RandomForestClassifier"],
+        }
+        self._send_json({"models": models.get(task, [])})
+
+    def do_jobs(self):
+        with self.state.lock:
+            ids = list(self.state.trainings)
+        jobs = [self.state.training(id) for id in ids]
+        self._send_json({"jobs": [j for j in jobs if j is not None]})
+
+    def do_events(self):
+        """Server-sent progress events of the trainings in a POST body
+        {"training_ids": [...]} (or ?ids=a,b) until they all finish,
+        resuming after Last-Event-ID"""
+        state = self.state
+        if self.command == "POST":
+            payload = json.loads(self._read_body() or b"{}")
+        if not state.stream_events:
+            return self._send_json({"detail": "Not Found"}, 404)
+        if self.command == "POST":
+            training_ids = payload.get("training_ids", [])
+        else:
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            training_ids = [i for i in ",".join(query.get("ids", [])).split(",") if i]
+        after = int(self.headers.get("Last-Event-ID") or 0)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.close_connection = True
+        last_write = time.monotonic()
+        try:
+            while True:
+                events, done = state.events_for(training_ids, after)
+                for event_id, event in events:
+                    self.wfile.write(
+                        f"id: {event_id}\nevent: progress\n"
+                        f"data: {json.dumps(event)}\n\n".encode()
+                    )
+                    after = event_id
+                if events:
+                    self.wfile.flush()
+                    last_write = time.monotonic()
+                if done:
+                    return
+                if time.monotonic() - last_write > 5:
+                    self.wfile.write(b": ping\n\n")
+                    self.wfile.flush()
+                    last_write = time.monotonic()
+                time.sleep(0.1)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_requests(self):
+        with self.state.lock:
+            self._send_json(dict(self.state.requests))
+
+    def do_nodes(self):
+        host, port = self.server.server_address[:2]
+        self._send_json({"nodes": self.state.cluster or [f"http://{host}:{port}"]})
+
+    def do_logical(self):
+        payload = json.loads(self._read_body() or b"{}")
+        if not payload.get("shards"):
+            return self._send_json({"detail": "No shards"}, 422)
+        dataset_id = str(uuid.uuid4())
+        with self.state.lock:
+            self.state.logical[dataset_id] = payload
+        self._send_json({"dataset_id": dataset_id})
+
+    def do_model(self, id: str):
+        model = self.state.model
+        start, end = 0, len(model) - 1
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or end), end)
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{self.state.model_sha256[:16]}"')
+        self.send_header("X-Checksum-Sha256", self.state.model_sha256)
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(model)}")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        view = memoryview(model)[start : end + 1]
+        block = 64 * 1024
+        for offset in range(0, len(view), block):
+            self.wfile.write(view[offset : offset + block])
+            if self.state.bandwidth:
+                time.sleep(block / self.state.bandwidth)
+
+
+def start_server(
+    host: str = "127.0.0.1", port: int = 0, **options
+) -> ThreadingHTTPServer:
+    """Runs the server in a background thread, `options` go to StandInState"""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.state = StandInState(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _serve(port: int, options: Dict[str, Any]):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    server.daemon_threads = True
+    server.state = StandInState(**options)
+    server.serve_forever()
+
+
+def start_server_process(
+    port: int = 8765, **options
+) -> Tuple[multiprocessing.Process, str]:
+    """Same server in another process, so its CPU and memory don't skew
+    client side measurements"""
+    process = multiprocessing.Process(target=_serve, args=(port, options), daemon=True)
+    process.start()
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, url
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in DistAI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--training-seconds", type=float, default=0.0)
+    parser.add_argument("--model-mb", type=float, default=1)
+    parser.add_argument("--bandwidth-mb", type=float, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--failure-rate", type=float, default=0)
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument("--failure-mode", choices=["status", "reset"], default="status")
+    parser.add_argument("--token-ttl", type=float, default=None)
+    parser.add_argument("--no-events", action="store_true")
+    parser.add_argument("--wire-formats", default="arrow,msgpack,json")
+    parser.add_argument("--encodings", default="zstd,gzip")
+    args = parser.parse_args()
+
+    srv = ThreadingHTTPServer((args.host, args.port), StandInHandler)
+    srv.daemon_threads = True
+    srv.state = StandInState(
+        training_seconds=args.training_seconds,
+        model_size=int(args.model_mb * 2**20),
+        bandwidth=int(args.bandwidth_mb * 2**20) or None,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+        failure_mode=args.failure_mode,
+        token_ttl=args.token_ttl,
+        stream_events=not args.no_events,
+        wire_formats=tuple(filter(None, args.wire_formats.split(","))),
+        encodings=tuple(filter(None, args.encodings.split(","))),
+    )
+    print(f"Stand-in server on {server_url(srv)}")
+    srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
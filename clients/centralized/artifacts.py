@@ -0,0 +1,37 @@
+import pickle
+import pandas as pd
+
+try:
+    import joblib
+except ImportError:
+    joblib = None
+
+
+class ModelUnavailable(Exception):
+    pass
+
+
+def load_artifact(path: str):
+    # artifacts come from our own training server, they are trusted pickles
+    if joblib is not None:
+        return joblib.load(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def select_model(artifact, model_name: str):
+    """An artifact is either one estimator or {model_name: estimator}"""
+    if isinstance(artifact, dict):
+        if model_name not in artifact:
+            raise ModelUnavailable(f"Model {model_name} not in artifact")
+        return artifact[model_name]
+    if not hasattr(artifact, "predict"):
+        raise ModelUnavailable("Artifact has no predict()")
+    return artifact
+
+
+def features(model, chunk: pd.DataFrame):
+    columns = getattr(model, "feature_names_in_", None)
+    if columns is not None:
+        return chunk[list(columns)]
+    return chunk.to_numpy()
@@ -0,0 +1,246 @@
+import asyncio, os, random
+import aiohttp
+from typing import Dict, Any, Optional, Iterable, List, Callable, Awaitable
+from models.base_client import BaseClient
+from config.config_manager import load_config
+from clients.centralized.http_client import HttpClient
+from clients.centralized.session import http_config, IDEMPOTENT_METHODS
+
+
+class AsyncHttpClient(BaseClient):
+    """asyncio version of HttpClient, every call shares one aiohttp pool.
+
+    Use it as an async context manager so the pool gets closed:
+
+        async with AsyncHttpClient.from_client(client) as c:
+            status = await c.gather_job_status(ids)
+
+    Built from an HttpClient, a rejected token is refreshed through the
+    client's token manager and predict runs on the client in a thread.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        token: Optional[str] = None,
+        cfg: Optional[Dict[str, Any]] = None,
+        client: Optional[HttpClient] = None,
+    ):
+        self.cfg = cfg if cfg is not None else load_config()
+        self.http = http_config(self.cfg)
+        self.server = server
+        self.token = token or self.cfg.get("token")
+        self.client = client
+        self.limit = self.http.get("max_concurrency", 32)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_client(cls, client) -> "AsyncHttpClient":
+        return cls(client.server, client.token, client.cfg, client)
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        self._get_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _headers(self) -> Dict[str, str]:
+        h = {"Accept": "application/json"}
+        if self.token:
+            h["Authorization"] = f"Bearer {self.token}"
+        return h
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # created lazily: aiohttp binds the pool to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.http["pool_maxsize"],
+                limit_per_host=self.http["pool_maxsize"],
+                force_close=not self.http["keep_alive"],
+            )
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=self.http["connect_timeout"],
+                sock_read=self.http["read_timeout"],
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    def _backoff(self, attempt: int) -> float:
+        return self.http["backoff_factor"] * (2**attempt) + random.uniform(
+            0, self.http["backoff_jitter"]
+        )
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        handler: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None,
+        **kwargs,
+    ) -> Any:
+        headers = {**self._headers(), **kwargs.pop("headers", {})}
+        retries = self.http["retries"]
+        retryable = method in IDEMPOTENT_METHODS or "Idempotency-Key" in headers
+        # forms are consumed by the first send, they can't go again
+        refreshable = self.client is not None and "data" not in kwargs
+        attempt = 0
+        while True:
+            try:
+                async with self._get_session().request(
+                    method, f"{self.server}{path}", headers=headers, **kwargs
+                ) as r:
+                    if r.status == 401 and refreshable:
+                        raise _Unauthorized()
+                    if (
+                        r.status in self.http["status_forcelist"]
+                        and retryable
+                        and attempt < retries
+                    ):
+                        raise _RetryableStatus(r.status)
+                    r.raise_for_status()
+                    if handler is not None:
+                        return await handler(r)
+                    return await r.json()
+            except _Unauthorized:
+                # once per call, the token manager blocks so it gets a thread
+                refreshable = False
+                stale = self.token
+                fresh = await asyncio.to_thread(
+                    self.client.tokens.refresh, self.client._request_token, stale=stale
+                )
+                if fresh and fresh != stale:
+                    self.token = fresh
+                    headers["Authorization"] = f"Bearer {fresh}"
+                continue
+            except _RetryableStatus:
+                pass
+            except aiohttp.ClientConnectorError:
+                # nothing reached the server, safe to retry any method
+                if attempt >= retries:
+                    raise
+            except (aiohttp.ServerDisconnectedError, asyncio.TimeoutError):
+                if not retryable or attempt >= retries:
+                    raise
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def upload_dataset(self, file_path: str) -> Dict[str, Any]:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+
+        with open(file_path, "rb") as file_data:
+            form = aiohttp.FormData()
+            form.add_field("file", file_data, filename=os.path.basename(file_path))
+            return await self._request(
+                "POST", "/api/v1/training/dataset/upload", data=form
+            )
+
+    async def create_job(
+        self,
+        dataset_id: str,
+        task: str,
+        models: list[str],
+        params: Optional[Dict[str, Any]] = None,
+        train_test_split: float = 0.2,
+        seed: int = 42,
+        idempotency_key: str = None,
+    ) -> Dict[str, Any]:
+        payload = {
+            "dataset_id": dataset_id,
+            "train_type": task,
+            "model_names": models,
+            "train_test_split": train_test_split,
+            "seed": seed,
+        }
+        if params:
+            payload["params"] = params
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        return await self._request(
+            "POST", "/api/v1/training/train", json=payload, headers=headers
+        )
+
+    async def get_job_status(self, job_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/api/v1/training/train/{job_id}/status")
+
+    async def list_jobs(self, user_id: str = None) -> Dict[str, Any]:
+        params = {"user_id": user_id} if user_id else {}
+        return await self._request("GET", "/api/jobs", params=params)
+
+    async def get_results(self, job_id: str):
+        return await self._request("GET", f"/api/v1/training/train/{job_id}/results")
+
+    async def get_models(self, model_type: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/api/v1/training/models/{model_type}")
+
+    async def download_model(self, job_id: str, output_path: str = None) -> str:
+        out_path = output_path or f"model_{job_id}.pkl"
+
+        async def save(r: aiohttp.ClientResponse) -> str:
+            with open(out_path, "wb") as f:
+                async for chunk in r.content.iter_chunked(1 << 16):
+                    f.write(chunk)
+            return out_path
+
+        return await self._request("GET", f"/api/jobs/{job_id}/model", handler=save)
+
+    async def predict(self, job_id, model_name, dataset_path, output_path=None):
+        # local scoring is CPU bound, it runs on the blocking client
+        if self.client is None:
+            self.client = HttpClient(self.server)
+        return await asyncio.to_thread(
+            self.client.predict, job_id, model_name, dataset_path, output_path
+        )
+
+    async def gather(
+        self, calls: Iterable[Callable[[], Awaitable[Any]]], limit: int = None
+    ) -> List[Any]:
+        """Runs the calls with at most `limit` in flight, exceptions are
+        returned in place of the result instead of cancelling the rest"""
+        semaphore = asyncio.Semaphore(limit or self.limit)
+
+        async def bounded(call):
+            async with semaphore:
+                return await call()
+
+        return await asyncio.gather(
+            *(bounded(call) for call in calls), return_exceptions=True
+        )
+
+    async def gather_job_status(
+        self, job_ids: Iterable[str], limit: int = None
+    ) -> Dict[str, Any]:
+        job_ids = list(job_ids)
+        results = await self.gather(
+            [lambda id=id: self.get_job_status(id) for id in job_ids], limit
+        )
+        return dict(zip(job_ids, results))
+
+    async def gather_results(
+        self, job_ids: Iterable[str], limit: int = None
+    ) -> Dict[str, Any]:
+        job_ids = list(job_ids)
+        results = await self.gather(
+            [lambda id=id: self.get_results(id) for id in job_ids], limit
+        )
+        return dict(zip(job_ids, results))
+
+    async def gather_create_jobs(
+        self, jobs: Iterable[Dict[str, Any]], limit: int = None
+    ) -> List[Any]:
+        """`jobs` are create_job kwargs: {"dataset_id", "task", "models"}"""
+        return await self.gather(
+            [lambda job=job: self.create_job(**job) for job in jobs], limit
+        )
+
+
+class _RetryableStatus(Exception):
+    pass
+
+
+class _Unauthorized(Exception):
+    pass
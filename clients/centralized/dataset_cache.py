@@ -0,0 +1,121 @@
+import hashlib, json, os, threading
+from typing import Dict, Any, Callable, List, Optional, BinaryIO, Union
+
+from clients.centralized.token_manager import FileLock
+
+DEFAULT_DATASET_CACHE_CONFIG: Dict[str, Any] = {
+    "enabled": True,
+    "path": "data/tables/dataset_cache.json",
+    "check_server": True,
+}
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def dataset_cache_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_DATASET_CACHE_CONFIG, **cfg.get("dataset_cache", {})}
+
+
+def stream_digest(stream: BinaryIO) -> str:
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """Local index of uploaded content: (scope, sha256) -> dataset_id, the
+    scope being a server or a cluster whose nodes share their datasets.
+
+    File digests are remembered by (size, mtime, inode), so a file that
+    didn't change is never hashed twice. Every write merges with the file
+    under a lock, so processes sharing it don't drop each other's entries.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = FileLock(path)
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                # indexes without a server per entry can't be trusted
+                return {"files": data.get("files", {}), "datasets": data["datasets"]}
+            except (ValueError, KeyError, AttributeError):
+                pass
+        return {"files": {}, "datasets": {}}
+
+    def _update(self, change: Callable[[Dict[str, Any]], None]):
+        """Applies `change` to the current file content and writes it back"""
+        with self._lock, self.lock:
+            data = self._load()
+            change(data)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._data = data
+
+    def digest(self, source: Union[str, BinaryIO]) -> str:
+        if not isinstance(source, str):
+            source.seek(0)
+            digest = stream_digest(source)
+            source.seek(0)
+            return digest
+
+        st = os.stat(source)
+        key = os.path.abspath(source)
+        signature = [st.st_size, st.st_mtime_ns, st.st_ino]
+        with self._lock:
+            entry = self._data["files"].get(key)
+            if entry and entry["signature"] == signature:
+                return entry["sha256"]
+        with open(source, "rb") as f:
+            digest = stream_digest(f)
+
+        def change(data):
+            data["files"][key] = {"signature": signature, "sha256": digest}
+
+        self._update(change)
+        return digest
+
+    def get(self, server: str, digest: str) -> Optional[str]:
+        with self._lock:
+            return self._data["datasets"].get(server, {}).get(digest)
+
+    def add(self, server: str, digest: str, dataset_id: str):
+        def change(data):
+            data["datasets"].setdefault(server, {})[digest] = dataset_id
+
+        self._update(change)
+
+    def forget(self, server: str, dataset_id: str) -> List[str]:
+        """Drops a dataset the server no longer has, returns the digests
+        that pointed to it"""
+        with self._lock:
+            entries = self._data["datasets"].get(server, {})
+            digests = [d for d, id in entries.items() if id == dataset_id]
+        if digests:
+
+            def change(data):
+                for digest in digests:
+                    data["datasets"].get(server, {}).pop(digest, None)
+
+            self._update(change)
+        return digests
+
+    def file_with(self, digest: str) -> Optional[str]:
+        """A file that had this content when it was last hashed"""
+        with self._lock:
+            files = list(self._data["files"].items())
+        for path, entry in files:
+            if entry["sha256"] == digest and os.path.exists(path):
+                st = os.stat(path)
+                if entry["signature"] == [st.st_size, st.st_mtime_ns, st.st_ino]:
+                    return path
+        return None
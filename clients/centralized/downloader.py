@@ -0,0 +1,172 @@
+import base64, hashlib, json, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+
+DEFAULT_DOWNLOAD_CONFIG: Dict[str, Any] = {
+    "part_size": 16 * 1024 * 1024,
+    "workers": 4,
+    "buffer_size": 1024 * 1024,
+    "max_models": 4,
+}
+
+
+class ChecksumMismatch(IOError):
+    pass
+
+
+def download_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_DOWNLOAD_CONFIG, **cfg.get("download", {})}
+
+
+def file_sha256(path: str, buffer_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(buffer_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def expected_sha256(headers) -> Optional[str]:
+    if headers.get("X-Checksum-Sha256"):
+        return headers["X-Checksum-Sha256"].lower()
+    # RFC 3230 style: Digest: sha-256=<base64>
+    for value in headers.get("Digest", "").split(","):
+        algorithm, _, encoded = value.strip().partition("=")
+        if algorithm.lower() == "sha-256" and encoded:
+            return base64.b64decode(encoded).hex()
+    return None
+
+
+class RangeDownloader:
+    """Downloads a file with parallel Range requests into a preallocated
+    `<output>.part` file.
+
+    Finished parts are listed in `<output>.part.json`, a new call for the
+    same output only fetches what is missing as long as the remote size
+    and ETag didn't change. The checksum sent by the server (X-Checksum-
+    Sha256 or Digest) is verified before the file gets its final name.
+    """
+
+    def __init__(self, client, **options):
+        self.client = client
+        opts = {**download_config(client.cfg), **options}
+        self.part_size = opts["part_size"]
+        self.workers = opts["workers"]
+        self.buffer_size = opts["buffer_size"]
+
+    def _parts(self, size: int) -> List[Tuple[int, int]]:
+        return [
+            (start, min(start + self.part_size, size) - 1)
+            for start in range(0, size, self.part_size)
+        ]
+
+    def _load_state(self, path: str, size: int, etag: Optional[str]) -> set:
+        if not os.path.exists(path):
+            return set()
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+        except ValueError:
+            return set()
+        if (state.get("size"), state.get("etag"), state.get("part_size")) != (
+            size,
+            etag,
+            self.part_size,
+        ):
+            return set()
+        return set(state.get("done", []))
+
+    def _save_state(self, path: str, size: int, etag: Optional[str], done: set):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "size": size,
+                    "etag": etag,
+                    "part_size": self.part_size,
+                    "done": sorted(done),
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    def download(
+        self, path: str, output_path: str, params: Dict[str, Any] = None
+    ) -> str:
+        head = self.client._request(
+            "HEAD", path, raise_for_status=False, params=params, allow_redirects=True
+        )
+        size = int(head.headers.get("Content-Length", 0))
+        ranges = head.headers.get("Accept-Ranges", "").lower() == "bytes"
+        if head.status_code != 200 or not ranges or size == 0:
+            return self._download_single(path, output_path, params)
+
+        etag = head.headers.get("ETag")
+        checksum = expected_sha256(head.headers)
+        part_path = f"{output_path}.part"
+        state_path = f"{output_path}.part.json"
+
+        done = self._load_state(state_path, size, etag)
+        if not done or not os.path.exists(part_path):
+            done = set()
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+        lock = threading.Lock()
+        parts = self._parts(size)
+
+        def fetch(index: int):
+            start, end = parts[index]
+            r = self.client._request(
+                "GET",
+                path,
+                params=params,
+                stream=True,
+                headers={"Range": f"bytes={start}-{end}"},
+            )
+            with r:
+                if r.status_code != 206:
+                    raise IOError(f"Range request ignored by server: {r.status_code}")
+                fd = os.open(part_path, os.O_WRONLY)
+                try:
+                    offset = start
+                    for chunk in r.iter_content(chunk_size=self.buffer_size):
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+                finally:
+                    os.close(fd)
+                if offset != end + 1:
+                    raise IOError(f"Incomplete part {index}: {offset - start} bytes")
+            with lock:
+                done.add(index)
+                self._save_state(state_path, size, etag, done)
+
+        missing = [i for i in range(len(parts)) if i not in done]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for _ in pool.map(fetch, missing):
+                pass
+
+        if checksum and file_sha256(part_path, self.buffer_size) != checksum:
+            os.remove(part_path)
+            os.remove(state_path)
+            raise ChecksumMismatch(f"Checksum mismatch downloading {path}")
+        os.replace(part_path, output_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return output_path
+
+    def _download_single(
+        self, path: str, output_path: str, params: Dict[str, Any] = None
+    ) -> str:
+        r = self.client._request("GET", path, params=params, stream=True)
+        checksum = expected_sha256(r.headers)
+        digest = hashlib.sha256()
+        part_path = f"{output_path}.part"
+        with r, open(part_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=self.buffer_size):
+                digest.update(chunk)
+                f.write(chunk)
+        if checksum and digest.hexdigest() != checksum:
+            os.remove(part_path)
+            raise ChecksumMismatch(f"Checksum mismatch downloading {path}")
+        os.replace(part_path, output_path)
+        return output_path
@@ -1,149 +1,580 @@
-import requests, os, json
-from typing import Dict, Any, Optional
+import requests, os, logging, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Iterable, BinaryIO, List, Union
 from models.base_client import BaseClient
 from config.config_manager import load_config, save_config
+from clients.centralized.session import (
+    get_session,
+    get_timeout,
+    http_config,
+    IDEMPOTENT_METHODS,
+)
+from clients.centralized.node_selector import get_node_selector, connect_failed
+from clients.centralized.uploader import (
+    ChunkedUploader,
+    ChunkedUploadUnsupported,
+    upload_config,
+)
+from clients.centralized.dataset_cache import DatasetCache, dataset_cache_config
+from clients.centralized.downloader import RangeDownloader, download_config
+from clients.centralized.response_cache import get_response_cache
+from clients.centralized.job_watcher import TERMINAL_STATES
+from clients.centralized.instrumentation import get_instrumentation
+from clients.centralized.token_manager import get_token_manager
+from clients.centralized.wire_format import WireFormat, columnar, nested
+
+log = logging.getLogger(__name__)
+
+# seconds between discovery attempts after a failed start, doubling
+DISCOVERY_RETRY = 1.0
+DISCOVERY_RETRY_MAX = 60.0
+
+
+def _unknown_dataset(r: requests.Response) -> bool:
+    """Whether a training create was refused for its dataset id"""
+    if r.status_code == 404:
+        return True
+    if r.status_code not in (400, 409, 422):
+        return False
+    try:
+        detail = str(r.json().get("detail", "")).lower()
+    except (ValueError, AttributeError):
+        return False
+    return "dataset" in detail and ("unknown" in detail or "not found" in detail)
+
+
+def _replayable(kwargs: Dict[str, Any]) -> bool:
+    """False for bodies read from files or streams, they can't be resent"""
+    data = kwargs.get("data")
+    return kwargs.get("files") is None and (
+        data is None or isinstance(data, (bytes, str, dict))
+    )
 
 
 class HttpClient(BaseClient):
-    def __init__(self):
+    def __init__(self, server: Optional[str] = None, username: Optional[str] = None):
         self.cfg = load_config()
-        self.server = self._discover_server()
-        self.token = self.cfg.get("token")
-        if not self.token:
-            self.token = self._request_token()
-            if self.token:
-                self.cfg["token"] = self.token
-                save_config(self.cfg)
-
-    def _headers(self) -> Dict[str, str]:
+        self.session = get_session(self.cfg)
+        # while other nodes are left, a refused connection moves on to the
+        # next node instead of retrying with backoff
+        self.failover_session = get_session(self.cfg, connect_retries=0)
+        self.timeout = get_timeout(self.cfg)
+        # None until we know whether the server has the bulk status endpoint
+        self.bulk_status: Optional[bool] = None
+        cache_cfg = dataset_cache_config(self.cfg)
+        self.dataset_cache = (
+            DatasetCache(cache_cfg["path"]) if cache_cfg["enabled"] else None
+        )
+        self.wire = WireFormat(self.cfg)
+        self.instrumentation = get_instrumentation(self.cfg)
+        self.token_error: Optional[Exception] = None
+        self.start_error: Optional[Exception] = None
+        # one token per user, shared with every client and process
+        self.username = username or os.getenv("CLIENT_USER", "user1")
+        self.tokens = get_token_manager(self.cfg, self.username)
+        # cached responses are scoped by user, in memory and on disk
+        self.response_cache = get_response_cache(self.cfg, self.username)
+        # a fixed server skips discovery and failover
+        self.nodes = None
+        self._server = server
+        # nodes of a cluster share their datasets, so cached dataset ids are
+        # kept per cluster (its configured servers) and survive a failover
+        self.dataset_scope = server or "cluster:" + ",".join(
+            sorted(self.cfg.get("servers", []))
+        )
+        # discovery and the token request run in background, the first
+        # request waits for them instead of the constructor
+        self._ready = threading.Event()
+        self._starter: Optional[threading.Thread] = None
+        self._discovery_lock = threading.Lock()
+        self._discovery_delay = DISCOVERY_RETRY
+        self._discovery_at = 0.0
+        if server and self.tokens.token:
+            self._ready.set()
+        else:
+            self._starter = threading.Thread(target=self._start, daemon=True)
+            self._starter.start()
+
+    def _start(self):
+        try:
+            if self._server is None and not self._discover():
+                return
+            if not self.tokens.token:
+                self.tokens.get(self._request_token)
+        except Exception as e:
+            self.start_error = e
+        finally:
+            self._ready.set()
+
+    def _discover(self) -> bool:
+        """Picks the server, after a failure at most once per backoff delay
+        so long lived clients recover from an outage at start"""
+        with self._discovery_lock:
+            if self._server is not None:
+                return True
+            if time.monotonic() < self._discovery_at:
+                return False
+            try:
+                if self.nodes is None:
+                    probes = get_session(self.cfg, retries=0)
+                    self.nodes = get_node_selector(self.cfg, probes)
+                else:
+                    self.nodes.probe_all()
+                self._server = self._discover_server()
+            except Exception as e:
+                self.start_error = e
+                self._discovery_at = time.monotonic() + self._discovery_delay
+                self._discovery_delay = min(
+                    self._discovery_delay * 2, DISCOVERY_RETRY_MAX
+                )
+                return False
+            self.start_error = None
+            self._discovery_delay = DISCOVERY_RETRY
+            return True
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Waits for server discovery and the token request"""
+        if threading.current_thread() is not self._starter:
+            self._ready.wait(timeout)
+        return self._ready.is_set()
+
+    @property
+    def server(self) -> str:
+        self.wait_ready()
+        if self._server is None and not self._discover():
+            raise self.start_error
+        return self._server
+
+    @server.setter
+    def server(self, server: str):
+        self._server = server
+
+    @property
+    def token(self) -> Optional[str]:
+        """Current token, refreshed in background shortly before it expires"""
+        self.wait_ready()
+        return self.tokens.get(self._request_token)
+
+    def _headers(self, token: Optional[str] = None) -> Dict[str, str]:
         h = {"Accept": "application/json"}
-        if self.token:
-            h["Authorization"] = f"Bearer {self.token}"
+        if token:
+            h["Authorization"] = f"Bearer {token}"
         return h
 
+    def _request(
+        self,
+        method: str,
+        path: str,
+        raise_for_status: bool = True,
+        read_only: bool = False,
+        authenticate: bool = True,
+        **kwargs,
+    ) -> requests.Response:
+        """`read_only` calls may be spread across healthy nodes, every call
+        fails over to the next best node when the current one is down.
+        A 401 gets a new token and the request is sent once more"""
+        token = self.token if authenticate else None
+        headers = {**self._headers(token), **kwargs.pop("headers", {})}
+        kwargs.setdefault("timeout", self.timeout)
+        server = self.server
+        if read_only and self.nodes:
+            server = self.nodes.read_node()
+        r = self._call(method, path, server, headers, read_only, **kwargs)
+        if r.status_code == 401 and authenticate:
+            fresh = self.tokens.refresh(self._request_token, stale=token)
+            if fresh and fresh != token and _replayable(kwargs):
+                headers["Authorization"] = f"Bearer {fresh}"
+                r = self._call(method, path, server, headers, read_only, **kwargs)
+        if raise_for_status:
+            r.raise_for_status()
+        return r
+
+    def _call(self, method, path, server, headers, read_only, **kwargs):
+        if self.instrumentation is None:
+            return self._send(method, path, server, headers, read_only, **kwargs)[0]
+        record = self.instrumentation.begin(method, path)
+        try:
+            r, record.failovers = self._send(
+                method, path, server, headers, read_only, **kwargs
+            )
+        except Exception as e:
+            self.instrumentation.end(record, error=e)
+            raise
+        self.instrumentation.end(record, r)
+        return r
+
+    def _send(self, method, path, server, headers, read_only, **kwargs):
+        """The response and the number of nodes that failed before it"""
+        tried = set()
+        while True:
+            tried.add(server)
+            session = self.session
+            if self.nodes is not None and set(self.nodes.servers()) - tried:
+                session = self.failover_session
+            try:
+                r = session.request(
+                    method, f"{server}{path}", headers=headers, **kwargs
+                )
+                break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # a POST that may have reached the server is not sent again,
+                # unless it has an idempotency key
+                if self.nodes is None or not (
+                    connect_failed(e)
+                    or method in IDEMPOTENT_METHODS
+                    or "Idempotency-Key" in headers
+                ):
+                    raise
+                self.nodes.mark_failed(server)
+                # healthy nodes by latency first, then the ones that failed
+                nodes = self.nodes.ranked() + self.nodes.servers()
+                server = next((n for n in nodes if n not in tried), None)
+                if server is None:
+                    raise
+                if not read_only:
+                    log.warning("Servidor no disponible, usando: %s", server)
+                    self.server = server
+        if self.nodes is not None:
+            self.nodes.record(server, r.elapsed.total_seconds())
+        return r, len(tried) - 1
+
     def _discover_server(self) -> str:
+        return self.nodes.primary()
 
-        servers = self.cfg.get("servers", [])
-        return servers[1]
-        # for s in servers:
-        #     try:
-        #         r = requests.get(f"{s}/api/ping", timeout=self.cfg["time_out"])
-        #         if r.status_code == 200:
-        #             print(f"Conectado a servidor: {s}")
-        #             return s
-        #     except Exception:
-        #         continue
-        # raise RuntimeError(
-        #     "No hay servidores disponibles. Revisa ~/client/centralized/config.json"
-        # )
-
-    def _request_token(self) -> Optional[str]:
-        # simple request; server accepts JSON or form
-        username = os.getenv("CLIENT_USER", "user1")
+    def _request_token(self) -> Optional[Dict[str, Any]]:
+        """The server's token response; server accepts JSON or form"""
         try:
-            r = requests.post(
-                f"{self.server}/api/token",
-                json={"username": username},
-                timeout=self.cfg["time_out"],
+            r = self._request(
+                "POST",
+                "/api/token",
+                authenticate=False,
+                json={"username": self.username},
             )
-            r.raise_for_status()
-            return r.json().get("token")
+            return r.json()
         except Exception:
             # fallback to form
             try:
-                r = requests.post(
-                    f"{self.server}/api/token",
-                    data={"username": username},
-                    timeout=self.cfg["time_out"],
+                r = self._request(
+                    "POST",
+                    "/api/token",
+                    authenticate=False,
+                    data={"username": self.username},
                 )
-                r.raise_for_status()
-                return r.json().get("token")
+                return r.json()
             except Exception as e:
-                print("No se pudo obtener token:", e)
+                # kept for the GUIs, the client still works on open servers
+                self.token_error = e
+                log.warning("No se pudo obtener token: %s", e)
                 return None
 
-    def upload_dataset(self, file_path: str) -> Dict[str, Any]:
-        url = f"{self.server}/api/v1/training/dataset/upload"
+    def upload_dataset(
+        self, file_path: str, columns: List[str] = None, preprocess: bool = None
+    ) -> Dict[str, Any]:
         if not os.path.exists(file_path):
             raise FileNotFoundError(file_path)
+        if self._should_prepare(columns, preprocess):
+            return self._upload_prepared(file_path, None, columns)
+        if os.path.getsize(file_path) >= upload_config(self.cfg)["stream_threshold"]:
+            return self.upload_dataset_stream(file_path)
 
+        digest = self.dataset_cache.digest(file_path) if self.dataset_cache else None
+        known = self._known_dataset(digest)
+        if known:
+            return known
         with open(file_path, "rb") as file_data:
-            file = {"file": file_data}
-            r = requests.post(
-                url,
-                headers=self._headers(),
-                files=file,
-                timeout=self.cfg["time_out"],
+            response = self._upload_multipart(file_data, os.path.basename(file_path))
+        self._remember_dataset(digest, response)
+        return response
+
+    def upload_dataset_stream(
+        self,
+        source: Union[str, BinaryIO],
+        name: str = None,
+        columns: List[str] = None,
+        preprocess: bool = None,
+    ) -> Dict[str, Any]:
+        """Chunked, compressed and resumable upload of a path or a buffer"""
+        if self._should_prepare(columns, preprocess):
+            return self._upload_prepared(source, name, columns)
+        digest = self.dataset_cache.digest(source) if self.dataset_cache else None
+        known = self._known_dataset(digest)
+        if known:
+            return known
+        response = self._upload_stream(source, name, digest)
+        self._remember_dataset(digest, response)
+        return response
+
+    def _should_prepare(self, columns, preprocess: Optional[bool]) -> bool:
+        if preprocess is None:
+            enabled = self.cfg.get("preprocess", {}).get("enabled", False)
+            return bool(columns) or enabled
+        return preprocess
+
+    def _upload_prepared(
+        self, source: Union[str, BinaryIO], name: str, columns: List[str]
+    ) -> Dict[str, Any]:
+        """Uploads the compact (typed, column subset) version of a CSV"""
+        # pandas and pyarrow are only loaded when a dataset is prepared
+        from clients.centralized.preprocessing import (
+            DatasetPreprocessor,
+            preprocess_config,
+        )
+
+        prepared = DatasetPreprocessor(**preprocess_config(self.cfg)).prepare(
+            source, columns=columns
+        )
+        if prepared["path"] is None:
+            # a CSV without rows goes as it is
+            return self.upload_dataset_stream(source, name, preprocess=False)
+        name = name or (source if isinstance(source, str) else source.name)
+        name = os.path.splitext(os.path.basename(name))[0]
+        name += os.path.splitext(prepared["path"])[1]
+        path = prepared.pop("path")
+        try:
+            # uploaded as a stream so the temporary path doesn't end up in
+            # the dataset cache
+            with open(path, "rb") as f:
+                response = self.upload_dataset_stream(f, name, preprocess=False)
+        finally:
+            os.remove(path)
+        return {**response, "prepared": prepared}
+
+    def _known_dataset(self, digest: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Dataset id of content that was already uploaded, if any"""
+        if digest is None:
+            return None
+        dataset_id = self.dataset_cache.get(self.dataset_scope, digest)
+        if dataset_id is None and dataset_cache_config(self.cfg)["check_server"]:
+            r = self._request(
+                "GET", f"/api/v1/training/dataset/hash/{digest}", raise_for_status=False
             )
-            r.raise_for_status()
-            return r.json()
+            if r.status_code == 200:
+                dataset_id = r.json().get("dataset_id")
+                if dataset_id:
+                    self.dataset_cache.add(self.dataset_scope, digest, dataset_id)
+        if dataset_id is None:
+            return None
+        return {"dataset_id": dataset_id, "sha256": digest, "deduplicated": True}
+
+    def _remember_dataset(self, digest: Optional[str], response: Dict[str, Any]):
+        if digest is not None and response.get("dataset_id"):
+            self.dataset_cache.add(self.dataset_scope, digest, response["dataset_id"])
+
+    def _reupload(self, dataset_id: str) -> Optional[str]:
+        """Forgets a dataset id the server doesn't know (deleted or
+        expired) and uploads its file again if it is still on disk"""
+        if self.dataset_cache is None:
+            return None
+        for digest in self.dataset_cache.forget(self.dataset_scope, dataset_id):
+            path = self.dataset_cache.file_with(digest)
+            if path is not None:
+                log.warning("Dataset %s desconocido, subiendo %s", dataset_id, path)
+                return self.upload_dataset(path)["dataset_id"]
+        return None
+
+    def _upload_stream(
+        self, source: Union[str, BinaryIO], name: str = None, digest: str = None
+    ) -> Dict[str, Any]:
+        try:
+            return ChunkedUploader(self).upload(source, name, digest)
+        except ChunkedUploadUnsupported:
+            # the server only has the single request upload
+            if isinstance(source, str):
+                with open(source, "rb") as file_data:
+                    return self._upload_multipart(
+                        file_data, name or os.path.basename(source)
+                    )
+            source.seek(0)
+            return self._upload_multipart(source, name or source.name)
+
+    def _upload_multipart(self, file_data: BinaryIO, name: str) -> Dict[str, Any]:
+        file = {"file": (name, file_data)}
+        r = self._request("POST", "/api/v1/training/dataset/upload", files=file)
+        return r.json()
 
     def create_job(
-        self, dataset_id: str, task: str, models: list[str]
+        self,
+        dataset_id: str,
+        task: str,
+        models: list[str],
+        params: Optional[Dict[str, Any]] = None,
+        train_test_split: float = 0.2,
+        seed: int = 42,
+        idempotency_key: str = None,
     ) -> Dict[str, Any]:
-        url = f"{self.server}/api/v1/training/train"
         payload = {
             "dataset_id": dataset_id,
             "train_type": task,
             "model_names": models,
+            "train_test_split": train_test_split,
+            "seed": seed,
         }
-        print(payload)
-        r = requests.post(
-            url,
-            headers={**self._headers(), "Content-Type": "application/json"},
+        if params:
+            payload["params"] = params
+        headers = {"Content-Type": "application/json"}
+        if idempotency_key:
+            # the server answers a repeated key with the training it created
+            headers["Idempotency-Key"] = idempotency_key
+        r = self._request(
+            "POST",
+            "/api/v1/training/train",
+            raise_for_status=False,
+            headers=headers,
             json=payload,
         )
+        if _unknown_dataset(r):
+            # once: a dataset that was uploaded again is used right away
+            new_id = self._reupload(dataset_id)
+            if new_id is not None:
+                payload["dataset_id"] = new_id
+                r = self._request(
+                    "POST", "/api/v1/training/train", headers=headers, json=payload
+                )
+                return {**r.json(), "dataset_id": new_id}
         r.raise_for_status()
         return r.json()
 
+    def _cached_get(
+        self, kind: str, path: str, permanent=None, tabular: bool = False, **kwargs
+    ) -> Any:
+        """GET through the response cache. Fresh entries are served without
+        a request, stale ones are revalidated with their ETag and responses
+        for which `permanent(value)` is true are kept forever.
+
+        The format and encoding are negotiated (see WireFormat), `tabular`
+        endpoints may come as Arrow and are then kept as columns"""
+        cache = self.response_cache
+        headers = self.wire.headers(tabular)
+        if cache is None:
+            r = self._request("GET", path, read_only=True, headers=headers, **kwargs)
+            return self.wire.decode(r)
+        key = f"{self.username}:{path}"
+        if kwargs.get("params"):
+            key += "?" + "&".join(
+                f"{k}={v}" for k, v in sorted(kwargs["params"].items())
+            )
+        entry = cache.get(key)
+        if entry is not None and entry.fresh():
+            return entry.value
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        r = self._request("GET", path, read_only=True, headers=headers, **kwargs)
+        if r.status_code == 304 and entry is not None:
+            cache.refresh(key, kind, entry)
+            return entry.value
+        value = self.wire.decode(r)
+        cache.put(
+            key,
+            kind,
+            value,
+            etag=r.headers.get("ETag"),
+            permanent=bool(permanent and permanent(value)),
+        )
+        return value
+
     def get_job_status(self, job_id: str) -> Dict[str, Any]:
-        url = f"{self.server}/api/v1/training/train/{job_id}/status"
-        r = requests.get(url, headers=self._headers(), timeout=self.cfg["time_out"])
-        r.raise_for_status()
-        return r.json()
+        return self._cached_get(
+            "status",
+            f"/api/v1/training/train/{job_id}/status",
+            permanent=lambda s: s.get("status") in TERMINAL_STATES,
+        )
+
+    def get_jobs_status(self, job_ids: Iterable[str]) -> Dict[str, Any]:
+        """Status of many trainings at once: {job_id: status response}.
+
+        Uses the bulk endpoint when the server has it, otherwise one request
+        per job over the shared pool. Jobs that failed map to the exception.
+        """
+        job_ids = list(job_ids)
+        if not job_ids:
+            return {}
+        if self.bulk_status is not False:
+            r = self._request(
+                "POST",
+                "/api/v1/training/train/status",
+                raise_for_status=False,
+                read_only=True,
+                headers=self.wire.headers(),
+                json={"training_ids": job_ids},
+            )
+            if r.status_code in (404, 405, 501):
+                self.bulk_status = False
+            else:
+                r.raise_for_status()
+                self.bulk_status = True
+                statuses = self.wire.decode(r).get("statuses", [])
+                return {s["training_id"]: s for s in statuses}
+
+        def fetch(job_id):
+            try:
+                return self.get_job_status(job_id)
+            except Exception as e:
+                return e
+
+        workers = min(len(job_ids), http_config(self.cfg)["max_concurrency"])
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(job_ids, pool.map(fetch, job_ids)))
 
     def list_jobs(self, user_id: str = None) -> Dict[str, Any]:
-        url = f"{self.server}/api/jobs"
         params = {"user_id": user_id} if user_id else {}
-        r = requests.get(
-            url, headers=self._headers(), params=params, timeout=self.cfg["time_out"]
-        )
-        r.raise_for_status()
-        return r.json()
+        return self._cached_get("jobs", "/api/jobs", params=params)
 
     def get_results(self, job_id: str):
-        url = f"{self.server}/api/v1/training/train/{job_id}/results"
-        r = requests.get(url, headers=self._headers(), timeout=self.cfg["time_out"])
-        r.raise_for_status()
-        return r.json()
+        return nested(self._results(job_id))
 
-    def download_model(self, job_id: str, output_path: str = None) -> str:
-        url = f"{self.server}/api/jobs/{job_id}/model"
-        r = requests.get(
-            url, headers=self._headers(), stream=True, timeout=self.cfg["time_out"]
+    def get_results_columns(self, job_id: str) -> Dict[str, Any]:
+        """Results with the model metrics as long columns (model_name,
+        status, ..., metric, value) instead of one dict per model"""
+        return columnar(self._results(job_id))
+
+    def _results(self, job_id: str) -> Dict[str, Any]:
+        # results only change while the training runs
+        return self._cached_get(
+            "results",
+            f"/api/v1/training/train/{job_id}/results",
+            permanent=lambda r: r.get("status") in TERMINAL_STATES,
+            tabular=True,
         )
-        r.raise_for_status()
+
+    def download_model(self, job_id: str, output_path: str = None) -> str:
         out_path = output_path or f"model_{job_id}.pkl"
-        with open(out_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-        return out_path
+        return RangeDownloader(self).download(f"/api/jobs/{job_id}/model", out_path)
+
+    def download_models(
+        self, job_ids: Iterable[str], output_dir: str = "."
+    ) -> Dict[str, Any]:
+        """Downloads several models at once: {job_id: path or exception}"""
+        job_ids = list(job_ids)
+        os.makedirs(output_dir, exist_ok=True)
+
+        def fetch(job_id):
+            try:
+                return self.download_model(
+                    job_id, os.path.join(output_dir, f"model_{job_id}.pkl")
+                )
+            except Exception as e:
+                return e
+
+        workers = max(1, min(len(job_ids), download_config(self.cfg)["max_models"]))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(job_ids, pool.map(fetch, job_ids)))
 
     def update_server_list(self):
-        url = f"{self.server}/api/cluster/nodes"
-        r = requests.get(url, headers=self._headers(), timeout=self.cfg["time_out"])
+        r = self._request("GET", "/api/cluster/nodes", raise_for_status=False)
         if r.status_code == 200:
             nodes = r.json().get("nodes", [])
             self.cfg["servers"] = nodes
             save_config(self.cfg)
+            if self.nodes is not None:
+                self.nodes.set_servers(nodes)
             print("Lista de servidores actualizada:", nodes)
 
     def get_models(self, model_type: str) -> Dict[str, Any]:
-        url = f"{self.server}/api/v1/training/models/{model_type}"
-        r = requests.get(url, headers=self._headers(), timeout=self.cfg["time_out"])
-        r.raise_for_status()
-        return r.json()
+        return self._cached_get("models", f"/api/v1/training/models/{model_type}")
 
-    def predict(self, job_id, model_name, dataset_path):
-        return super().predict(job_id, model_name, dataset_path)
+    def predict(self, job_id, model_name, dataset_path, output_path=None):
+        from clients.centralized.inference import InferenceEngine
+
+        return InferenceEngine(self).predict(
+            job_id, model_name, dataset_path, output_path
+        )
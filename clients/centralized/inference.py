@@ -0,0 +1,211 @@
+import os, tempfile, threading
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple
+
+from clients.centralized.artifacts import (
+    ModelUnavailable,
+    load_artifact,
+    select_model,
+    features,
+)
+from clients.centralized.prediction_pipeline import ParallelPredictor
+
+DEFAULT_INFERENCE_CONFIG: Dict[str, Any] = {
+    "model_dir": "data/models",
+    "output_dir": "data/predictions",
+    "cache_bytes": 512 * 1024 * 1024,
+    "batch_rows": 50000,
+    "server_fallback": True,
+    "workers": None,
+    "chunk_bytes": 64 * 1024 * 1024,
+    "parallel_threshold": 128 * 1024 * 1024,
+}
+
+
+def inference_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_INFERENCE_CONFIG, **cfg.get("inference", {})}
+
+
+class ModelCache:
+    """Loaded artifacts by job id, least recently used ones are evicted
+    once the artifacts on disk add up to more than `max_bytes`"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._models: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str):
+        with self._lock:
+            entry = self._models.get(job_id)
+            if entry is None:
+                return None
+            self._models.move_to_end(job_id)
+            return entry[0]
+
+    def put(self, job_id: str, artifact, size: int):
+        with self._lock:
+            if job_id in self._models:
+                self._size -= self._models.pop(job_id)[1]
+            self._models[job_id] = (artifact, size)
+            self._size += size
+            while self._size > self.max_bytes and len(self._models) > 1:
+                _, (_, evicted) = self._models.popitem(last=False)
+                self._size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._size = 0
+
+
+_cache: Optional[ModelCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_model_cache(cfg: Dict[str, Any]) -> ModelCache:
+    """Process wide cache, Streamlit builds a new client on every rerun"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ModelCache(inference_config(cfg)["cache_bytes"])
+        return _cache
+
+
+class InferenceEngine:
+    """Scores prediction files locally with the trained artifact.
+
+    The artifact is downloaded once into model_dir, kept loaded in a
+    ModelCache and the CSV is read and predicted in batch_rows chunks, so
+    the file never has to fit in memory. Files above parallel_threshold,
+    and Parquet outputs, go through a ParallelPredictor process pool
+    instead. When there is no usable artifact the file is sent to the
+    server (server_fallback).
+    """
+
+    def __init__(self, client):
+        self.client = client
+        opts = inference_config(client.cfg)
+        self.model_dir = opts["model_dir"]
+        self.output_dir = opts["output_dir"]
+        self.batch_rows = opts["batch_rows"]
+        self.server_fallback = opts["server_fallback"]
+        self.workers = opts["workers"] or os.cpu_count() or 1
+        self.chunk_bytes = opts["chunk_bytes"]
+        self.parallel_threshold = opts["parallel_threshold"]
+        self.cache = get_model_cache(client.cfg)
+
+    def artifact_path(self, job_id: str) -> str:
+        return os.path.join(self.model_dir, f"model_{job_id}.pkl")
+
+    def fetch(self, job_id: str) -> str:
+        """Path of the artifact on disk, downloading it the first time"""
+        path = self.artifact_path(job_id)
+        if not os.path.exists(path):
+            os.makedirs(self.model_dir, exist_ok=True)
+            try:
+                self.client.download_model(job_id, path)
+            except Exception as e:
+                raise ModelUnavailable(f"Could not download model: {e}") from e
+        return path
+
+    def load(self, job_id: str):
+        artifact = self.cache.get(job_id)
+        if artifact is not None:
+            return artifact
+        path = self.fetch(job_id)
+        try:
+            artifact = load_artifact(path)
+        except Exception as e:
+            os.remove(path)
+            raise ModelUnavailable(f"Could not load {path}: {e}") from e
+        self.cache.put(job_id, artifact, os.path.getsize(path))
+        return artifact
+
+    def output_path(self, job_id: str, model_name: str, dataset_path: str) -> str:
+        """New file in output_dir, predictions of the same dataset and model
+        from two sessions don't overwrite each other"""
+        name = os.path.splitext(os.path.basename(dataset_path))[0]
+        os.makedirs(self.output_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(
+            prefix=f"{name}_{job_id}_{model_name}_", suffix=".csv", dir=self.output_dir
+        )
+        os.close(fd)
+        return path
+
+    def predict(
+        self,
+        job_id: str,
+        model_name: str,
+        dataset_path: str,
+        output_path: str = None,
+    ) -> Dict[str, Any]:
+        if not os.path.exists(dataset_path):
+            raise FileNotFoundError(dataset_path)
+        created = output_path is None
+        if created:
+            output_path = self.output_path(job_id, model_name, dataset_path)
+        parallel = output_path.endswith(".parquet") or (
+            self.workers > 1
+            and os.path.getsize(dataset_path) >= self.parallel_threshold
+        )
+        try:
+            if parallel:
+                rows = self._predict_parallel(
+                    job_id, model_name, dataset_path, output_path
+                )
+            else:
+                model = select_model(self.load(job_id), model_name)
+                rows = self._predict_serial(model, dataset_path, output_path)
+        except Exception as e:
+            if created:
+                os.remove(output_path)
+            if not isinstance(e, ModelUnavailable) or not self.server_fallback:
+                raise
+            return self.predict_remote(job_id, model_name, dataset_path)
+        return {
+            "job_id": job_id,
+            "model_name": model_name,
+            "rows": rows,
+            "output_path": output_path,
+            "source": "local",
+        }
+
+    def _predict_serial(self, model, dataset_path: str, output_path: str) -> int:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        rows = 0
+        header = True
+        for chunk in pd.read_csv(dataset_path, chunksize=self.batch_rows):
+            chunk["prediction"] = model.predict(features(model, chunk))
+            chunk.to_csv(
+                output_path, mode="w" if header else "a", header=header, index=False
+            )
+            header = False
+            rows += len(chunk)
+        return rows
+
+    def _predict_parallel(
+        self, job_id: str, model_name: str, dataset_path: str, output_path: str
+    ) -> int:
+        predictor = ParallelPredictor(self.fetch(job_id), model_name, self.workers)
+        try:
+            return predictor.run(dataset_path, output_path, self.chunk_bytes)
+        except BrokenProcessPool as e:
+            # the workers die in their initializer when the artifact can't
+            # be loaded or doesn't have the model
+            raise ModelUnavailable(f"Could not load model in workers: {e}") from e
+
+    def predict_remote(
+        self, job_id: str, model_name: str, dataset_path: str
+    ) -> Dict[str, Any]:
+        with open(dataset_path, "rb") as file_data:
+            r = self.client._request(
+                "POST",
+                f"/api/v1/training/train/{job_id}/predict",
+                data={"model_name": model_name},
+                files={"file": (os.path.basename(dataset_path), file_data)},
+            )
+        return {**r.json(), "source": "server"}
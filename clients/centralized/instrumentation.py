@@ -0,0 +1,442 @@
+import bisect, json, os, re, socket, threading, time, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Callable, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+DEFAULT_INSTRUMENTATION_CONFIG: Dict[str, Any] = {
+    "enabled": False,
+    "jsonl_path": None,
+    "spans_path": None,
+    "prometheus_port": None,
+}
+
+# seconds, upper bounds of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASES = ("dns", "connect", "tls", "send", "ttfb", "transfer")
+
+# path segments that are ids, so /train/<uuid>/status is one endpoint
+_ID_SEGMENT = re.compile(r"/(?:[0-9a-fA-F-]{16,}|\d+)(?=/|$)")
+
+_active = threading.local()
+
+
+def instrumentation_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_INSTRUMENTATION_CONFIG, **cfg.get("instrumentation", {})}
+
+
+def endpoint_of(method: str, path: str) -> str:
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])}"
+
+
+class RequestRecord:
+    """Everything measured about one HttpClient request. Phases are summed
+    over the attempts urllib3 made (retries, new connections)"""
+
+    __slots__ = (
+        ("id", "method", "path", "endpoint", "server", "status", "error")
+        + ("start", "duration", "bytes_sent", "bytes_received", "retries")
+        + ("failovers",)
+        + PHASES
+    )
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint_of(method, path)
+        self.server: Optional[str] = None
+        self.status: Optional[int] = None
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self.duration = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.failovers = 0
+        for phase in PHASES:
+            setattr(self, phase, 0.0)
+
+    def add(self, phase: str, seconds: float):
+        setattr(self, phase, getattr(self, phase) + seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def current() -> Optional[RequestRecord]:
+    return getattr(_active, "record", None)
+
+
+# ========= urllib3 connections that time their phases =========
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self) -> socket.socket:
+        record = current()
+        if record is None:
+            return super()._new_conn()
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(
+                host, self.port, allowed_gai_family(), socket.SOCK_STREAM
+            )
+        except OSError:
+            # urllib3 resolves again and raises its own error
+            return super()._new_conn()
+        record.add("dns", time.perf_counter() - start)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        start = time.perf_counter()
+        try:
+            # connect to the resolved addresses so the lookup isn't timed twice
+            for i, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError:
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+            record.add("connect", time.perf_counter() - start)
+
+    def connect(self):
+        record = current()
+        if record is None:
+            return super().connect()
+        before = record.dns + record.connect
+        start = time.perf_counter()
+        super().connect()
+        # what's left after the TCP connection is the TLS handshake
+        tls = time.perf_counter() - start - (record.dns + record.connect - before)
+        if isinstance(self, HTTPSConnection):
+            record.add("tls", max(0.0, tls))
+
+    def request(self, method, url, body=None, headers=None, **kwargs):
+        record = current()
+        if record is None:
+            return super().request(method, url, body, headers, **kwargs)
+        start = time.perf_counter()
+        super().request(method, url, body, headers, **kwargs)
+        record.add("send", time.perf_counter() - start)
+        self._sent_at = time.perf_counter()
+
+    def getresponse(self):
+        response = super().getresponse()
+        record = current()
+        if record is not None and getattr(self, "_sent_at", None):
+            record.add("ttfb", time.perf_counter() - self._sent_at)
+            self._sent_at = None
+        return response
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections time DNS, connect, TLS, send and TTFB
+    of the request being recorded in the current thread"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+# ========= Aggregation =========
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.phases = {phase: 0.0 for phase in PHASES}
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class Instrumentation:
+    """Collects a RequestRecord per HttpClient request.
+
+    `before` hooks get the record when the request starts, `after` hooks
+    when it ended, exporters are after hooks. Per endpoint counters and
+    latency histograms are kept for the Prometheus exporter.
+    """
+
+    def __init__(self):
+        self._before: List[Callable[[RequestRecord], None]] = []
+        self._after: List[Callable[[RequestRecord], None]] = []
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def before(self, hook: Callable[[RequestRecord], None]):
+        self._before.append(hook)
+        return hook
+
+    def after(self, hook: Callable[[RequestRecord], None]):
+        self._after.append(hook)
+        return hook
+
+    def begin(self, method: str, path: str) -> RequestRecord:
+        record = RequestRecord(method, path)
+        record.duration = time.perf_counter()
+        _active.record = record
+        for hook in self._before:
+            hook(record)
+        return record
+
+    def end(self, record: RequestRecord, response=None, error: Exception = None):
+        _active.record = None
+        record.duration = time.perf_counter() - record.duration
+        if response is not None:
+            record.status = response.status_code
+            record.server = response.url.split("/api", 1)[0]
+            record.bytes_sent = _body_size(response.request.body)
+            length = response.headers.get("Content-Length")
+            if length is not None:
+                record.bytes_received = int(length)
+            elif response._content_consumed and response._content:
+                record.bytes_received = len(response._content)
+            retries = getattr(response.raw, "retries", None)
+            record.retries = len(retries.history) if retries else 0
+        if error is not None:
+            record.error = f"{type(error).__name__}: {error}"
+        timed = sum(getattr(record, phase) for phase in PHASES)
+        record.transfer = max(0.0, record.duration - timed)
+        self._aggregate(record)
+        for hook in self._after:
+            try:
+                hook(record)
+            except Exception:
+                pass
+
+    def _aggregate(self, record: RequestRecord):
+        with self._lock:
+            stats = self.endpoints.get(record.endpoint)
+            if stats is None:
+                stats = self.endpoints[record.endpoint] = EndpointStats()
+            stats.latency.observe(record.duration)
+            stats.requests += 1
+            stats.errors += bool(record.error or (record.status or 0) >= 400)
+            stats.retries += record.retries
+            stats.bytes_sent += record.bytes_sent
+            stats.bytes_received += record.bytes_received
+            for phase in PHASES:
+                stats.phases[phase] += getattr(record, phase)
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    # streamed bodies (files, generators) are not measured
+    return 0
+
+
+# ========= Exporters =========
+
+
+class JsonlExporter:
+    """Appends every record as a JSON line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def __call__(self, record: RequestRecord):
+        line = json.dumps(record.as_dict())
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class SpanExporter:
+    """Records as OpenTelemetry-style spans, one event per phase.
+    Spans are kept in memory and, with a path, appended as JSON lines"""
+
+    def __init__(self, path: str = None, service: str = "distai-client"):
+        self.path = path
+        self.service = service
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, record: RequestRecord):
+        start = int(record.start * 1e9)
+        events = []
+        offset = start
+        for phase in PHASES:
+            seconds = getattr(record, phase)
+            if seconds:
+                events.append({"name": phase, "time_unix_nano": offset})
+                offset += int(seconds * 1e9)
+        span = {
+            "trace_id": record.id,
+            "span_id": record.id[:16],
+            "name": record.endpoint,
+            "kind": "CLIENT",
+            "start_time_unix_nano": start,
+            "end_time_unix_nano": start + int(record.duration * 1e9),
+            "status": "ERROR" if record.error else "OK",
+            "attributes": {
+                "service.name": self.service,
+                "http.method": record.method,
+                "http.route": record.endpoint.split(" ", 1)[1],
+                "http.status_code": record.status,
+                "server.address": record.server,
+                "http.request.body.size": record.bytes_sent,
+                "http.response.body.size": record.bytes_received,
+                "http.retry_count": record.retries,
+            },
+            "events": events,
+        }
+        with self._lock:
+            self.spans.append(span)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(span) + "\n")
+
+
+class PrometheusExporter:
+    """Prometheus text format of the Instrumentation counters, optionally
+    served on /metrics"""
+
+    def __init__(self, instrumentation: Instrumentation):
+        self.instrumentation = instrumentation
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def render(self) -> str:
+        inst = self.instrumentation
+        with inst._lock:
+            endpoints = list(inst.endpoints.items())
+        lines = [
+            "# TYPE distai_request_duration_seconds histogram",
+        ]
+        for endpoint, stats in endpoints:
+            method, route = endpoint.split(" ", 1)
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(stats.latency.buckets, stats.latency.counts):
+                cumulative += count
+                lines.append(
+                    f'distai_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'distai_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.latency.count}'
+            )
+            lines.append(
+                f"distai_request_duration_seconds_sum{{{labels}}} {stats.latency.sum}"
+            )
+            lines.append(
+                f"distai_request_duration_seconds_count{{{labels}}} {stats.latency.count}"
+            )
+        counters = [
+            ("distai_requests_total", "requests"),
+            ("distai_request_errors_total", "errors"),
+            ("distai_request_retries_total", "retries"),
+            ("distai_request_bytes_sent_total", "bytes_sent"),
+            ("distai_response_bytes_received_total", "bytes_received"),
+        ]
+        for name, attr in counters:
+            lines.append(f"# TYPE {name} counter")
+            for endpoint, stats in endpoints:
+                method, route = endpoint.split(" ", 1)
+                labels = f'method="{method}",route="{route}"'
+                lines.append(f"{name}{{{labels}}} {getattr(stats, attr)}")
+        lines.append("# TYPE distai_request_phase_seconds_total counter")
+        for endpoint, stats in endpoints:
+            method, route = endpoint.split(" ", 1)
+            for phase, seconds in stats.phases.items():
+                labels = f'method="{method}",route="{route}",phase="{phase}"'
+                lines.append(
+                    f"distai_request_phase_seconds_total{{{labels}}} {seconds}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+
+_instrumentation: Optional[Instrumentation] = None
+_lock = threading.Lock()
+
+
+def get_instrumentation(cfg: Dict[str, Any]) -> Optional[Instrumentation]:
+    """Process wide Instrumentation with the configured exporters, None
+    when disabled so HttpClient skips it entirely"""
+    global _instrumentation
+    opts = instrumentation_config(cfg)
+    if not opts["enabled"]:
+        return None
+    with _lock:
+        if _instrumentation is None:
+            inst = Instrumentation()
+            if opts["jsonl_path"]:
+                inst.after(JsonlExporter(opts["jsonl_path"]))
+            if opts["spans_path"]:
+                inst.after(SpanExporter(opts["spans_path"]))
+            if opts["prometheus_port"]:
+                inst.prometheus = PrometheusExporter(inst)
+                inst.prometheus.serve(opts["prometheus_port"])
+            _instrumentation = inst
+        return _instrumentation
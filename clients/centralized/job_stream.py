@@ -0,0 +1,332 @@
+import json, logging, os, socket, threading
+import requests
+from typing import Dict, Any, Optional, Callable, Iterable, Iterator, List
+
+from clients.centralized.job_watcher import JobWatcher, Subscriber, TERMINAL_STATES
+from clients.sidecar.protocol import SidecarError
+
+log = logging.getLogger(__name__)
+
+DEFAULT_STREAM_CONFIG: Dict[str, Any] = {
+    "path": "/api/v1/training/events",
+    # the server sends a comment at least this often while nothing changes
+    "read_timeout": 30.0,
+    "reconnect": 1.0,
+    "max_reconnect": 30.0,
+}
+
+# callback(event), event = {"training_id", "status", "progress", "models"}
+Listener = Callable[[Dict[str, Any]], None]
+
+# answers of servers without the events endpoint
+NO_STREAM_STATUS = (404, 405, 501)
+
+# seconds a read of the sidecar's events waits, newly tracked ids are
+# picked up after at most this long
+RELAY_WAIT = 1.0
+
+
+class ServerEvent:
+    def __init__(self):
+        self.id: Optional[str] = None
+        self.event = "message"
+        self.data: List[str] = []
+        self.retry: Optional[int] = None
+
+
+def parse_sse(lines: Iterable[str]) -> Iterator[ServerEvent]:
+    """Server-sent events from the lines of a text/event-stream body"""
+    event = ServerEvent()
+    for line in lines:
+        if not line:
+            if event.data or event.id is not None:
+                yield event
+            event = ServerEvent()
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "id":
+            event.id = value
+        elif field == "event":
+            event.event = value
+        elif field == "data":
+            event.data.append(value)
+        elif field == "retry" and value.isdigit():
+            event.retry = int(value)
+
+
+class JobStream:
+    """Live progress of trainings over one server-sent events connection.
+
+    Every tracked training is watched through a single stream of
+    `progress` events (status, overall and per model progress,
+    intermediate metrics). Dropped connections reconnect with
+    Last-Event-ID so no event is lost. Servers without the endpoint are
+    polled by a JobWatcher instead, which only reports statuses.
+
+    Same interface as JobWatcher: `subscribe` gets status changes,
+    `listen` every event.
+    """
+
+    def __init__(self, client, **options):
+        self.client = client
+        opts = {**DEFAULT_STREAM_CONFIG, **client.cfg.get("job_stream", {})}
+        opts.update(options)
+        self.path = opts["path"]
+        self.read_timeout = opts["read_timeout"]
+        self.reconnect = opts["reconnect"]
+        self.max_reconnect = opts["max_reconnect"]
+        # "stream" or "poll" once the server answered
+        self.mode: Optional[str] = None
+        self.last_event_id: Optional[str] = None
+        # streams opened so far, a reconnect after one starts its backoff over
+        self.connections = 0
+
+        self._jobs: Dict[str, Optional[str]] = {}
+        self._final: Dict[str, str] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: List[Subscriber] = []
+        self._listeners: List[Listener] = []
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._response: Optional[requests.Response] = None
+        self._resubscribe = False
+        self._watcher: Optional[JobWatcher] = None
+        self._relay_epoch: Optional[str] = None
+        self._relay_after: Optional[int] = None
+        self._synced: set = set()
+
+    def track(self, job_id: str, status: Optional[str] = None):
+        with self._lock:
+            if job_id in self._jobs or job_id in self._final:
+                return
+            if status in TERMINAL_STATES:
+                self._final[job_id] = status
+                return
+            self._jobs[job_id] = status
+            if self._watcher is not None:
+                self._watcher.track(job_id, status)
+            else:
+                # the stream is for a fixed set of ids, the stream thread
+                # opens a new one when it sees the flag
+                self._resubscribe = True
+                self._interrupt()
+        self._wakeup.set()
+
+    def track_many(self, job_ids: Iterable[str]):
+        for job_id in job_ids:
+            self.track(job_id)
+
+    def untrack(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._final.pop(job_id, None)
+            self._latest.pop(job_id, None)
+            if self._watcher is not None:
+                self._watcher.untrack(job_id)
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def listen(self, callback: Listener) -> Callable[[], None]:
+        with self._lock:
+            self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def statuses(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            return {**self._jobs, **self._final}
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return list(self._jobs)
+
+    def latest(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Last event received for the training"""
+        with self._lock:
+            return self._latest.get(job_id)
+
+    def _interrupt(self):
+        """Wakes the stream thread out of a blocked read. Only the socket is
+        shut down, the response is closed by the thread reading it"""
+        if self._response is None:
+            return
+        try:
+            # a duplicate of the descriptor, shutdown acts on the connection
+            with socket.socket(fileno=os.dup(self._response.raw.fileno())) as sock:
+                sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, ValueError):
+            pass
+
+    def _lines(self, r: requests.Response) -> Iterator[str]:
+        lines = r.iter_lines(decode_unicode=True)
+        while not (self._stop.is_set() or self._resubscribe):
+            line = next(lines, None)
+            if line is None:
+                return
+            yield line
+
+    def _handle(self, event: Dict[str, Any]):
+        job_id = event.get("training_id")
+        status = event.get("status")
+        with self._lock:
+            if job_id not in self._jobs and job_id not in self._final:
+                return
+            self._latest[job_id] = event
+            previous = self._jobs.get(job_id, self._final.get(job_id))
+            changed = status is not None and status != previous
+            if changed and status in TERMINAL_STATES:
+                self._jobs.pop(job_id, None)
+                self._final[job_id] = status
+            elif changed and job_id in self._jobs:
+                self._jobs[job_id] = status
+            listeners = list(self._listeners)
+            subscribers = list(self._subscribers) if changed else []
+        for callback in listeners:
+            try:
+                callback(event)
+            except Exception:
+                log.exception("Error en subscriptor de JobStream")
+        for callback in subscribers:
+            try:
+                callback(job_id, previous, status)
+            except Exception:
+                log.exception("Error en subscriptor de JobStream")
+
+    def _stream(self, job_ids: List[str]) -> bool:
+        """Reads events until the tracked trainings finish or the connection
+        drops. False when the server has no events endpoint"""
+        if hasattr(self.client, "events"):
+            return self._relay()
+        headers = {"Accept": "text/event-stream", "Cache-Control": "no-cache"}
+        if self.last_event_id is not None:
+            headers["Last-Event-ID"] = self.last_event_id
+        # the ids go in the body, a query string would outgrow URL limits
+        r = self.client._request(
+            "POST",
+            self.path,
+            json={"training_ids": job_ids},
+            raise_for_status=False,
+            stream=True,
+            headers=headers,
+            timeout=(self.client.timeout[0], self.read_timeout),
+        )
+        content_type = r.headers.get("Content-Type", "")
+        if r.status_code in NO_STREAM_STATUS or (
+            r.ok and not content_type.startswith("text/event-stream")
+        ):
+            r.close()
+            return False
+        r.raise_for_status()
+        self.mode = "stream"
+        self.connections += 1
+        # event streams are always UTF-8
+        r.encoding = "utf-8"
+        with self._lock:
+            self._response = r
+            # ids tracked after `job_ids` was taken aren't in this stream
+            if set(self.pending()) - set(job_ids):
+                self._resubscribe = True
+        try:
+            for event in parse_sse(self._lines(r)):
+                if event.id is not None:
+                    self.last_event_id = event.id
+                if event.retry is not None:
+                    self.reconnect = event.retry / 1000
+                if event.event == "progress" and event.data:
+                    self._handle(json.loads("\n".join(event.data)))
+                if self._stop.is_set() or not self.pending():
+                    break
+        finally:
+            with self._lock:
+                self._response = None
+            r.close()
+        return True
+
+    def _relay(self) -> bool:
+        """Events of the stream the sidecar daemon shares between sessions"""
+        self.mode = "sidecar"
+        while not self._stop.is_set():
+            job_ids = self.pending()
+            if not job_ids:
+                break
+            sync = [job_id for job_id in job_ids if job_id not in self._synced]
+            reply = self.client.events(job_ids, self._relay_after, sync, RELAY_WAIT)
+            epoch = reply.get("epoch")
+            if self._relay_epoch is not None and epoch != self._relay_epoch:
+                # the daemon restarted and counts from 0 again, read from its
+                # current position with a fresh snapshot of every training
+                self._relay_epoch, self._relay_after = epoch, None
+                self._synced.clear()
+                continue
+            self._relay_epoch = epoch
+            self._relay_after = reply["last"]
+            self._synced.update(sync)
+            for event in reply["events"]:
+                self._handle(event)
+        return True
+
+    def _poll_instead(self):
+        self.mode = "poll"
+        watcher = JobWatcher(self.client)
+        with self._lock:
+            for job_id, status in self._jobs.items():
+                watcher.track(job_id, status)
+            self._watcher = watcher
+        watcher.subscribe(
+            lambda job_id, old, new: self._handle(
+                {"training_id": job_id, "status": new}
+            )
+        )
+        watcher.start()
+
+    def _run(self):
+        delay = self.reconnect
+        while not self._stop.is_set():
+            with self._lock:
+                job_ids = self.pending()
+                self._resubscribe = False
+            if not job_ids:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            error, connections = None, self.connections
+            try:
+                if not self._stream(job_ids):
+                    return self._poll_instead()
+            except (requests.RequestException, OSError, ValueError, SidecarError) as e:
+                error = e
+            if self.connections != connections:
+                # a stream was open, the backoff starts over
+                delay = self.reconnect
+            if self._stop.is_set() or self._resubscribe or not self.pending():
+                continue
+            if error is not None:
+                log.warning("Conexion de eventos perdida, reintentando: %s", error)
+            self._stop.wait(delay)
+            if error is not None:
+                delay = min(delay * 2, self.max_reconnect)
+
+    def start(self) -> "JobStream":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        with self._lock:
+            self._interrupt()
+        if self._watcher is not None:
+            self._watcher.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
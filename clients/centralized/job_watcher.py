@@ -0,0 +1,176 @@
+import logging, threading, time
+from typing import Dict, Any, Optional, Callable, Iterable, List
+
+log = logging.getLogger(__name__)
+
+TERMINAL_STATES = frozenset(["completed", "failed"])
+
+DEFAULT_WATCHER_CONFIG: Dict[str, Any] = {
+    "min_interval": 2.0,
+    "max_interval": 60.0,
+    "backoff": 2.0,
+    "batch_size": 100,
+}
+
+# callback(job_id, old_status, new_status)
+Subscriber = Callable[[str, Optional[str], str], None]
+
+
+class _TrackedJob:
+    def __init__(self, status: Optional[str], interval: float):
+        self.status = status
+        self.interval = interval
+        self.next_poll = 0.0
+
+
+class JobWatcher:
+    """Keeps the status of every known training up to date.
+
+    Due jobs are fetched together with HttpClient.get_jobs_status, each job
+    waits longer between polls while its status doesn't change and stops
+    being polled once it reaches a terminal state.
+    """
+
+    def __init__(self, client, **options):
+        self.client = client
+        opts = {**DEFAULT_WATCHER_CONFIG, **client.cfg.get("job_watcher", {})}
+        opts.update(options)
+        self.min_interval = opts["min_interval"]
+        self.max_interval = opts["max_interval"]
+        self.backoff = opts["backoff"]
+        self.batch_size = opts["batch_size"]
+
+        self._jobs: Dict[str, _TrackedJob] = {}
+        self._final: Dict[str, str] = {}
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, job_id: str, status: Optional[str] = None):
+        with self._lock:
+            if job_id in self._jobs or job_id in self._final:
+                return
+            if status in TERMINAL_STATES:
+                self._final[job_id] = status
+            else:
+                self._jobs[job_id] = _TrackedJob(status, self.min_interval)
+        self._wakeup.set()
+
+    def track_many(self, job_ids: Iterable[str]):
+        for job_id in job_ids:
+            self.track(job_id)
+
+    def untrack(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._final.pop(job_id, None)
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def statuses(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            current = {id: job.status for id, job in self._jobs.items()}
+            return {**current, **self._final}
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return list(self._jobs)
+
+    def _due(self, now: float, force: bool) -> List[str]:
+        with self._lock:
+            return [
+                id for id, job in self._jobs.items() if force or job.next_poll <= now
+            ]
+
+    def poll(self, force: bool = False) -> Dict[str, str]:
+        """Fetches the due jobs once, returns {job_id: new_status} for the
+        ones that changed"""
+        now = time.monotonic()
+        due = self._due(now, force)
+        changes: Dict[str, str] = {}
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start : start + self.batch_size]
+            try:
+                responses = self.client.get_jobs_status(batch)
+            except Exception:
+                # polled again after the backoff, not on the next loop
+                with self._lock:
+                    for job_id in batch:
+                        job = self._jobs.get(job_id)
+                        if job is not None:
+                            self._back_off(job, now)
+                raise
+            for job_id in batch:
+                response = responses.get(job_id)
+                status = None
+                if isinstance(response, dict):
+                    status = response.get("status")
+                changed, previous = self._update(job_id, status, now)
+                if changed:
+                    changes[job_id] = status
+                    self._notify(job_id, previous, status)
+        return changes
+
+    def _update(self, job_id: str, status: Optional[str], now: float):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False, None
+            previous = job.status
+            if status is None or status == previous:
+                self._back_off(job, now)
+                return False, previous
+            if status in TERMINAL_STATES:
+                del self._jobs[job_id]
+                self._final[job_id] = status
+            else:
+                job.status = status
+                job.interval = self.min_interval
+                job.next_poll = now + job.interval
+            return True, previous
+
+    def _back_off(self, job: _TrackedJob, now: float):
+        job.interval = min(job.interval * self.backoff, self.max_interval)
+        job.next_poll = now + job.interval
+
+    def _notify(self, job_id: str, old: Optional[str], new: str):
+        for callback in list(self._subscribers):
+            try:
+                callback(job_id, old, new)
+            except Exception:
+                log.exception("Error en subscriptor de JobWatcher")
+
+    def _seconds_to_next_poll(self) -> float:
+        with self._lock:
+            if not self._jobs:
+                return self.max_interval
+            next_poll = min(job.next_poll for job in self._jobs.values())
+        return max(0.0, next_poll - time.monotonic())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                log.warning("Error consultando estados: %s", e)
+            self._wakeup.wait(self._seconds_to_next_poll())
+            self._wakeup.clear()
+
+    def start(self) -> "JobWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
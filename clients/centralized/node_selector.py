@@ -0,0 +1,174 @@
+import random, threading, time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+DEFAULT_NODES_CONFIG: Dict[str, Any] = {
+    "probe_timeout": 2.0,
+    "health_interval": 30.0,
+    "ewma_alpha": 0.3,
+    "spread_reads": False,
+}
+
+
+def nodes_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_NODES_CONFIG, **cfg.get("nodes", {})}
+
+
+def connect_failed(e: Exception) -> bool:
+    """True when the request never reached the server"""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(e, requests.exceptions.ConnectionError) or not e.args:
+        return False
+    reason = getattr(e.args[0], "reason", e.args[0])
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class Node:
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None
+        self.healthy = False
+        self.failed_at: Optional[float] = None
+
+
+class NodeSelector:
+    """Ranks the cluster nodes by latency.
+
+    Every node is pinged concurrently at start and then every
+    health_interval seconds, latencies are kept as an exponential moving
+    average that real requests also feed. Failed nodes are skipped until a
+    health check sees them answer again, unless they all failed: then the
+    one that failed longest ago is tried rather than none.
+
+    `session` is only used for the probes and should not retry, a dead
+    node must fail its probe at once.
+    """
+
+    def __init__(self, servers: List[str], session: requests.Session, **options):
+        opts = {**DEFAULT_NODES_CONFIG, **options}
+        self.session = session
+        self.probe_timeout = opts["probe_timeout"]
+        self.health_interval = opts["health_interval"]
+        self.alpha = opts["ewma_alpha"]
+        self.spread_reads = opts["spread_reads"]
+        self._nodes: Dict[str, Node] = {url: Node(url) for url in servers}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _update(self, node: Node, latency: float):
+        if node.latency is None:
+            node.latency = latency
+        else:
+            node.latency = self.alpha * latency + (1 - self.alpha) * node.latency
+
+    def probe(self, url: str) -> Optional[float]:
+        start = time.perf_counter()
+        try:
+            r = self.session.get(f"{url}/api/ping", timeout=self.probe_timeout)
+            if r.status_code != 200:
+                return None
+        except requests.RequestException:
+            return None
+        return time.perf_counter() - start
+
+    def probe_all(self):
+        urls = self.servers()
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            latencies = list(pool.map(self.probe, urls))
+        with self._lock:
+            for url, latency in zip(urls, latencies):
+                node = self._nodes.get(url)
+                if node is None:
+                    continue
+                node.healthy = latency is not None
+                if latency is not None:
+                    self._update(node, latency)
+                else:
+                    node.failed_at = time.monotonic()
+
+    def servers(self) -> List[str]:
+        with self._lock:
+            return list(self._nodes)
+
+    def set_servers(self, servers: List[str]):
+        with self._lock:
+            self._nodes = {url: self._nodes.get(url) or Node(url) for url in servers}
+        self.probe_all()
+
+    def ranked(self) -> List[str]:
+        with self._lock:
+            healthy = [n for n in self._nodes.values() if n.healthy]
+            return [n.url for n in sorted(healthy, key=lambda n: n.latency)]
+
+    def primary(self) -> str:
+        ranked = self.ranked()
+        if ranked:
+            return ranked[0]
+        with self._lock:
+            nodes = list(self._nodes.values())
+        if not nodes:
+            raise RuntimeError(
+                "No hay servidores disponibles. Revisa config/config.json"
+            )
+        # every node failed its last check, one may answer by now; nodes
+        # that never failed come first, in config order
+        return min(nodes, key=lambda n: n.failed_at or 0.0).url
+
+    def read_node(self) -> str:
+        """Node for a read-only call: the best one, or with spread_reads the
+        faster of two random healthy nodes (power of two choices)"""
+        ranked = self.ranked()
+        if not self.spread_reads or len(ranked) < 2:
+            return self.primary()
+        a, b = random.sample(ranked, 2)
+        return a if ranked.index(a) < ranked.index(b) else b
+
+    def record(self, url: str, latency: float):
+        with self._lock:
+            node = self._nodes.get(url)
+            if node is not None:
+                node.healthy = True
+                self._update(node, latency)
+
+    def mark_failed(self, url: str):
+        with self._lock:
+            node = self._nodes.get(url)
+            if node is not None:
+                node.healthy = False
+                node.failed_at = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.health_interval):
+            self.probe_all()
+
+    def start(self) -> "NodeSelector":
+        self.probe_all()
+        if self.health_interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_selectors: Dict[tuple, NodeSelector] = {}
+_lock = threading.Lock()
+
+
+def get_node_selector(cfg: Dict[str, Any], session: requests.Session) -> NodeSelector:
+    """Process wide selector, probed once and then kept fresh in background"""
+    servers = tuple(cfg.get("servers", []))
+    with _lock:
+        selector = _selectors.get(servers)
+        if selector is None:
+            selector = NodeSelector(list(servers), session, **nodes_config(cfg))
+            selector.start()
+            _selectors[servers] = selector
+        return selector
@@ -0,0 +1,167 @@
+import io, multiprocessing, os, shutil, tempfile
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from clients.centralized.artifacts import load_artifact, select_model, features
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# per worker process, set once by _init_worker
+_worker_model = None
+
+# the calling process runs threads (Streamlit tasks, urllib3 pools), a
+# forked child can inherit a lock one of them held and deadlock
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def split_csv(path: str, chunk_bytes: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """Header line and byte ranges of about `chunk_bytes` that start and end
+    on line boundaries. Quoted fields with newlines are not supported."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def read_range(path: str, header: bytes, start: int, end: int) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data))
+
+
+def column_dtypes(chunk: pd.DataFrame) -> Dict[str, object]:
+    """Dtypes every scored range is cast to, from the first range. Integer
+    and boolean columns are nullable so a later range with missing values
+    keeps the type instead of turning into float or object. Columns empty in
+    the first range are kept as nullable strings, whatever the later ones
+    hold, missing values stay missing"""
+    dtypes = {}
+    for name, dtype in chunk.dtypes.items():
+        if chunk[name].isna().all():
+            dtype = "string"
+        elif pd.api.types.is_bool_dtype(dtype):
+            dtype = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtype = "Int64"
+        dtypes[name] = dtype
+    return dtypes
+
+
+def _init_worker(artifact_path: str, model_name: str):
+    global _worker_model
+    _worker_model = select_model(load_artifact(artifact_path), model_name)
+
+
+def _score_range(
+    path: str,
+    header: bytes,
+    start: int,
+    end: int,
+    part_path: str,
+    fmt: str,
+    dtypes: Dict[str, object],
+) -> int:
+    chunk = read_range(path, header, start, end)
+    chunk["prediction"] = _worker_model.predict(features(_worker_model, chunk))
+    # the model sees the columns as parsed, the parts all get the same types
+    chunk = chunk.astype(dtypes)
+    if fmt == "parquet":
+        chunk.to_parquet(part_path, index=False)
+    else:
+        chunk.to_csv(part_path, index=False, header=False)
+    return len(chunk)
+
+
+class ParallelPredictor:
+    """Scores a CSV on a process pool.
+
+    The file is split in byte ranges, every worker loads the model once and
+    writes its scored range to a part file. Parts are appended to the output
+    in input order as soon as they are ready, so neither the input nor the
+    output are ever fully in memory. Column types are the ones of the first
+    range, see `column_dtypes`.
+    """
+
+    def __init__(self, artifact_path: str, model_name: str, workers: int = None):
+        self.artifact_path = artifact_path
+        self.model_name = model_name
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, dataset_path: str, output_path: str, chunk_bytes: int) -> int:
+        fmt = "parquet" if output_path.endswith(".parquet") else "csv"
+        if fmt == "parquet" and pq is None:
+            raise RuntimeError("Parquet output needs pyarrow installed")
+        header, ranges = split_csv(dataset_path, chunk_bytes)
+        dtypes = {}
+        if ranges:
+            dtypes = column_dtypes(read_range(dataset_path, header, *ranges[0]))
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix="predict_")
+        parts = [os.path.join(tmp_dir, f"{i}.{fmt}") for i in range(len(ranges))]
+        rows = 0
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(START_METHOD),
+                initializer=_init_worker,
+                initargs=(self.artifact_path, self.model_name),
+            ) as pool:
+                counts = pool.map(
+                    _score_range,
+                    [dataset_path] * len(ranges),
+                    [header] * len(ranges),
+                    [start for start, _ in ranges],
+                    [end for _, end in ranges],
+                    parts,
+                    [fmt] * len(ranges),
+                    [dtypes] * len(ranges),
+                )
+                if fmt == "parquet":
+                    rows = self._write_parquet(output_path, parts, counts)
+                else:
+                    rows = self._write_csv(output_path, header, parts, counts)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return rows
+
+    def _write_csv(self, output_path, header: bytes, parts, counts) -> int:
+        rows = 0
+        with open(output_path, "wb") as out:
+            out.write(header.rstrip(b"\r\n") + b",prediction\n")
+            for part, count in zip(parts, counts):
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+                os.remove(part)
+                rows += count
+        return rows
+
+    def _write_parquet(self, output_path, parts, counts) -> int:
+        rows = 0
+        writer = None
+        try:
+            for part, count in zip(parts, counts):
+                table = pq.read_table(part)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                os.remove(part)
+                rows += count
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
@@ -0,0 +1,187 @@
+import os, tempfile
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional, BinaryIO, List, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DEFAULT_PREPROCESS_CONFIG: Dict[str, Any] = {
+    "enabled": False,
+    "chunk_rows": 100000,
+    "format": "parquet",
+    "parquet_compression": "zstd",
+    "max_categories": 1000,
+    "float32": True,
+    "output_dir": "data/tmp/prepared",
+}
+
+INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+
+def preprocess_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_PREPROCESS_CONFIG, **cfg.get("preprocess", {})}
+
+
+class ColumnStats:
+    """What a column holds across every chunk seen so far"""
+
+    def __init__(self):
+        self.kind: Optional[str] = None  # bool, int, float, category or string
+        self.min = None
+        self.max = None
+        self.categories: Optional[set] = set()
+        # every numeric value seen is the same as a float32
+        self.exact32 = True
+
+    def update(self, values: pd.Series, max_categories: int):
+        if pd.api.types.is_bool_dtype(values):
+            kind = "bool"
+        elif pd.api.types.is_integer_dtype(values):
+            kind = "int"
+        elif pd.api.types.is_float_dtype(values):
+            kind = "float"
+        else:
+            kind = "category"
+        if self.kind is None or self.kind == kind:
+            self.kind = kind
+        elif {self.kind, kind} == {"int", "float"}:
+            self.kind = "float"
+        else:
+            self.kind = "string"
+
+        if kind in ("int", "float") and values.notna().any():
+            lo, hi = values.min(), values.max()
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+            if self.exact32:
+                present = values.dropna().to_numpy(np.float64)
+                self.exact32 = bool(np.array_equal(present.astype(np.float32), present))
+        if self.kind == "category" and self.categories is not None:
+            self.categories.update(values.dropna().astype(str).unique())
+            if len(self.categories) > max_categories:
+                self.categories = None
+        if self.categories is None and self.kind == "category":
+            self.kind = "string"
+
+    def dtype(self, float32: bool):
+        if self.kind == "int":
+            for t in INT_TYPES:
+                info = np.iinfo(t)
+                if info.min <= self.min and self.max <= info.max:
+                    return t
+            return np.int64
+        if self.kind == "bool":
+            return bool
+        if self.kind == "float":
+            # float32 only loses nothing when every value round-trips
+            return np.float32 if float32 and self.exact32 else np.float64
+        if self.kind == "category":
+            return pd.CategoricalDtype(sorted(self.categories))
+        return object
+
+
+class DatasetPreprocessor:
+    """Turns a CSV into a compact file before it is uploaded.
+
+    A first pass over the file in chunk_rows chunks finds the range of the
+    numeric columns and the values of the text ones, a second pass casts
+    every chunk to the smallest dtype that fits (ints to int8..int64, floats
+    to float32 when no value changes, text with at most max_categories
+    values to dictionary codes) and appends it to a Parquet or Arrow IPC
+    file. Only one chunk is in memory at a time. Without pyarrow the output
+    is a CSV with just the selected columns. A CSV without rows is not
+    converted, `path` is then None.
+    """
+
+    def __init__(self, **options):
+        opts = {**DEFAULT_PREPROCESS_CONFIG, **options}
+        self.chunk_rows = opts["chunk_rows"]
+        self.format = opts["format"] if pa is not None else "csv"
+        self.compression = opts["parquet_compression"]
+        self.max_categories = opts["max_categories"]
+        self.float32 = opts["float32"]
+        self.output_dir = opts["output_dir"]
+
+    def _chunks(self, source: Union[str, BinaryIO], columns: Optional[List[str]]):
+        if not isinstance(source, str):
+            source.seek(0)
+        return pd.read_csv(source, usecols=columns, chunksize=self.chunk_rows)
+
+    def scan(
+        self, source: Union[str, BinaryIO], columns: List[str] = None
+    ) -> Dict[str, ColumnStats]:
+        stats: Dict[str, ColumnStats] = {}
+        try:
+            chunks = self._chunks(source, columns)
+        except pd.errors.EmptyDataError:
+            return stats
+        for chunk in chunks:
+            for column in chunk.columns:
+                stats.setdefault(column, ColumnStats()).update(
+                    chunk[column], self.max_categories
+                )
+        return stats
+
+    def prepare(
+        self,
+        source: Union[str, BinaryIO],
+        output_path: str = None,
+        columns: List[str] = None,
+    ) -> Dict[str, Any]:
+        stats = self.scan(source, columns)
+        dtypes = {c: s.dtype(self.float32) for c, s in stats.items()}
+        if not stats:
+            # empty file
+            return {"path": None, "format": None, "rows": 0, "columns": {}}
+        if output_path is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            fd, output_path = tempfile.mkstemp(
+                suffix=SUFFIXES[self.format], dir=self.output_dir
+            )
+            os.close(fd)
+        rows = 0
+        writer = None
+        try:
+            for i, chunk in enumerate(self._chunks(source, columns)):
+                chunk = chunk.astype(dtypes)
+                rows += len(chunk)
+                if self.format == "csv":
+                    chunk.to_csv(
+                        output_path, mode="a" if i else "w", header=not i, index=False
+                    )
+                    continue
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    if self.format == "parquet":
+                        writer = pq.ParquetWriter(
+                            output_path, table.schema, compression=self.compression
+                        )
+                    else:
+                        writer = pa.ipc.new_file(output_path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if rows == 0:
+            # nothing to convert, servers can't read a table without rows
+            os.remove(output_path)
+            return {"path": None, "format": None, "rows": 0, "columns": {}}
+        return {
+            "path": output_path,
+            "format": self.format,
+            "rows": rows,
+            "columns": {
+                c: (
+                    "category"
+                    if isinstance(t, pd.CategoricalDtype)
+                    else np.dtype(t).name
+                )
+                for c, t in dtypes.items()
+            },
+            "bytes": os.path.getsize(output_path),
+        }
@@ -0,0 +1,198 @@
+import hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+DEFAULT_RESPONSE_CACHE_CONFIG: Dict[str, Any] = {
+    "enabled": True,
+    "ttls": {"models": 300, "results": 5, "status": 2, "jobs": 5},
+    "max_entries": 10000,
+    "disk_path": "data/cache/responses.db",
+}
+
+
+def response_cache_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    opts = {**DEFAULT_RESPONSE_CACHE_CONFIG, **cfg.get("response_cache", {})}
+    opts["ttls"] = {
+        **DEFAULT_RESPONSE_CACHE_CONFIG["ttls"],
+        **cfg.get("response_cache", {}).get("ttls", {}),
+    }
+    return opts
+
+
+class CacheEntry:
+    def __init__(self, value: Any, etag: Optional[str], expires: Optional[float]):
+        self.value = value
+        self.etag = etag
+        # None means it never expires (terminal trainings)
+        self.expires = expires
+
+    def fresh(self) -> bool:
+        return self.expires is None or self.expires > time.time()
+
+
+class DiskTier:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT, etag TEXT, expires REAL)"
+            )
+            # rows that expire were written by older versions, drop the stale
+            conn.execute(
+                "DELETE FROM responses WHERE expires IS NOT NULL AND expires < ?",
+                (time.time(),),
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        row = (
+            self._conn()
+            .execute("SELECT value, etag, expires FROM responses WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def permanent(
+        self, suffix: str = "", after: int = 0
+    ) -> Iterator[Tuple[int, str, Any]]:
+        """(rowid, key, value) of the entries that never expire, rowids only
+        grow so `after` lets a reader continue where it stopped"""
+        rows = self._conn().execute(
+            "SELECT rowid, key, value FROM responses "
+            "WHERE expires IS NULL AND rowid > ? AND key LIKE ? ORDER BY rowid",
+            (after, f"%{suffix}"),
+        )
+        for rowid, key, value in rows:
+            yield rowid, key, json.loads(value)
+
+    def put(self, key: str, entry: CacheEntry):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, json.dumps(entry.value), entry.etag, entry.expires),
+            )
+
+
+class ResponseCache:
+    """GET responses by path, with a TTL per kind of endpoint.
+
+    Stale entries that came with an ETag are revalidated with
+    If-None-Match instead of being downloaded again. Entries stored as
+    permanent (finished trainings) never expire. The optional DiskTier
+    keeps those across restarts, entries with a TTL stay in memory so
+    status polls don't cost a disk write.
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        max_entries: int = 10000,
+        disk: Optional[DiskTier] = None,
+    ):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.disk = disk
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+            return entry
+        return None
+
+    def _remember(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(
+        self,
+        key: str,
+        kind: str,
+        value: Any,
+        etag: Optional[str] = None,
+        permanent: bool = False,
+    ) -> CacheEntry:
+        expires = None if permanent else time.time() + self.ttls.get(kind, 0)
+        entry = CacheEntry(value, etag, expires)
+        self._remember(key, entry)
+        if self.disk is not None and permanent:
+            self.disk.put(key, entry)
+        return entry
+
+    def refresh(self, key: str, kind: str, entry: CacheEntry):
+        """The server answered 304, the entry is good for another TTL"""
+        self.put(key, kind, entry.value, entry.etag, entry.expires is None)
+
+    def permanent(
+        self, suffix: str = "", after: int = 0
+    ) -> Iterator[Tuple[int, str, Any]]:
+        """Entries that never expire. Without a disk tier there are no
+        rowids, every entry in memory is returned with rowid 0"""
+        if self.disk is not None:
+            yield from self.disk.permanent(suffix, after)
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+        for key, entry in entries:
+            if entry.expires is None and key.endswith(suffix):
+                yield 0, key, entry.value
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk is not None:
+            with self.disk._conn() as conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+
+_caches: Dict[Tuple[str, str], ResponseCache] = {}
+_cache_lock = threading.Lock()
+
+
+def user_disk_path(path: str, user: str) -> str:
+    """One disk file per user, so cached statuses and results of one user
+    are never read by another on the same machine"""
+    root, ext = os.path.splitext(path)
+    digest = hashlib.sha256(user.encode()).hexdigest()[:16]
+    return f"{root}-{digest}{ext}"
+
+
+def get_response_cache(cfg: Dict[str, Any], user: str) -> Optional[ResponseCache]:
+    """Process wide cache per user, None when disabled in the config"""
+    opts = response_cache_config(cfg)
+    if not opts["enabled"]:
+        return None
+    key = (opts["disk_path"] or "", user)
+    with _cache_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            disk = None
+            if opts["disk_path"]:
+                disk = DiskTier(user_disk_path(opts["disk_path"], user))
+            cache = ResponseCache(opts["ttls"], opts["max_entries"], disk)
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,95 @@
+import threading
+import requests
+from typing import Dict, Any, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from clients.centralized.instrumentation import TimedAdapter, instrumentation_config
+
+# POST is left out on purpose: a read error or a 5xx after the body was sent
+# may mean the server already created the job/dataset. Connection errors are
+# still retried for every method because nothing reached the server.
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE"])
+
+DEFAULT_HTTP_CONFIG: Dict[str, Any] = {
+    "pool_connections": 4,
+    "pool_maxsize": 16,
+    "keep_alive": True,
+    "connect_timeout": 3.05,
+    "read_timeout": 10,
+    "retries": 3,
+    # None: same as retries
+    "connect_retries": None,
+    "backoff_factor": 0.3,
+    "backoff_jitter": 0.2,
+    "status_forcelist": [429, 500, 502, 503, 504],
+    "max_concurrency": 32,
+}
+
+_sessions: Dict[Tuple, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def http_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    http = dict(DEFAULT_HTTP_CONFIG)
+    # old configs only have "time_out", keep honoring it as the read timeout
+    if "time_out" in cfg:
+        http["read_timeout"] = cfg["time_out"]
+    http.update(cfg.get("http", {}))
+    return http
+
+
+def get_timeout(cfg: Dict[str, Any]) -> Tuple[float, float]:
+    http = http_config(cfg)
+    return (http["connect_timeout"], http["read_timeout"])
+
+
+def build_session(cfg: Dict[str, Any], **overrides) -> requests.Session:
+    """`overrides` replace http settings, e.g. retries=0 for health probes"""
+    http = {**http_config(cfg), **overrides}
+    connect = http["connect_retries"]
+    retry = Retry(
+        total=http["retries"],
+        connect=http["retries"] if connect is None else connect,
+        read=http["retries"],
+        status=http["retries"],
+        backoff_factor=http["backoff_factor"],
+        backoff_jitter=http["backoff_jitter"],
+        status_forcelist=http["status_forcelist"],
+        allowed_methods=IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    # the timed adapter is only mounted when instrumentation is on, so a
+    # disabled client runs plain urllib3 connections
+    timed = instrumentation_config(cfg)["enabled"]
+    adapter = (TimedAdapter if timed else HTTPAdapter)(
+        pool_connections=http["pool_connections"],
+        pool_maxsize=http["pool_maxsize"],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not http["keep_alive"]:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def get_session(cfg: Dict[str, Any], **overrides) -> requests.Session:
+    """Process wide session, shared by every HttpClient with the same settings"""
+    http = {**http_config(cfg), **overrides}
+    key = tuple(sorted((k, str(v)) for k, v in http.items()))
+    key += (instrumentation_config(cfg)["enabled"],)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = build_session(cfg, **overrides)
+            _sessions[key] = session
+        return session
+
+
+def close_sessions():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,194 @@
+import argparse, hashlib, itertools, json, random, threading, time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+DEFAULT_SWEEP_CONFIG: Dict[str, Any] = {
+    "rate": 20,
+    "workers": 8,
+    "retries": 3,
+    "backoff_factor": 0.5,
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def sweep_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_SWEEP_CONFIG, **cfg.get("sweep", {})}
+
+
+def expand_grid(grid: Dict[str, list]) -> List[Dict[str, Any]]:
+    """{"a": [1, 2], "b": [3]} -> [{"a": 1, "b": 3}, {"a": 2, "b": 3}]"""
+    if not grid:
+        return [{}]
+    keys = sorted(grid)
+    return [
+        dict(zip(keys, values))
+        for values in itertools.product(*(grid[k] for k in keys))
+    ]
+
+
+def idempotency_key(spec: Dict[str, Any], namespace: str = "") -> str:
+    """Same spec, same key: resubmitting a sweep never duplicates trainings"""
+    body = json.dumps(spec, sort_keys=True)
+    return hashlib.sha256(f"{namespace}:{body}".encode()).hexdigest()[:32]
+
+
+def expand_sweep(
+    datasets: Iterable[str],
+    tasks: Iterable[str],
+    models: Union[List[str], Dict[str, List[str]]],
+    params: Optional[Dict[str, Dict[str, list]]] = None,
+    train_test_split: float = 0.2,
+    seeds: Iterable[int] = (42,),
+    namespace: str = "",
+) -> List[Dict[str, Any]]:
+    """create_job kwargs for every dataset x task x model x param combination.
+
+    `models` is a list or {task: [models]}, `params` is {model: grid}.
+    Models without a grid share one job, every grid combination of the
+    others is a job of its own.
+    """
+    params = params or {}
+    specs = []
+    for dataset_id, task, seed in itertools.product(datasets, tasks, seeds):
+        task_models = models.get(task, []) if isinstance(models, dict) else models
+        plain = [m for m in task_models if not params.get(m)]
+        jobs = [(plain, None)] if plain else []
+        for model in task_models:
+            if params.get(model):
+                jobs += [([model], combo) for combo in expand_grid(params[model])]
+        for job_models, combo in jobs:
+            spec = {
+                "dataset_id": dataset_id,
+                "task": task,
+                "models": job_models,
+                "params": combo,
+                "train_test_split": train_test_split,
+                "seed": seed,
+            }
+            spec["idempotency_key"] = idempotency_key(spec, namespace)
+            specs.append(spec)
+    return specs
+
+
+class RateLimiter:
+    """Spaces calls `1 / rate` seconds apart across threads"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._next - now)
+            self._next = max(now, self._next) + self.interval
+        if wait:
+            time.sleep(wait)
+
+
+class SweepRunner:
+    """Submits job specs concurrently, at most `rate` per second.
+
+    Every spec carries an idempotency key, so failed submissions are
+    retried without risk of creating the training twice. The created
+    trainings are written to the store in one batch at the end.
+    """
+
+    def __init__(self, client, store=None, **options):
+        opts = {**sweep_config(client.cfg), **options}
+        self.client = client
+        self.store = store
+        self.workers = opts["workers"]
+        self.retries = opts["retries"]
+        self.backoff_factor = opts["backoff_factor"]
+        self.limiter = RateLimiter(opts["rate"])
+
+    def _retryable(self, e: Exception) -> bool:
+        if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(e, "response", None)
+        return response is not None and response.status_code in RETRY_STATUS
+
+    def submit(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = self.client.create_job(**spec)
+                return {"spec": spec, "training_id": response.get("training_id")}
+            except Exception as e:
+                if attempt >= self.retries or not self._retryable(e):
+                    return {"spec": spec, "training_id": None, "error": str(e)}
+            time.sleep(self.backoff_factor * 2**attempt * (1 + random.random()))
+            attempt += 1
+
+    def run(self, specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not specs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(specs))) as pool:
+            results = list(pool.map(self.submit, specs))
+        if self.store is not None:
+            self.store.add_trainings(
+                {
+                    "id": r["training_id"],
+                    "model": model,
+                    "task": r["spec"]["task"],
+                    "dataset_id": r["spec"]["dataset_id"],
+                }
+                for r in results
+                if r["training_id"]
+                for model in r["spec"]["models"]
+            )
+        return results
+
+
+def load_sweep(path: str) -> List[Dict[str, Any]]:
+    """Job specs of a sweep file:
+    {"datasets", "tasks", "models", "params", "train_test_split", "seeds", "name"}
+    """
+    with open(path, "r") as f:
+        sweep = json.load(f)
+    return expand_sweep(
+        sweep["datasets"],
+        sweep["tasks"],
+        sweep["models"],
+        sweep.get("params"),
+        sweep.get("train_test_split", 0.2),
+        sweep.get("seeds", [42]),
+        sweep.get("name", ""),
+    )
+
+
+def main(argv=None):
+    from clients.centralized.http_client import HttpClient
+    from storage.local_store import get_store
+
+    parser = argparse.ArgumentParser(description="Lanza un barrido de entrenamientos")
+    parser.add_argument("sweep", help="archivo JSON del barrido")
+    parser.add_argument("--rate", type=float, help="envios por segundo")
+    parser.add_argument("--workers", type=int, help="envios concurrentes")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="solo muestra los entrenamientos"
+    )
+    args = parser.parse_args(argv)
+
+    specs = load_sweep(args.sweep)
+    print(f"{len(specs)} entrenamientos en el barrido")
+    if args.dry_run:
+        for spec in specs:
+            print(json.dumps({k: v for k, v in spec.items() if k != "idempotency_key"}))
+        return
+    client = HttpClient()
+    options = {k: v for k, v in (("rate", args.rate), ("workers", args.workers)) if v}
+    results = SweepRunner(client, get_store(client.cfg), **options).run(specs)
+    failed = [r for r in results if not r["training_id"]]
+    print(f"✅ Creados: {len(results) - len(failed)}")
+    for r in failed:
+        print(f"❌ {r['spec']['dataset_id']} {r['spec']['models']}: {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import base64, json, os, threading, time
+from typing import Dict, Any, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows, the store is then only locked per process
+    fcntl = None
+
+DEFAULT_TOKEN_CONFIG: Dict[str, Any] = {
+    "path": "data/cache/token.json",
+    # seconds before expiry at which a new token is requested in background
+    "refresh_margin": 60,
+    # lifetime of tokens whose expiry the server doesn't say, None = unknown
+    "ttl": None,
+    # seconds before asking again after the token request failed
+    "retry_failed": 30,
+}
+
+# returns the server's token response, e.g. {"token": ..., "expires_in": 3600}
+Fetch = Callable[[], Optional[Dict[str, Any]]]
+
+
+def token_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_TOKEN_CONFIG, **cfg.get("token_store", {})}
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """`exp` claim of a JWT, None for opaque tokens"""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (ValueError, AttributeError):
+        return None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class FileLock:
+    """Exclusive flock on `<path>.lock`, shared by every process"""
+
+    def __init__(self, path: str):
+        self.path = path + ".lock"
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class TokenStore:
+    """Tokens by user in a JSON file shared by every process and session.
+
+    Anything that isn't a JSON object (a missing file, another tool's
+    content) reads as an empty store.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = FileLock(path)
+
+    def read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def write(self, data: Dict[str, Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, user: str) -> Optional[Dict[str, Any]]:
+        entry = self.read().get(user)
+        return entry if isinstance(entry, dict) and entry.get("token") else None
+
+    def put(self, user: str, entry: Dict[str, Any]):
+        """Call holding `lock`"""
+        data = self.read()
+        data[user] = entry
+        self.write(data)
+
+
+class TokenManager:
+    """Token of one user, shared through a TokenStore.
+
+    `get` hands out the current token and, once it is within
+    refresh_margin of its expiry, refreshes it in background. `refresh`
+    after a 401 passes the rejected token as `stale`: concurrent refreshes
+    in this process wait for the first one, and the file lock lets other
+    processes reuse the token it stored instead of asking for another.
+    """
+
+    def __init__(
+        self,
+        store: TokenStore,
+        user: str,
+        refresh_margin: float = 60,
+        ttl: Optional[float] = None,
+        retry_failed: float = 30,
+    ):
+        self.store = store
+        self.user = user
+        self.refresh_margin = refresh_margin
+        self.ttl = ttl
+        self.retry_failed = retry_failed
+        self.failed: Optional[float] = None
+        self.token: Optional[str] = None
+        self.expires: Optional[float] = None
+        self.issued: Optional[float] = None
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._background: Optional[threading.Thread] = None
+
+    def seed(self, token: Optional[str]):
+        """Token from elsewhere (config.json), used until one is stored"""
+        if token and self.token is None:
+            self.token = token
+            self.expires = jwt_expiry(token)
+
+    def _adopt(self, entry: Optional[Dict[str, Any]]) -> bool:
+        if entry is None or self._expired(entry.get("expires")):
+            return False
+        self.token = entry["token"]
+        self.expires = entry.get("expires")
+        self.issued = entry.get("issued")
+        return True
+
+    def _expired(self, expires: Optional[float], margin: float = 0) -> bool:
+        return expires is not None and time.time() >= expires - margin
+
+    def _margin(self, expires: Optional[float], issued: Optional[float]) -> float:
+        # short lived tokens are refreshed after half their lifetime
+        if expires is None or issued is None:
+            return self.refresh_margin
+        return min(self.refresh_margin, (expires - issued) / 2)
+
+    def get(self, fetch: Fetch) -> Optional[str]:
+        token = self.token
+        if token is None and self.failed is not None:
+            # open servers have no token endpoint, don't ask on every request
+            if time.monotonic() - self.failed < self.retry_failed:
+                return None
+        if token is None or self._expired(self.expires):
+            return self.refresh(fetch, stale=token)
+        if self._expired(self.expires, self._margin(self.expires, self.issued)):
+            self._refresh_in_background(fetch, token)
+        return token
+
+    def _refresh_in_background(self, fetch: Fetch, stale: str):
+        with self._lock:
+            if self._background is not None and self._background.is_alive():
+                return
+            self._background = threading.Thread(
+                target=self.refresh, args=(fetch, stale, True), daemon=True
+            )
+            self._background.start()
+
+    def refresh(
+        self, fetch: Fetch, stale: Optional[str] = None, early: bool = False
+    ) -> Optional[str]:
+        """New token unless someone already replaced `stale`. `early`
+        refreshes still-valid tokens that are about to expire"""
+        with self._lock:
+            if self.token is not None and self.token != stale:
+                return self.token
+            with self.store.lock:
+                # another process may have refreshed while we waited
+                entry = self.store.get(self.user)
+                if (
+                    entry is not None
+                    and entry["token"] != stale
+                    and not (
+                        early
+                        and self._expired(
+                            entry.get("expires"),
+                            self._margin(entry.get("expires"), entry.get("issued")),
+                        )
+                    )
+                    and self._adopt(entry)
+                ):
+                    return self.token
+                response = fetch()
+                if not response or not response.get("token"):
+                    self.failed = time.monotonic()
+                    # keep a still valid token rather than dropping it
+                    return self.token if early else None
+                self.failed = None
+                self.token = response["token"]
+                self.issued = time.time()
+                self.expires = self._expiry(response)
+                self.refreshes += 1
+                self.store.put(
+                    self.user,
+                    {
+                        "token": self.token,
+                        "expires": self.expires,
+                        "issued": self.issued,
+                    },
+                )
+                return self.token
+
+    def _expiry(self, response: Dict[str, Any]) -> Optional[float]:
+        if response.get("expires_at") is not None:
+            return float(response["expires_at"])
+        if response.get("expires_in") is not None:
+            return time.time() + float(response["expires_in"])
+        expires = jwt_expiry(response["token"])
+        if expires is None and self.ttl:
+            expires = time.time() + self.ttl
+        return expires
+
+
+_managers: Dict[tuple, TokenManager] = {}
+_lock = threading.Lock()
+
+
+def get_token_manager(cfg: Dict[str, Any], user: str) -> TokenManager:
+    """Process wide manager per store and user, seeded from the shared
+    store and the token in config.json"""
+    opts = token_config(cfg)
+    key = (opts["path"], user)
+    with _lock:
+        manager = _managers.get(key)
+        if manager is None:
+            store = TokenStore(opts["path"])
+            manager = TokenManager(
+                store, user, opts["refresh_margin"], opts["ttl"], opts["retry_failed"]
+            )
+            if not manager._adopt(store.get(user)):
+                manager.seed(cfg.get("token"))
+            _managers[key] = manager
+        return manager
@@ -0,0 +1,200 @@
+import gzip, hashlib, json, os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, BinaryIO, Union
+
+from clients.centralized.dataset_cache import stream_digest
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_UPLOAD_CONFIG: Dict[str, Any] = {
+    "chunk_size": 8 * 1024 * 1024,
+    "workers": 4,
+    "compression": "gzip",
+    "compression_level": 1,
+    "state_dir": "data/tmp/uploads",
+    "stream_threshold": 64 * 1024 * 1024,
+}
+
+UPLOAD_PATH = "/api/v1/training/dataset/upload"
+
+
+class ChunkedUploadUnsupported(Exception):
+    pass
+
+
+def upload_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_UPLOAD_CONFIG, **cfg.get("upload", {})}
+
+
+def compress(data: bytes, encoding: str, level: int = 1) -> bytes:
+    # low levels: numeric CSVs gain little from higher ones and cost 4x more CPU
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return data
+
+
+class ChunkedUploader:
+    """Uploads a dataset in fixed size chunks.
+
+    Protocol (all under /api/v1/training/dataset/upload):
+        POST init                      -> {"upload_id"}
+        GET  {upload_id}               -> {"received": [chunk indexes]}
+        PUT  {upload_id}/chunks/{i}    body = chunk, X-Chunk-Sha256 header
+        POST {upload_id}/complete      -> {"dataset_id"}
+
+    Only `workers * 2` chunks are held in memory at a time, whatever the
+    size of the file. The upload id is saved under state_dir so an
+    interrupted upload of the same file continues from the chunks the
+    server already acknowledged. Buffers are matched by the sha256 of
+    their content, a path by its size and mtime.
+    """
+
+    def __init__(self, client, **options):
+        self.client = client
+        opts = {**upload_config(client.cfg), **options}
+        self.chunk_size = opts["chunk_size"]
+        self.workers = opts["workers"]
+        self.state_dir = opts["state_dir"]
+        self.encoding = opts["compression"] or "identity"
+        self.level = opts["compression_level"]
+        if self.encoding == "zstd" and zstandard is None:
+            self.encoding = "gzip"
+
+    def _state_path(self, source, digest: Optional[str]) -> str:
+        if digest is not None:
+            key = digest
+        elif isinstance(source, str):
+            st = os.stat(source)
+            key = f"{os.path.abspath(source)}:{st.st_size}:{st.st_mtime_ns}"
+        else:
+            # name and size don't tell two buffers apart, their content does
+            source.seek(0)
+            key = stream_digest(source)
+            source.seek(0)
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.state_dir, f"{digest}.json")
+
+    def _load_state(self, path: str) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            state = json.load(f)
+        if state.get("chunk_size") != self.chunk_size:
+            return None
+        return state
+
+    def _save_state(self, path: str, state: Dict[str, Any]):
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(state, f)
+
+    def _init(self, name: str, size: Optional[int]) -> str:
+        r = self.client._request(
+            "POST",
+            f"{UPLOAD_PATH}/init",
+            raise_for_status=False,
+            json={
+                "filename": name,
+                "size": size,
+                "chunk_size": self.chunk_size,
+                "encoding": self.encoding,
+            },
+        )
+        if r.status_code in (404, 405, 501):
+            raise ChunkedUploadUnsupported(name)
+        r.raise_for_status()
+        return r.json()["upload_id"]
+
+    def _received(self, upload_id: str) -> Optional[set]:
+        r = self.client._request(
+            "GET", f"{UPLOAD_PATH}/{upload_id}", raise_for_status=False
+        )
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return set(r.json().get("received", []))
+
+    def _send_chunk(self, upload_id: str, index: int, data: bytes):
+        body = compress(data, self.encoding, self.level)
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "X-Chunk-Sha256": hashlib.sha256(body).hexdigest(),
+        }
+        if self.encoding != "identity":
+            headers["Content-Encoding"] = self.encoding
+        self.client._request(
+            "PUT",
+            f"{UPLOAD_PATH}/{upload_id}/chunks/{index}",
+            headers=headers,
+            data=body,
+        )
+
+    def upload(
+        self, source: Union[str, BinaryIO], name: str = None, digest: str = None
+    ) -> Dict[str, Any]:
+        """`source` is a path or a readable binary buffer (e.g. a Streamlit
+        UploadedFile), buffers are read in place without a temp copy.
+        `digest` is the sha256 of the content when the caller has it"""
+        if isinstance(source, str):
+            if not os.path.exists(source):
+                raise FileNotFoundError(source)
+            name = name or os.path.basename(source)
+            size = os.path.getsize(source)
+            stream = open(source, "rb")
+        else:
+            name = name or getattr(source, "name", "dataset.csv")
+            size = getattr(source, "size", None)
+            stream = source
+            stream.seek(0)
+
+        state_path = self._state_path(source, digest)
+        state = self._load_state(state_path)
+        received = self._received(state["upload_id"]) if state else None
+        if received is None:
+            state = {
+                "upload_id": self._init(name, size),
+                "chunk_size": self.chunk_size,
+            }
+            received = set()
+            self._save_state(state_path, state)
+        upload_id = state["upload_id"]
+
+        file_hash = hashlib.sha256()
+        index = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                in_flight = set()
+                while True:
+                    data = stream.read(self.chunk_size)
+                    if not data:
+                        break
+                    file_hash.update(data)
+                    if index not in received:
+                        if len(in_flight) >= self.workers * 2:
+                            done, in_flight = wait(
+                                in_flight, return_when=FIRST_COMPLETED
+                            )
+                            for future in done:
+                                future.result()
+                        in_flight.add(
+                            pool.submit(self._send_chunk, upload_id, index, data)
+                        )
+                    index += 1
+                for future in in_flight:
+                    future.result()
+        finally:
+            if isinstance(source, str):
+                stream.close()
+
+        r = self.client._request(
+            "POST",
+            f"{UPLOAD_PATH}/{upload_id}/complete",
+            json={"chunks": index, "sha256": file_hash.hexdigest()},
+        )
+        os.remove(state_path)
+        return r.json()
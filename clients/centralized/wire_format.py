@@ -0,0 +1,160 @@
+import importlib.util, json
+import requests
+from urllib3.response import BaseHTTPResponse
+from typing import Dict, Any, List
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DEFAULT_WIRE_CONFIG: Dict[str, Any] = {
+    # preferred first, the ones this install can't decode are skipped and
+    # JSON is always accepted last
+    "formats": ["arrow", "msgpack", "json"],
+    "encodings": ["zstd", "gzip"],
+}
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+MEDIA_TYPES = {"json": JSON, "msgpack": MSGPACK, "arrow": ARROW}
+
+# schema metadata key of Arrow results with the training level fields
+ARROW_TRAINING_KEY = b"training"
+
+
+def wire_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_WIRE_CONFIG, **cfg.get("wire_format", {})}
+
+
+def available_formats() -> List[str]:
+    formats = ["json"]
+    if msgpack is not None:
+        formats.append("msgpack")
+    # pyarrow is only imported when an Arrow response arrives
+    if importlib.util.find_spec("pyarrow") is not None:
+        formats.append("arrow")
+    return formats
+
+
+def available_encodings() -> List[str]:
+    """Content encodings urllib3 decodes in this install"""
+    return list(BaseHTTPResponse.CONTENT_DECODERS)
+
+
+def columnar(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Results payload with its models as long columns under "columns":
+    the model fields plus metric and value, one row per model and metric.
+    Models without metrics get one row with metric None"""
+    if "columns" in results:
+        return results
+    models = [m for m in results.get("results") or [] if isinstance(m, dict)]
+    fields = list(dict.fromkeys(k for m in models for k in m if k != "metrics"))
+    columns: Dict[str, list] = {k: [] for k in fields + ["metric", "value"]}
+    for model in models:
+        metrics = model.get("metrics") or {None: None}
+        for metric, value in metrics.items():
+            for k in fields:
+                columns[k].append(model.get(k))
+            columns["metric"].append(metric)
+            columns["value"].append(value)
+    out = {k: v for k, v in results.items() if k != "results"}
+    out["columns"] = columns
+    return out
+
+
+def nested(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of `columnar`, the payload as the server sends it in JSON"""
+    if "columns" not in results:
+        return results
+    columns = results["columns"]
+    fields = [k for k in columns if k not in ("metric", "value")]
+    names = columns.get("model_name") or [None] * len(columns.get("metric", []))
+    models: Dict[Any, Dict[str, Any]] = {}
+    for i, name in enumerate(names):
+        model = models.get(name)
+        if model is None:
+            model = models[name] = {k: columns[k][i] for k in fields}
+            model["metrics"] = {}
+        metric = columns["metric"][i]
+        if metric is not None:
+            model["metrics"][metric] = columns["value"][i]
+    out = {k: v for k, v in results.items() if k != "columns"}
+    out["results"] = list(models.values())
+    return out
+
+
+def results_to_arrow(results: Dict[str, Any]) -> bytes:
+    """Arrow IPC stream of a results payload, for servers (and the
+    stand-in). Raises pyarrow errors for metric values that aren't scalars
+    of one type, those go as JSON or MessagePack"""
+    import pyarrow as pa
+
+    payload = columnar(results)
+    training = {k: v for k, v in payload.items() if k != "columns"}
+    table = pa.table(payload["columns"])
+    # model names, statuses and metric names repeat on every row
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type):
+            table = table.set_column(i, field.name, table[i].dictionary_encode())
+    table = table.replace_schema_metadata(
+        {ARROW_TRAINING_KEY: json.dumps(training).encode()}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def results_from_arrow(content: bytes) -> Dict[str, Any]:
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(content).read_all()
+    metadata = table.schema.metadata or {}
+    results = json.loads(metadata.get(ARROW_TRAINING_KEY, b"{}"))
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        column = column.combine_chunks()
+        if pa.types.is_dictionary(column.type):
+            # to_pylist of dictionary arrays goes value by value, much slower
+            column = column.dictionary_decode()
+        columns[name] = column.to_pylist()
+    results["columns"] = columns
+    return results
+
+
+class WireFormat:
+    """Accept and Accept-Encoding of the read endpoints (results, status,
+    models, jobs) and the decoding of whatever the server chose.
+
+    Servers that only speak JSON answer JSON, every format is decoded by
+    Content-Type so the fallback needs no extra request. Arrow is only
+    offered for results, they are decoded to columns (see `columnar`).
+    """
+
+    def __init__(self, cfg: Dict[str, Any]):
+        opts = wire_config(cfg)
+        formats, encodings = available_formats(), available_encodings()
+        self.formats = [f for f in opts["formats"] if f in formats and f != "json"]
+        self.formats.append("json")
+        self.encodings = [e for e in opts["encodings"] if e in encodings]
+
+    def headers(self, tabular: bool = False) -> Dict[str, str]:
+        types = [MEDIA_TYPES[f] for f in self.formats if tabular or f != "arrow"]
+        accept = ", ".join(
+            t if i == 0 else f"{t};q={max(0.1, 1 - i / 10):.1f}"
+            for i, t in enumerate(types)
+        )
+        return {
+            "Accept": accept,
+            "Accept-Encoding": ", ".join(self.encodings) or "identity",
+        }
+
+    def decode(self, r: requests.Response) -> Any:
+        kind = r.headers.get("Content-Type", "").split(";")[0].strip()
+        if kind == ARROW:
+            return results_from_arrow(r.content)
+        if kind in (MSGPACK, "application/x-msgpack") and msgpack is not None:
+            return msgpack.unpackb(r.content, strict_map_key=False)
+        return r.json()
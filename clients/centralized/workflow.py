@@ -0,0 +1,403 @@
+import argparse, json, logging, os, threading, time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, List
+
+from clients.centralized.job_stream import JobStream
+from clients.centralized.job_watcher import TERMINAL_STATES
+from clients.centralized.sweep import idempotency_key
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+log = logging.getLogger(__name__)
+
+STAGES = ("upload", "train", "wait", "download", "predict")
+
+DEFAULT_WORKFLOW_CONFIG: Dict[str, Any] = {
+    # workers per stage, `wait` is also the number of trainings running at once
+    "concurrency": {"upload": 2, "train": 4, "wait": 16, "download": 2, "predict": 2},
+    "checkpoint_dir": "data/workflows",
+}
+
+# keys a dataset entry inherits from the workflow
+INHERITED = ("task", "models", "params", "train_test_split", "seed", "predict")
+
+
+def workflow_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    opts = {**DEFAULT_WORKFLOW_CONFIG, **cfg.get("workflows", {})}
+    opts["concurrency"] = {
+        **DEFAULT_WORKFLOW_CONFIG["concurrency"],
+        **opts.get("concurrency", {}),
+    }
+    return opts
+
+
+def load_workflow(path: str) -> Dict[str, Any]:
+    """Workflow file, JSON or YAML (needs PyYAML):
+
+    name, task, models, params, train_test_split, seed, predict, stages,
+    concurrency, output_dir, and datasets: a list of paths or of
+    {"path" or "dataset_id", plus any workflow key to override}
+    """
+    with open(path, "r") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError("Instala PyYAML para leer flujos en YAML")
+            workflow = yaml.safe_load(f)
+        else:
+            workflow = json.load(f)
+    workflow.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return workflow
+
+
+def expand_chains(workflow: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One chain (upload -> ... -> predict) per dataset of the workflow"""
+    chains = []
+    for i, entry in enumerate(workflow.get("datasets", [])):
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        chain = {key: workflow.get(key) for key in INHERITED}
+        chain.update(entry)
+        chain.setdefault("train_test_split", 0.2)
+        chain["seed"] = 42 if chain.get("seed") is None else chain["seed"]
+        chain["key"] = f"{i}:{chain.get('path') or chain.get('dataset_id')}"
+        chains.append(chain)
+    return chains
+
+
+def fingerprint(chain: Dict[str, Any]) -> str:
+    """Changes when the dataset file or the job settings change, so a
+    checkpoint of another version of the chain is not reused"""
+    spec = {key: chain.get(key) for key in INHERITED + ("path", "dataset_id")}
+    if chain.get("path") and os.path.exists(chain["path"]):
+        st = os.stat(chain["path"])
+        spec["file"] = [st.st_size, st.st_mtime_ns]
+    return idempotency_key(spec)
+
+
+class Checkpoint:
+    """Results of the finished stages of every chain in a JSON file,
+    rewritten after each stage"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.chains: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.chains = json.load(f).get("chains", {})
+
+    def stages(self, key: str, fingerprint: str) -> Dict[str, Any]:
+        with self._lock:
+            chain = self.chains.get(key)
+            if chain is None or chain.get("fingerprint") != fingerprint:
+                chain = self.chains[key] = {"fingerprint": fingerprint, "stages": {}}
+            return dict(chain["stages"])
+
+    def done(self, key: str, stage: str, result: Dict[str, Any]):
+        with self._lock:
+            self.chains[key]["stages"][stage] = result
+            self.chains[key].pop("error", None)
+            self._save()
+
+    def attempts(self, key: str) -> int:
+        with self._lock:
+            return self.chains.get(key, {}).get("attempts", 0)
+
+    def retry(self, key: str, stage: str):
+        """Drops a finished stage so the next run does it again, as a new
+        attempt"""
+        with self._lock:
+            chain = self.chains[key]
+            chain["stages"].pop(stage, None)
+            chain["attempts"] = chain.get("attempts", 0) + 1
+            self._save()
+
+    def failed(self, key: str, stage: str, error: str):
+        with self._lock:
+            self.chains[key]["error"] = {"stage": stage, "error": error}
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"chains": self.chains}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class WorkflowRunner:
+    """Runs every chain of a workflow, stages of different chains overlap.
+
+    Each stage has its own pool, sized by `concurrency`, and a chain moves
+    to the next stage's pool as soon as a stage finishes: dataset B
+    uploads while A trains, and A's model downloads as soon as it is
+    done. Trainings are followed with one JobStream and at most
+    concurrency["wait"] run at once. Finished stages are checkpointed, a
+    new run of the same workflow only does what is left. `stop` ends a run
+    from another thread.
+    """
+
+    def __init__(
+        self, client, workflow: Dict[str, Any], checkpoint: str = None, store=None
+    ):
+        self.client = client
+        self.workflow = workflow
+        self.name = workflow["name"]
+        self.store = store
+        opts = workflow_config(client.cfg)
+        concurrency = {**opts["concurrency"], **workflow.get("concurrency", {})}
+        self.stages = [s for s in workflow.get("stages", STAGES) if s in STAGES]
+        self.output_dir = workflow.get("output_dir")
+        self.checkpoint = Checkpoint(
+            checkpoint or os.path.join(opts["checkpoint_dir"], f"{self.name}.json")
+        )
+        self.pools = {
+            stage: ThreadPoolExecutor(max_workers=concurrency[stage])
+            for stage in STAGES
+        }
+        self.running = threading.Semaphore(concurrency["wait"])
+        self.stream = JobStream(client)
+        self.stream.subscribe(self._on_status)
+        self._finished: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._all_done = threading.Event()
+        self._stopped = threading.Event()
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    # ========= Stages =========
+
+    def upload(self, chain, done) -> Dict[str, Any]:
+        response = self.client.upload_dataset(chain["path"])
+        if self.store is not None:
+            self.store.add_dataset(
+                response.get("dataset_id"), os.path.basename(chain["path"])
+            )
+        return {"dataset_id": response["dataset_id"]}
+
+    def train(self, chain, done) -> Dict[str, Any]:
+        spec = {
+            "dataset_id": self._dataset_id(chain, done),
+            "task": chain["task"],
+            "models": chain["models"],
+            "params": chain.get("params"),
+            "train_test_split": chain["train_test_split"],
+            "seed": chain["seed"],
+        }
+        # the same key after a crash returns the training already created,
+        # a training that failed is retried under a new one
+        attempt = self.checkpoint.attempts(chain["key"])
+        spec["idempotency_key"] = idempotency_key(
+            {**spec, "attempt": attempt} if attempt else spec, f"workflow:{self.name}"
+        )
+        if "wait" in self.stages:
+            self.running.acquire()
+            chain["_slot"] = True
+        try:
+            response = self.client.create_job(**spec)
+        except Exception:
+            self._release(chain)
+            raise
+        if self.store is not None:
+            self.store.add_trainings(
+                {
+                    "id": response["training_id"],
+                    "model": model,
+                    "task": chain["task"],
+                    "dataset_id": spec["dataset_id"],
+                }
+                for model in chain["models"]
+            )
+        return {"training_id": response["training_id"]}
+
+    def wait(self, chain, done) -> Dict[str, Any]:
+        training_id = done["train"]["training_id"]
+        with self._lock:
+            finished = self._finished.setdefault(training_id, threading.Event())
+            if self._stopped.is_set():
+                finished.set()
+        try:
+            self.stream.track(training_id)
+            # already followed and finished, e.g. two chains with the same job
+            if self.stream.statuses().get(training_id) in TERMINAL_STATES:
+                finished.set()
+            finished.wait()
+        finally:
+            self._release(chain)
+        if self._stopped.is_set():
+            raise RuntimeError("Flujo detenido")
+        status = self.stream.statuses().get(training_id)
+        if status == "failed":
+            self.checkpoint.retry(chain["key"], "train")
+        if status != "completed":
+            raise RuntimeError(f"El entrenamiento {training_id} termino como {status}")
+        results = self.client.get_results(training_id)
+        return {"status": status, "results": results.get("results", [])}
+
+    def download(self, chain, done) -> Dict[str, Any]:
+        from clients.centralized.inference import InferenceEngine
+
+        training_id = done["train"]["training_id"]
+        # where InferenceEngine looks for it, so predict doesn't download again
+        return {"model_path": InferenceEngine(self.client).fetch(training_id)}
+
+    def predict(self, chain, done) -> Dict[str, Any]:
+        from clients.centralized.inference import InferenceEngine
+
+        training_id = done["train"]["training_id"]
+        engine = InferenceEngine(self.client)
+        outputs = {}
+        for model in chain["models"]:
+            output_path = None
+            if self.output_dir:
+                name = os.path.splitext(os.path.basename(chain["predict"]))[0]
+                output_path = os.path.join(
+                    self.output_dir, f"{name}_{training_id}_{model}.csv"
+                )
+            response = engine.predict(training_id, model, chain["predict"], output_path)
+            outputs[model] = response.get("output_path")
+        return {"outputs": outputs}
+
+    # ========= Scheduling =========
+
+    def _dataset_id(self, chain, done) -> str:
+        return done.get("upload", {}).get("dataset_id") or chain["dataset_id"]
+
+    def _release(self, chain):
+        if chain.pop("_slot", False):
+            self.running.release()
+
+    def _on_status(self, training_id: str, old, new: str):
+        if new in TERMINAL_STATES:
+            with self._lock:
+                finished = self._finished.setdefault(training_id, threading.Event())
+            finished.set()
+
+    def _applies(self, chain, stage: str) -> bool:
+        if stage == "upload":
+            return bool(chain.get("path"))
+        if stage == "predict":
+            return bool(chain.get("predict"))
+        return True
+
+    def _advance(self, chain, done: Dict[str, Any]) -> bool:
+        """Sends the chain to the pool of its next unfinished stage, False
+        when no stage is left"""
+        for stage in self.stages:
+            if stage in done or not self._applies(chain, stage):
+                continue
+            future = self.pools[stage].submit(getattr(self, stage), chain, done)
+            future.add_done_callback(
+                lambda f, stage=stage: self._stage_done(chain, done, stage, f)
+            )
+            return True
+        return False
+
+    def _start(self, chain):
+        done, error = {}, None
+        try:
+            done = self.checkpoint.stages(chain["key"], fingerprint(chain))
+            if self._advance(chain, done):
+                return
+        except Exception as e:
+            error = str(e)
+        self._chain_done(chain, done, "start", error)
+
+    def _stage_done(self, chain, done, stage: str, future: Future):
+        # whatever goes wrong here, the chain is counted as done unless it
+        # moved on to its next stage, or run() would wait for it forever
+        error, moved_on = None, False
+        try:
+            if future.cancelled():
+                error = "Flujo detenido"
+            elif future.exception() is not None:
+                error = str(future.exception())
+            else:
+                done[stage] = future.result()
+                self.checkpoint.done(chain["key"], stage, done[stage])
+                print(f"✅ {chain['key']} {stage}")
+                moved_on = self._advance(chain, done)
+        except Exception as e:
+            error = str(e)
+        finally:
+            if not moved_on:
+                self._chain_done(chain, done, stage, error)
+
+    def _chain_done(self, chain, done, stage: str, error: str = None):
+        try:
+            self._release(chain)
+            self.results[chain["key"]] = {
+                "stages": done,
+                "error": None if error is None else {"stage": stage, "error": error},
+            }
+            if error is not None:
+                print(f"❌ {chain['key']} {stage}: {error}")
+                self.checkpoint.failed(chain["key"], stage, error)
+        except Exception:
+            log.exception("%s: no se pudo guardar el progreso", chain["key"])
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._all_done.set()
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        chains = expand_chains(self.workflow)
+        if not chains:
+            return {}
+        self._pending = len(chains)
+        self.stream.start()
+        try:
+            for chain in chains:
+                self._start(chain)
+            self._all_done.wait()
+        finally:
+            self.stop()
+        return self.results
+
+    def stop(self):
+        """Cancels the queued stages, ends the ones waiting on a training
+        and makes run() return the results so far"""
+        with self._lock:
+            self._stopped.set()
+            for finished in self._finished.values():
+                finished.set()
+        for pool in self.pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.stream.stop()
+        self._all_done.set()
+
+
+def main(argv=None):
+    from clients.centralized.http_client import HttpClient
+    from storage.local_store import get_store
+
+    parser = argparse.ArgumentParser(description="Ejecuta un flujo de trabajo")
+    parser.add_argument("workflow", help="archivo JSON o YAML del flujo")
+    parser.add_argument("--checkpoint", help="archivo de progreso del flujo")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="solo muestra las cadenas"
+    )
+    args = parser.parse_args(argv)
+
+    workflow = load_workflow(args.workflow)
+    if args.dry_run:
+        for chain in expand_chains(workflow):
+            print(json.dumps(chain))
+        return
+    client = HttpClient()
+    runner = WorkflowRunner(client, workflow, args.checkpoint, get_store(client.cfg))
+    start = time.monotonic()
+    results = runner.run()
+    failed = [key for key, r in results.items() if r["error"]]
+    print(
+        f"Flujo {workflow['name']}: {len(results) - len(failed)} cadenas completas, "
+        f"{len(failed)} con errores en {time.monotonic() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import os, random, shutil, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, BinaryIO, Iterable, Iterator, List, Optional
+
+from models.base_client import BaseClient
+from clients.centralized.http_client import HttpClient
+
+DEFAULT_DISTRIBUTED_CONFIG: Dict[str, Any] = {
+    # shards per dataset, None = one per node
+    "shards": None,
+    # smaller files are uploaded whole to one node
+    "min_shard_size": 64 * 1024 * 1024,
+    "workers": 8,
+    "tmp_dir": "data/tmp/shards",
+}
+
+NODES_PATH = "/api/cluster/nodes"
+LOGICAL_PATH = "/api/v1/training/dataset/logical"
+SPLITS = ("train", "test")
+
+
+def distributed_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_DISTRIBUTED_CONFIG, **cfg.get("distributed", {})}
+
+
+def _records(source: BinaryIO) -> Iterator[bytes]:
+    """Raw CSV records. A line with an odd number of quotes opens a quoted
+    field that goes on in the next line, so records aren't parsed"""
+    pending = b""
+    for line in source:
+        pending += line
+        if pending.count(b'"') % 2 == 0:
+            yield pending
+            pending = b""
+    if pending:
+        yield pending
+
+
+def shard_csv(
+    file_path: str,
+    output_dir: str,
+    shards: int,
+    train_test_split: float = 0.2,
+    seed: int = 42,
+) -> List[Dict[str, Any]]:
+    """Splits a CSV into `shards` train parts and `shards` test parts.
+
+    One seeded draw per row decides train or test, so the same file, split
+    and seed always give the same parts whatever the number of nodes.
+    Rows of each split go round-robin to the shards, keeping them within
+    one row of each other. Every part keeps the header.
+    """
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    draw = random.Random(seed).random
+    parts, files = [], []
+    try:
+        with open(file_path, "rb") as source:
+            records = _records(source)
+            header = next(records, None)
+            if header is None:
+                raise ValueError(f"{file_path} esta vacio")
+            if not header.endswith(b"\n"):
+                header += b"\n"
+            outputs = {}
+            for split in SPLITS if train_test_split > 0 else ("train",):
+                outputs[split] = []
+                for shard in range(shards):
+                    path = os.path.join(output_dir, f"{base}.{shard}.{split}.csv")
+                    f = open(path, "wb", buffering=1024 * 1024)
+                    files.append(f)
+                    f.write(header)
+                    part = {"shard": shard, "split": split, "path": path, "rows": 0}
+                    outputs[split].append((f.write, part))
+                    parts.append(part)
+            counts = {split: 0 for split in outputs}
+            for record in records:
+                split = "test" if draw() < train_test_split else "train"
+                write, part = outputs[split][counts[split] % shards]
+                write(record)
+                part["rows"] += 1
+                counts[split] += 1
+    finally:
+        for f in files:
+            f.close()
+    return [part for part in parts if part["rows"]]
+
+
+class DistributedClient(BaseClient):
+    """Client for the whole cluster instead of a single node.
+
+    Large datasets are split in row shards (`shard_csv`), uploaded to
+    different nodes concurrently and registered on the coordinator node as
+    one logical dataset. Jobs, status, results, models and predictions go
+    through the coordinator, a regular HttpClient.
+    """
+
+    def __init__(self, server: Optional[str] = None, **options):
+        self.coordinator = HttpClient(server)
+        self.cfg = self.coordinator.cfg
+        opts = {**distributed_config(self.cfg), **options}
+        self.shards = opts["shards"]
+        self.min_shard_size = opts["min_shard_size"]
+        self.workers = opts["workers"]
+        self.tmp_dir = opts["tmp_dir"]
+        # logical dataset id -> how it was split, to check create_job
+        self.datasets: Dict[str, Dict[str, Any]] = {}
+        self._clients: Dict[str, HttpClient] = {}
+        self._lock = threading.Lock()
+
+    def nodes(self) -> List[str]:
+        """Nodes announced by the cluster, the configured servers if the
+        coordinator doesn't list them"""
+        r = self.coordinator._request("GET", NODES_PATH, raise_for_status=False)
+        nodes = r.json().get("nodes", []) if r.status_code == 200 else []
+        return nodes or [self.coordinator.server]
+
+    def node_client(self, node: str) -> HttpClient:
+        # node clients share the session, token and caches of the process
+        with self._lock:
+            client = self._clients.get(node)
+            if client is None:
+                client = self._clients[node] = HttpClient(node)
+            return client
+
+    def upload_dataset(
+        self,
+        file_path: str,
+        name: str = None,
+        train_test_split: float = 0.2,
+        seed: int = 42,
+        shards: int = None,
+    ) -> Dict[str, Any]:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        if os.path.getsize(file_path) < 2 * self.min_shard_size and not shards:
+            return self.coordinator.upload_dataset(file_path)
+        nodes = self.nodes()
+        shards = shards or self.shards or len(nodes)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.tmp_dir)
+        try:
+            parts = shard_csv(file_path, tmp, shards, train_test_split, seed)
+            uploaded = self._upload_parts(parts, nodes)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        manifest = {
+            "name": name or os.path.basename(file_path),
+            "rows": sum(part["rows"] for part in uploaded),
+            "train_test_split": train_test_split,
+            "seed": seed,
+            "shards": uploaded,
+        }
+        r = self.coordinator._request("POST", LOGICAL_PATH, json=manifest)
+        dataset_id = r.json()["dataset_id"]
+        self.datasets[dataset_id] = manifest
+        return {"dataset_id": dataset_id, **manifest}
+
+    def _upload_parts(
+        self, parts: List[Dict[str, Any]], nodes: List[str]
+    ) -> List[Dict[str, Any]]:
+        def upload(i: int) -> Dict[str, Any]:
+            part = parts[i]
+            error = None
+            # part i goes to node i, the next nodes take it if that one fails
+            for attempt in range(len(nodes)):
+                node = nodes[(i + attempt) % len(nodes)]
+                try:
+                    # shards are temporary and already split, they skip the
+                    # dataset cache and the preprocessing of upload_dataset
+                    response = self.node_client(node)._upload_stream(part["path"])
+                except Exception as e:
+                    error = e
+                    continue
+                return {
+                    "shard": part["shard"],
+                    "split": part["split"],
+                    "rows": part["rows"],
+                    "node": node,
+                    "dataset_id": response["dataset_id"],
+                }
+            raise error
+
+        workers = max(1, min(len(parts), self.workers))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(upload, range(len(parts))))
+
+    def create_job(
+        self,
+        dataset_id: str,
+        task: str,
+        models: list = [],
+        params: Optional[Dict[str, Any]] = None,
+        train_test_split: float = 0.2,
+        seed: int = 42,
+        idempotency_key: str = None,
+    ) -> Dict[str, Any]:
+        manifest = self.datasets.get(dataset_id)
+        if manifest is not None and (
+            manifest["train_test_split"] != train_test_split or manifest["seed"] != seed
+        ):
+            # the split is fixed by the shards, a different one needs a new upload
+            raise ValueError(
+                f"El dataset {dataset_id} se dividio con train_test_split="
+                f"{manifest['train_test_split']} y seed={manifest['seed']}"
+            )
+        return self.coordinator.create_job(
+            dataset_id, task, models, params, train_test_split, seed, idempotency_key
+        )
+
+    def get_job_status(self, job_id: str) -> Dict[str, Any]:
+        return self.coordinator.get_job_status(job_id)
+
+    def get_jobs_status(self, job_ids: Iterable[str]) -> Dict[str, Any]:
+        return self.coordinator.get_jobs_status(job_ids)
+
+    def list_jobs(self, user_id: str = None) -> Dict[str, Any]:
+        return self.coordinator.list_jobs(user_id)
+
+    def get_results(self, job_id: str):
+        return self.coordinator.get_results(job_id)
+
+    def get_results_columns(self, job_id: str) -> Dict[str, Any]:
+        return self.coordinator.get_results_columns(job_id)
+
+    def get_models(self, model_type: str) -> Dict[str, Any]:
+        return self.coordinator.get_models(model_type)
+
+    def download_model(self, job_id: str, output_path: str = None) -> str:
+        return self.coordinator.download_model(job_id, output_path)
+
+    def download_models(
+        self, job_ids: Iterable[str], output_dir: str = "."
+    ) -> Dict[str, Any]:
+        return self.coordinator.download_models(job_ids, output_dir)
+
+    def update_server_list(self):
+        self.coordinator.update_server_list()
+
+    def predict(self, job_id, model_name, dataset_path, output_path=None):
+        return self.coordinator.predict(job_id, model_name, dataset_path, output_path)
@@ -0,0 +1,352 @@
+import argparse, io, json, logging, os, signal, socket, socketserver, threading
+import time, uuid
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, List, Optional
+
+from config.config_manager import load_config
+from clients.centralized.http_client import HttpClient
+from clients.centralized.job_stream import JobStream
+from clients.sidecar.protocol import (
+    encode,
+    encode_error,
+    receive,
+    send,
+    sidecar_config,
+)
+
+log = logging.getLogger(__name__)
+
+# client methods sessions may call
+METHODS = {
+    "upload_dataset",
+    "upload_dataset_stream",
+    "create_job",
+    "get_job_status",
+    "get_jobs_status",
+    "list_jobs",
+    "get_results",
+    "get_results_columns",
+    "get_models",
+    "download_model",
+    "download_models",
+    "predict",
+    "update_server_list",
+}
+
+# calls without side effects, identical ones in flight share one upstream call
+COALESCED = {
+    "get_job_status",
+    "get_jobs_status",
+    "list_jobs",
+    "get_results",
+    "get_results_columns",
+    "get_models",
+    "download_model",
+    "download_models",
+}
+
+# events kept for sessions that read behind
+EVENT_LOG_SIZE = 10_000
+
+
+class Singleflight:
+    """Concurrent calls with the same key run once, the callers that
+    arrive while it runs get the same result or exception"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class EventRelay:
+    """One JobStream for every session of a user. Sessions read its events
+    by sequence number, so N open pages cost one upstream stream.
+    Sequence numbers only mean something within one `epoch`"""
+
+    def __init__(self, client: HttpClient):
+        self.stream = JobStream(client)
+        self.events: deque = deque(maxlen=EVENT_LOG_SIZE)
+        self.last = 0
+        self.epoch = uuid.uuid4().hex
+        self._cond = threading.Condition()
+        self.stream.listen(self._append)
+        self.stream.start()
+
+    def _append(self, event: Dict[str, Any]):
+        with self._cond:
+            self.last += 1
+            self.events.append((self.last, event))
+            self._cond.notify_all()
+
+    def _snapshot(self, job_id: str) -> Optional[Dict[str, Any]]:
+        latest = self.stream.latest(job_id)
+        if latest is not None:
+            return latest
+        status = self.stream.statuses().get(job_id)
+        return {"training_id": job_id, "status": status} if status else None
+
+    def read(
+        self,
+        job_ids: List[str],
+        after: Optional[int],
+        sync: List[str],
+        timeout: float,
+    ) -> Dict[str, Any]:
+        """Events of `job_ids` after `after`, waiting up to `timeout` for
+        one. `sync` ids also get their last known state"""
+        self.stream.track_many(job_ids)
+        wanted = set(job_ids)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            after = self.last if after is None else after
+            events = [event for event in map(self._snapshot, sync) if event]
+            while True:
+                events += [
+                    event
+                    for seq, event in self.events
+                    if seq > after and event.get("training_id") in wanted
+                ]
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return {"events": events, "last": self.last, "epoch": self.epoch}
+                after = self.last
+                self._cond.wait(remaining)
+
+    def stop(self):
+        self.stream.stop()
+
+
+class SidecarDaemon:
+    """Owns the server connections, tokens and caches of every GUI session
+    on the host and serves them over a Unix socket.
+
+    There is one HttpClient per user, so sessions share its connection
+    pool, token and response cache. Identical read-only calls in flight
+    are coalesced (Singleflight) and training events come from one stream
+    per user (EventRelay).
+    """
+
+    def __init__(self, path: str = None, **options):
+        self.cfg = load_config()
+        opts = {**sidecar_config(self.cfg), **options}
+        self.path = path or opts["socket"]
+        self.socket_mode = int(str(opts.get("socket_mode", "600")), 8)
+        self.flight = Singleflight()
+        self.calls = 0
+        self.started = time.time()
+        self._clients: Dict[str, HttpClient] = {}
+        self._relays: Dict[str, EventRelay] = {}
+        # open session connections, closed by stop
+        self._connections: set = set()
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def client(self, user: str) -> HttpClient:
+        with self._lock:
+            client = self._clients.get(user)
+            if client is None:
+                client = self._clients[user] = HttpClient(username=user)
+            return client
+
+    def relay(self, user: str) -> EventRelay:
+        client = self.client(user)
+        with self._lock:
+            relay = self._relays.get(user)
+            if relay is None:
+                relay = self._relays[user] = EventRelay(client)
+            return relay
+
+    # ========= Calls =========
+
+    def handle(self, header: Dict[str, Any], body: Optional[bytes]):
+        """Response header and body of one request"""
+        self.calls += 1
+        try:
+            result, content = self._dispatch(header, body)
+        except Exception as e:
+            log.debug("%s fallo: %r", header.get("method"), e)
+            return {"error": encode_error(e)}, None
+        return {"result": encode(result)}, content
+
+    def _dispatch(self, header: Dict[str, Any], body: Optional[bytes]):
+        method = header["method"]
+        args = header.get("args", [])
+        kwargs = header.get("kwargs", {})
+        user = header.get("user") or os.getenv("CLIENT_USER", "user1")
+        if method == "info":
+            return self.info(user), None
+        if method == "events":
+            return self.relay(user).read(*args, **kwargs), None
+        if method == "request":
+            return self._request(user, *args, **kwargs)
+        if method not in METHODS:
+            raise ValueError(f"Metodo desconocido: {method}")
+        call = getattr(self.client(user), method)
+        if header.get("spool"):
+            # uploaded buffers arrive as a file the session wrote, read in
+            # chunks by the uploader like any other stream
+            buffer = io.FileIO(header["spool"])
+            buffer.name = header.get("name") or "dataset.csv"
+            buffer.size = os.path.getsize(header["spool"])
+            try:
+                return call(buffer, *args, **kwargs), None
+            finally:
+                buffer.close()
+        if method in COALESCED:
+            key = json.dumps([user, method, args, kwargs], sort_keys=True)
+            result = self.flight.do(key, lambda: call(*args, **kwargs))
+        else:
+            result = call(*args, **kwargs)
+        if isinstance(result, dict) and result.get("output_path"):
+            # the daemon may run from another directory than the session
+            result = {**result, "output_path": os.path.abspath(result["output_path"])}
+        return result, None
+
+    def _request(self, user: str, method: str, path: str, **kwargs):
+        """A raw request for the helpers that build their own (inference),
+        the body goes back as is"""
+        client = self.client(user)
+        kwargs["raise_for_status"] = False
+
+        def call():
+            r = client._request(method, path, **kwargs)
+            return {"status": r.status_code, "headers": dict(r.headers)}, r.content
+
+        if method == "GET":
+            key = json.dumps([user, method, path, kwargs], sort_keys=True)
+            return self.flight.do(key, call)
+        return call()
+
+    def info(self, user: str) -> Dict[str, Any]:
+        client = self.client(user)
+        client.wait_ready()
+        return {
+            "pid": os.getpid(),
+            "server": client._server,
+            "start_error": str(client.start_error) if client.start_error else None,
+            "uptime": time.time() - self.started,
+            "calls": self.calls,
+            "upstream": self.flight.executed,
+            "coalesced": self.flight.shared,
+        }
+
+    # ========= Socket =========
+
+    def _claim_socket(self):
+        """Removes the socket of a daemon that is gone, fails if one answers"""
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.remove(self.path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"Ya hay un daemon escuchando en {self.path}")
+
+    def start(self) -> "SidecarDaemon":
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                with daemon._lock:
+                    daemon._connections.add(self.connection)
+
+            def finish(self):
+                with daemon._lock:
+                    daemon._connections.discard(self.connection)
+                super().finish()
+
+            def handle(self):
+                try:
+                    while True:
+                        message = receive(self.rfile)
+                        if message is None:
+                            return
+                        header, content = daemon.handle(*message)
+                        send(self.connection, header, content)
+                except (OSError, ValueError) as e:
+                    # the session went away mid request or sent garbage
+                    log.debug("Conexion con la sesion perdida: %s", e)
+
+        self._claim_socket()
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.path, self.socket_mode)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            # sessions see the daemon gone, as after a restart
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for relay in list(self._relays.values()):
+            relay.stop()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daemon local del cliente")
+    parser.add_argument("--socket", help="ruta del socket Unix")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    daemon = SidecarDaemon(args.socket).start()
+    log.info("Daemon escuchando en %s", daemon.path)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        log.info("Daemon detenido")
+
+
+if __name__ == "__main__":
+    main()
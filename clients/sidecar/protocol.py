@@ -0,0 +1,109 @@
+import builtins, json, socket
+import requests
+from typing import Dict, Any, BinaryIO, Optional, Tuple
+
+DEFAULT_SIDECAR_CONFIG: Dict[str, Any] = {
+    # GUIs go through the daemon when its socket exists
+    "enabled": True,
+    "socket": "data/run/sidecar.sock",
+    "connect_timeout": 1.0,
+    # longest call, uploads and downloads included
+    "timeout": 3600.0,
+}
+
+# A message is one JSON line, followed by `bytes` raw bytes when the header
+# has that key (response bodies of raw requests)
+Message = Tuple[Dict[str, Any], Optional[bytes]]
+
+
+class SidecarError(RuntimeError):
+    """Error raised by the daemon that has no builtin equivalent"""
+
+    def __init__(self, message: str, kind: str = None, status: int = None):
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+
+
+def sidecar_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_SIDECAR_CONFIG, **cfg.get("sidecar", {})}
+
+
+def send(sock: socket.socket, header: Dict[str, Any], body: bytes = None):
+    if body is not None:
+        header = {**header, "bytes": len(body)}
+    sock.sendall(json.dumps(header).encode() + b"\n")
+    if body:
+        sock.sendall(body)
+
+
+def receive(reader: BinaryIO) -> Optional[Message]:
+    """Next message, None once the peer closed the connection"""
+    line = reader.readline()
+    if not line:
+        return None
+    header = json.loads(line)
+    body = None
+    if "bytes" in header:
+        body = reader.read(header.pop("bytes"))
+    return header, body
+
+
+def encode_error(e: BaseException) -> Dict[str, Any]:
+    response = getattr(e, "response", None)
+    return {
+        "type": type(e).__name__,
+        "module": type(e).__module__,
+        "message": str(e),
+        "status": getattr(response, "status_code", None),
+    }
+
+
+def _stub_response(status: Optional[int]) -> Optional[requests.Response]:
+    """Response with only the status, what callers of requests errors read"""
+    if status is None:
+        return None
+    response = requests.Response()
+    response.status_code = status
+    return response
+
+
+def decode_error(error: Dict[str, Any]) -> Exception:
+    """requests and builtin exceptions keep their type (requests ones with
+    a stub `response`), the others become SidecarError"""
+    message, status = error["message"], error.get("status")
+    if error.get("module", "").startswith("requests"):
+        kind = getattr(requests.exceptions, error["type"], None)
+        if isinstance(kind, type) and issubclass(kind, requests.RequestException):
+            return kind(message, response=_stub_response(status))
+    elif error.get("module", "builtins") == "builtins":
+        kind = getattr(builtins, error["type"], None)
+        if isinstance(kind, type) and issubclass(kind, Exception):
+            try:
+                return kind(message)
+            except Exception:
+                # builtins with several arguments (UnicodeDecodeError, ...)
+                pass
+    return SidecarError(message, error["type"], status)
+
+
+def encode(value: Any) -> Any:
+    """JSON form of a client result, exceptions in mappings (bulk calls)
+    included"""
+    if isinstance(value, BaseException):
+        return {"__error__": encode_error(value)}
+    if isinstance(value, dict):
+        return {k: encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    return value
+
+
+def decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "__error__" in value and len(value) == 1:
+            return decode_error(value["__error__"])
+        return {k: decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    return value
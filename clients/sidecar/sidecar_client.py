@@ -0,0 +1,243 @@
+import os, shutil, socket, tempfile, threading
+import requests
+from requests.structures import CaseInsensitiveDict
+from typing import Dict, Any, BinaryIO, Iterable, List, Optional, Union
+
+from models.base_client import BaseClient
+from config.config_manager import load_config
+from clients.centralized.http_client import HttpClient
+from clients.sidecar.protocol import (
+    decode,
+    decode_error,
+    receive,
+    send,
+    sidecar_config,
+)
+
+SPOOL_BLOCK_SIZE = 1024 * 1024
+
+
+class SidecarClient(BaseClient):
+    """HttpClient interface served by the local SidecarDaemon.
+
+    Each thread keeps its own connection to the daemon's Unix socket.
+    Paths are sent absolute, the daemon reads and writes the same files.
+    """
+
+    def __init__(self, path: str = None, cfg: Dict[str, Any] = None):
+        self.cfg = cfg or load_config()
+        opts = sidecar_config(self.cfg)
+        self.path = path or opts["socket"]
+        self.connect_timeout = opts["connect_timeout"]
+        self.call_timeout = opts["timeout"]
+        self.username = os.getenv("CLIENT_USER", "user1")
+        self.start_error: Optional[Exception] = None
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            sock.settimeout(self.call_timeout)
+            connection = self._local.connection = (sock, sock.makefile("rb"))
+        return connection
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            connection[1].close()
+            connection[0].close()
+
+    def _exchange(self, header: Dict[str, Any]):
+        try:
+            sock, reader = self._connection()
+            send(sock, header)
+        except OSError:
+            # nothing reached the daemon (restarted?), one new connection
+            self._close()
+            sock, reader = self._connection()
+            send(sock, header)
+        try:
+            message = receive(reader)
+        except OSError:
+            self._close()
+            raise
+        if message is None:
+            self._close()
+            raise ConnectionError("El daemon cerro la conexion")
+        return message
+
+    def _call(
+        self, method: str, *args, spool: str = None, buffer_name: str = None, **kwargs
+    ):
+        header = {"method": method, "args": args, "kwargs": kwargs}
+        header["user"] = self.username
+        if spool is not None:
+            header["spool"], header["name"] = spool, buffer_name
+        response, _ = self._exchange(header)
+        if "error" in response:
+            raise decode_error(response["error"])
+        return decode(response["result"])
+
+    def connect(self) -> "SidecarClient":
+        """Fails unless the daemon answers"""
+        info = self._call("info")
+        if info.get("start_error"):
+            self.start_error = RuntimeError(info["start_error"])
+        return self
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        # the daemon did discovery and got the token already
+        return True
+
+    @property
+    def server(self) -> Optional[str]:
+        return self._call("info").get("server")
+
+    # ========= Client API =========
+
+    def upload_dataset(
+        self, file_path: str, columns: List[str] = None, preprocess: bool = None
+    ) -> Dict[str, Any]:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        return self._call(
+            "upload_dataset", os.path.abspath(file_path), columns, preprocess
+        )
+
+    def upload_dataset_stream(
+        self,
+        source: Union[str, BinaryIO],
+        name: str = None,
+        columns: List[str] = None,
+        preprocess: bool = None,
+    ) -> Dict[str, Any]:
+        if isinstance(source, str):
+            return self._call(
+                "upload_dataset_stream",
+                os.path.abspath(source),
+                name,
+                columns,
+                preprocess,
+            )
+        # buffers are copied in blocks to a file the daemon reads, so memory
+        # stays flat whatever their size
+        fd, spool = tempfile.mkstemp(prefix="distai-upload-", suffix=".part")
+        try:
+            source.seek(0)
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(source, f, SPOOL_BLOCK_SIZE)
+            return self._call(
+                "upload_dataset_stream",
+                name,
+                columns,
+                preprocess,
+                spool=spool,
+                buffer_name=name or getattr(source, "name", None) or "dataset.csv",
+            )
+        finally:
+            os.remove(spool)
+
+    def create_job(
+        self,
+        dataset_id: str,
+        task: str,
+        models: list = [],
+        params: Optional[Dict[str, Any]] = None,
+        train_test_split: float = 0.2,
+        seed: int = 42,
+        idempotency_key: str = None,
+    ) -> Dict[str, Any]:
+        return self._call(
+            "create_job",
+            dataset_id,
+            task,
+            models,
+            params,
+            train_test_split,
+            seed,
+            idempotency_key,
+        )
+
+    def get_job_status(self, job_id: str) -> Dict[str, Any]:
+        return self._call("get_job_status", job_id)
+
+    def get_jobs_status(self, job_ids: Iterable[str]) -> Dict[str, Any]:
+        return self._call("get_jobs_status", list(job_ids))
+
+    def list_jobs(self, user_id: str = None) -> Dict[str, Any]:
+        return self._call("list_jobs", user_id)
+
+    def get_results(self, job_id: str):
+        return self._call("get_results", job_id)
+
+    def get_results_columns(self, job_id: str) -> Dict[str, Any]:
+        return self._call("get_results_columns", job_id)
+
+    def get_models(self, model_type: str) -> Dict[str, Any]:
+        return self._call("get_models", model_type)
+
+    def download_model(self, job_id: str, output_path: str = None) -> str:
+        out_path = os.path.abspath(output_path or f"model_{job_id}.pkl")
+        return self._call("download_model", job_id, out_path)
+
+    def download_models(
+        self, job_ids: Iterable[str], output_dir: str = "."
+    ) -> Dict[str, Any]:
+        return self._call("download_models", list(job_ids), os.path.abspath(output_dir))
+
+    def update_server_list(self):
+        return self._call("update_server_list")
+
+    def predict(self, job_id, model_name, dataset_path, output_path=None):
+        if output_path is not None:
+            output_path = os.path.abspath(output_path)
+        return self._call(
+            "predict", job_id, model_name, os.path.abspath(dataset_path), output_path
+        )
+
+    def events(
+        self, job_ids: List[str], after: Optional[int], sync: List[str], timeout: float
+    ) -> Dict[str, Any]:
+        """Events of the daemon's shared stream, see EventRelay.read"""
+        return self._call("events", list(job_ids), after, list(sync), timeout)
+
+    def _request(
+        self, method: str, path: str, raise_for_status: bool = True, **kwargs
+    ) -> requests.Response:
+        """Raw request through the daemon, for JSON or form bodies"""
+        if kwargs.get("files") is not None or kwargs.pop("stream", False):
+            raise ValueError("El daemon no reenvia archivos ni respuestas en stream")
+        kwargs.pop("timeout", None)
+        header = {"method": "request", "args": [method, path], "kwargs": kwargs}
+        header["user"] = self.username
+        response, content = self._exchange(header)
+        if "error" in response:
+            raise decode_error(response["error"])
+        r = requests.Response()
+        r.status_code = response["result"]["status"]
+        r.headers = CaseInsensitiveDict(response["result"]["headers"])
+        r._content = content or b""
+        r.url = path
+        if raise_for_status:
+            r.raise_for_status()
+        return r
+
+
+def get_client(server: Optional[str] = None):
+    """SidecarClient when the local daemon runs, HttpClient otherwise"""
+    cfg = load_config()
+    opts = sidecar_config(cfg)
+    if server is None and opts["enabled"] and os.path.exists(opts["socket"]):
+        try:
+            return SidecarClient(opts["socket"], cfg).connect()
+        except OSError:
+            pass
+    return HttpClient(server)
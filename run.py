@@ -1,6 +1,7 @@
-# from GUI.console.main import ClientGUI
-from GUI.streamlit.main import ST_App
-
 if __name__ == "__main__":
+    # imported here so importing run.py doesn't load a GUI
+    # from GUI.console.main import ClientGUI
+    from GUI.streamlit.main import ST_App
+
     # c = ClientGUI()
-    c = ST_App()
\ No newline at end of file
+    c = ST_App()
@@ -0,0 +1,190 @@
+import csv, os, sqlite3, threading, time
+from typing import Dict, Any, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    created_at REAL
+);
+CREATE TABLE IF NOT EXISTS trainings (
+    id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    task TEXT,
+    status TEXT,
+    dataset_id TEXT,
+    created_at REAL,
+    PRIMARY KEY (id, model)
+);
+CREATE INDEX IF NOT EXISTS trainings_status ON trainings (status);
+CREATE INDEX IF NOT EXISTS trainings_dataset ON trainings (dataset_id);
+"""
+
+TRAINING_COLUMNS = ("id", "model", "task", "status", "dataset_id")
+
+
+class LocalStore:
+    """SQLite (WAL) store for the datasets and trainings known by the GUIs.
+
+    Every thread gets its own connection, WAL lets Streamlit sessions read
+    while another one writes and busy_timeout makes writers wait for each
+    other instead of failing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _rows(self, query: str, params: Iterable = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._conn().execute(query, tuple(params))]
+
+    # ========= Datasets =========
+
+    def add_dataset(self, dataset_id: str, name: str):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO datasets (id, name, created_at) VALUES (?, ?, ?)",
+                (dataset_id, name, time.time()),
+            )
+
+    def datasets(self) -> List[Dict[str, Any]]:
+        return self._rows("SELECT id, name FROM datasets ORDER BY created_at")
+
+    def dataset_ids(self) -> List[str]:
+        return [
+            r["id"] for r in self._rows("SELECT id FROM datasets ORDER BY created_at")
+        ]
+
+    def has_dataset(self, dataset_id: str) -> bool:
+        return bool(self._rows("SELECT 1 FROM datasets WHERE id = ?", (dataset_id,)))
+
+    # ========= Trainings =========
+
+    def add_trainings(self, rows: Iterable[Dict[str, Any]]):
+        """Inserts many (training, model) rows in one transaction"""
+        now = time.time()
+        values = [
+            tuple(row.get(column) for column in TRAINING_COLUMNS) + (now,)
+            for row in rows
+        ]
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO trainings "
+                "(id, model, task, status, dataset_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                values,
+            )
+
+    def trainings(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT id, model, task, status, dataset_id FROM trainings"
+        if status is not None:
+            return self._rows(
+                f"{query} WHERE status = ? ORDER BY created_at", (status,)
+            )
+        return self._rows(f"{query} ORDER BY created_at")
+
+    def training_ids(self) -> List[str]:
+        return [
+            r["id"]
+            for r in self._rows(
+                "SELECT id FROM trainings GROUP BY id ORDER BY MIN(created_at)"
+            )
+        ]
+
+    def training_models(self, training_id: str) -> List[str]:
+        rows = self._rows("SELECT model FROM trainings WHERE id = ?", (training_id,))
+        return [r["model"] for r in rows]
+
+    def training_statuses(self) -> Dict[str, Optional[str]]:
+        return {
+            r["id"]: r["status"]
+            for r in self._rows("SELECT id, status FROM trainings GROUP BY id")
+        }
+
+    def update_statuses(self, statuses: Dict[str, str]):
+        with self._conn() as conn:
+            conn.executemany(
+                "UPDATE trainings SET status = ? WHERE id = ? AND status IS NOT ?",
+                [(status, id, status) for id, status in statuses.items()],
+            )
+
+    # ========= CSV migration =========
+
+    def migrate_csv(
+        self, datasets_csv: str, trainings_csv: str, tasks: Iterable[str] = ()
+    ):
+        """Imports the old CSV tables once"""
+        if self._rows("SELECT 1 FROM meta WHERE key = 'csv_migrated'"):
+            return
+        tasks = set(tasks)
+        datasets = []
+        if datasets_csv and os.path.exists(datasets_csv):
+            with open(datasets_csv, newline="") as f:
+                datasets = [r for r in csv.DictReader(f) if r.get("id")]
+        trainings = []
+        if trainings_csv and os.path.exists(trainings_csv):
+            with open(trainings_csv, newline="") as f:
+                for r in csv.DictReader(f):
+                    if not r.get("id"):
+                        continue
+                    # old rows were written as id,task,model,status under an
+                    # id,model,task,status header
+                    if r.get("model") in tasks and r.get("task") not in tasks:
+                        r["model"], r["task"] = r["task"], r["model"]
+                    trainings.append(r)
+        now = time.time()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO datasets (id, name, created_at) VALUES (?, ?, ?)",
+                [(r["id"], r.get("name"), now) for r in datasets],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO trainings "
+                "(id, model, task, status, dataset_id, created_at) "
+                "VALUES (?, ?, ?, ?, NULL, ?)",
+                [
+                    (r["id"], r.get("model") or "", r.get("task"), r.get("status"), now)
+                    for r in trainings
+                ],
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('csv_migrated', '1')"
+            )
+
+
+_stores: Dict[str, LocalStore] = {}
+_lock = threading.Lock()
+
+
+def get_store(cfg: Dict[str, Any]) -> LocalStore:
+    """Store shared by every session of the process, migrated on first use"""
+    path = cfg.get("store_path", "data/tables/distai.db")
+    with _lock:
+        store = _stores.get(path)
+        if store is None:
+            store = LocalStore(path)
+            store.migrate_csv(
+                cfg.get("datasets_data_path"),
+                cfg.get("trainings_data_path"),
+                cfg.get("tasks", []),
+            )
+            _stores[path] = store
+        return store
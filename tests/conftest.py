@@ -0,0 +1,32 @@
+import pytest
+
+import clients.centralized.http_client as http_client
+from benchmarks.stand_in_server import start_server, server_url
+
+
+@pytest.fixture
+def server():
+    srv = start_server()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    """Config of the clients a test creates. Every data/ path of the client
+    is relative, so the test runs in tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "token": "user1",
+        "servers": [],
+        "http": {"backoff_factor": 0, "backoff_jitter": 0, "retries": 2},
+        "response_cache": {"enabled": False},
+    }
+    monkeypatch.setattr(http_client, "load_config", lambda: config)
+    return config
+
+
+@pytest.fixture
+def client(server, cfg):
+    return http_client.HttpClient(server_url(server))
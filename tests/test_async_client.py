@@ -0,0 +1,94 @@
+import asyncio, hashlib, time
+
+import aiohttp
+
+import clients.centralized.http_client as http_client
+from benchmarks.stand_in_server import start_server, server_url
+from clients.centralized.async_http_client import AsyncHttpClient
+
+
+def run(client, work):
+    async def main():
+        async with AsyncHttpClient.from_client(client) as c:
+            return await work(c)
+
+    return asyncio.run(main())
+
+
+def test_gather_bounds_the_calls_in_flight(client):
+    flight = {"now": 0, "max": 0}
+
+    async def call():
+        flight["now"] += 1
+        flight["max"] = max(flight["max"], flight["now"])
+        await asyncio.sleep(0.01)
+        flight["now"] -= 1
+        return "ok"
+
+    async def work(c):
+        return await c.gather([call] * 40, limit=5)
+
+    assert run(client, work) == ["ok"] * 40
+    assert flight["max"] == 5
+
+
+def test_statuses_fan_out_and_errors_stay_per_call(server, client):
+    jobs = [
+        client.create_job("d", "regression", ["A"])["training_id"] for _ in range(20)
+    ]
+    server.state.latency = 0.2
+
+    async def work(c):
+        return await c.gather_job_status(jobs + ["missing"], limit=21)
+
+    started = time.monotonic()
+    statuses = run(client, work)
+    # about one request's latency, not 21 of them one after the other
+    assert time.monotonic() - started < 2
+    assert all(statuses[job_id]["status"] == "completed" for job_id in jobs)
+    assert isinstance(statuses["missing"], aiohttp.ClientResponseError)
+    assert statuses["missing"].status == 404
+    assert server.state.requests["status"] == 21
+
+
+def test_created_jobs_keep_their_idempotency_keys(server, client):
+    jobs = [
+        {"dataset_id": "d", "task": "regression", "models": ["A"], "idempotency_key": k}
+        for k in ("a", "b", "a")
+    ]
+
+    async def work(c):
+        return await c.gather_create_jobs(jobs)
+
+    created = run(client, work)
+    assert created[0]["training_id"] == created[2]["training_id"]
+    assert len(server.state.trainings) == 2
+
+
+def test_rejected_token_is_refreshed(cfg):
+    srv = start_server(token_ttl=60)
+    try:
+        # the configured token isn't one the server issued
+        client = http_client.HttpClient(server_url(srv))
+
+        async def work(c):
+            return await c.get_models("regression")
+
+        assert run(client, work)["models"]
+        assert srv.state.token_requests == 1
+        assert srv.state.unauthorized == 1
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_model_download(server, client, tmp_path):
+    job_id = client.create_job("d", "regression", ["A"])["training_id"]
+    path = str(tmp_path / "model.pkl")
+
+    async def work(c):
+        return await c.download_model(job_id, path)
+
+    assert run(client, work) == path
+    with open(path, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == server.state.model_sha256
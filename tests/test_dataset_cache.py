@@ -0,0 +1,112 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+import requests
+
+import clients.centralized.http_client as http_client
+from benchmarks.stand_in_server import start_server, server_url
+from clients.centralized.dataset_cache import DatasetCache
+
+
+def add_entries(path: str, worker: int):
+    cache = DatasetCache(path)
+    for i in range(20):
+        cache.add("http://node", f"{worker}:{i}", f"id-{worker}-{i}")
+
+
+def test_same_content_is_uploaded_once(server, client, tmp_path):
+    first, copy = tmp_path / "a.csv", tmp_path / "b.csv"
+    first.write_text("x,y\n1,2\n")
+    copy.write_text("x,y\n1,2\n")
+    uploaded = client.upload_dataset(str(first))
+    again = client.upload_dataset(str(copy))
+    assert again["dataset_id"] == uploaded["dataset_id"]
+    assert again["deduplicated"]
+    assert len(server.state.datasets) == 1
+
+
+def test_dataset_ids_are_scoped_by_server(server, client, tmp_path):
+    other = start_server()
+    try:
+        path = tmp_path / "a.csv"
+        path.write_text("x,y\n1,2\n")
+        client.upload_dataset(str(path))
+        response = http_client.HttpClient(server_url(other)).upload_dataset(str(path))
+        assert "deduplicated" not in response
+        assert response["dataset_id"] in other.state.datasets
+    finally:
+        other.shutdown()
+        other.server_close()
+
+
+def test_concurrent_writers_keep_every_entry(tmp_path):
+    path = str(tmp_path / "cache.json")
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(add_entries, [path] * 4, range(4)))
+    cache = DatasetCache(path)
+    assert all(
+        cache.get("http://node", f"{w}:{i}") == f"id-{w}-{i}"
+        for w in range(4)
+        for i in range(20)
+    )
+    assert cache.get("http://other", "0:0") is None
+
+
+def test_nodes_of_a_cluster_share_cached_ids(cfg, tmp_path):
+    servers = {}
+    for _ in range(2):
+        srv = start_server()
+        servers[server_url(srv)] = srv
+    cfg["servers"] = list(servers)
+    cfg["nodes"] = {"health_interval": 0}
+    try:
+        client = http_client.HttpClient()
+        path = tmp_path / "a.csv"
+        path.write_text("x,y\n1,2\n")
+        uploaded = client.upload_dataset(str(path))
+        primary = client.server
+        servers[primary].shutdown()
+        servers[primary].server_close()
+        # kept-alive connections would still reach the node
+        client.session.close()
+        client.failover_session.close()
+        # a write moves the client to the other node
+        client.create_job("d", "regression", ["A"])
+        assert client.server != primary
+        again = client.upload_dataset(str(path))
+        assert again["dataset_id"] == uploaded["dataset_id"]
+        assert "upload" not in servers[client.server].state.requests
+    finally:
+        for srv in servers.values():
+            srv.shutdown()
+            srv.server_close()
+
+
+def test_unknown_dataset_is_uploaded_again(server, client, tmp_path):
+    server.state.check_datasets = True
+    path = tmp_path / "a.csv"
+    path.write_text("x,y\n1,2\n")
+    old = client.upload_dataset(str(path))["dataset_id"]
+    # the server expired it
+    del server.state.datasets[old]
+    response = client.create_job(old, "regression", ["A"])
+    new = response["dataset_id"]
+    assert new != old and new in server.state.datasets
+    assert server.state.trainings[response["training_id"]]["dataset_id"] == new
+    assert client.upload_dataset(str(path))["dataset_id"] == new
+    assert server.state.requests["upload"] == 2
+
+
+def test_unknown_dataset_without_a_file_is_forgotten(server, client, tmp_path):
+    server.state.check_datasets = True
+    path = tmp_path / "a.csv"
+    path.write_text("x,y\n1,2\n")
+    old = client.upload_dataset(str(path))["dataset_id"]
+    del server.state.datasets[old]
+    path.write_text("x,y\n3,4\n")
+    with pytest.raises(requests.HTTPError):
+        client.create_job(old, "regression", ["A"])
+    assert not any(
+        id == old
+        for id in client.dataset_cache._data["datasets"][client.dataset_scope].values()
+    )
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import analytics.dataset_profile as dataset_profile
+from analytics.dataset_profile import HyperLogLog, profile_csv
+
+
+@pytest.fixture
+def opts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return {"dataset_profile": {"chunk_rows": 50}}
+
+
+def write_rows(path, start: int, end: int, header: bool = True):
+    with open(path, "a") as f:
+        if header:
+            f.write("id,value,label\n")
+        for i in range(start, end):
+            f.write(f"{i},{i % 37}.5,{'a' if i % 2 else 'b'}\n")
+
+
+def columns(profile):
+    return {column["name"]: column for column in profile["columns"]}
+
+
+@pytest.mark.parametrize("distinct", [100, 10_000, 200_000])
+def test_hyperloglog_estimate_is_close(distinct):
+    hashes = np.random.default_rng(0).integers(
+        0, np.iinfo(np.uint64).max, distinct, dtype=np.uint64, endpoint=True
+    )
+    hll = HyperLogLog(12)
+    # repeated values don't count twice
+    hll.add(hashes)
+    hll.add(hashes[: distinct // 2])
+    assert abs(hll.count() - distinct) <= 0.05 * distinct
+
+
+def test_unchanged_file_comes_from_the_cache(opts, tmp_path, monkeypatch):
+    path = str(tmp_path / "data.csv")
+    write_rows(path, 0, 200)
+    first = profile_csv(path, opts)
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("el perfil en cache no deberia leer el CSV")
+
+    monkeypatch.setattr(dataset_profile.pd, "read_csv", unexpected)
+    assert profile_csv(path, opts) == first
+
+
+def test_appended_rows_resume_from_the_saved_state(opts, tmp_path):
+    path = str(tmp_path / "data.csv")
+    write_rows(path, 0, 300)
+    first = profile_csv(path, opts)
+    write_rows(path, 300, 500, header=False)
+    resumed = profile_csv(path, opts)
+
+    fresh_path = str(tmp_path / "fresh.csv")
+    write_rows(fresh_path, 0, 500)
+    fresh = profile_csv(fresh_path, {"dataset_profile": {"cache_dir": "other"}})
+
+    assert resumed["resumed_from"] == first["bytes"]
+    assert fresh["resumed_from"] == 0
+    assert resumed["rows"] == fresh["rows"] == 500
+    # every value fits in the sample, so even the quantiles match
+    assert columns(resumed) == columns(fresh)
+
+
+def test_rewritten_file_is_profiled_again(opts, tmp_path):
+    path = str(tmp_path / "data.csv")
+    write_rows(path, 0, 300)
+    profile_csv(path, opts)
+    with open(path, "w") as f:
+        f.write("id,value,label\n0,1.5,c\n")
+    write_rows(path, 1000, 1300, header=False)
+    profile = profile_csv(path, opts)
+    assert profile["resumed_from"] == 0
+    assert profile["rows"] == 301
+    assert columns(profile)["label"]["distinct"] == 3
@@ -0,0 +1,124 @@
+import csv, hashlib, os
+
+import pytest
+
+from benchmarks.stand_in_server import start_server, server_url
+from clients.distributed.distributed_client import DistributedClient, shard_csv
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "data.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["x", "note"])
+        for i in range(1000):
+            # every 10th note has a line break inside its quotes
+            writer.writerow([i, f"line {i}\nmore" if i % 10 == 0 else f"n{i}"])
+    return str(path)
+
+
+@pytest.fixture
+def other_server():
+    srv = start_server()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def read_rows(paths):
+    rows = []
+    for path in paths:
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            assert next(reader) == ["x", "note"]
+            rows.extend(reader)
+    return rows
+
+
+def digests(directory):
+    return {
+        hashlib.sha256(open(os.path.join(directory, name), "rb").read()).hexdigest()
+        for name in os.listdir(directory)
+    }
+
+
+def test_shards_are_balanced_and_repeatable(dataset, tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    parts = shard_csv(dataset, str(first), 3, 0.2, seed=7)
+    assert [(p["shard"], p["split"]) for p in parts] == [
+        (s, split) for split in ("train", "test") for s in range(3)
+    ]
+    for split in ("train", "test"):
+        rows = [p["rows"] for p in parts if p["split"] == split]
+        assert max(rows) - min(rows) <= 1
+    test_rows = sum(p["rows"] for p in parts if p["split"] == "test")
+    assert 150 < test_rows < 250
+
+    # quoted line breaks stay inside their record
+    rows = read_rows(p["path"] for p in parts)
+    assert sorted(int(x) for x, _ in rows) == list(range(1000))
+    assert sum(p["rows"] for p in parts) == 1000
+    assert ["10", "line 10\nmore"] in rows
+
+    # the same seed gives the same parts
+    shard_csv(dataset, str(second), 3, 0.2, seed=7)
+    assert digests(first) == digests(second)
+
+
+def test_shards_are_spread_over_the_nodes(server, other_server, cfg, dataset, tmp_path):
+    server.state.cluster = [server_url(server), server_url(other_server)]
+    # shards are uploaded as they are, never run through the preprocessing
+    cfg["preprocess"] = {"enabled": True}
+    client = DistributedClient(server_url(server), tmp_dir=str(tmp_path / "tmp"))
+    uploaded = client.upload_dataset(dataset, shards=2)
+
+    assert uploaded["rows"] == 1000
+    assert len(server.state.datasets) == len(other_server.state.datasets) == 2
+    nodes = {part["node"] for part in uploaded["shards"]}
+    assert nodes == {server_url(server), server_url(other_server)}
+    # the logical dataset is registered on the coordinator
+    assert server.state.logical[uploaded["dataset_id"]]["shards"] == uploaded["shards"]
+    assert other_server.state.logical == {}
+    # temporary shards are removed
+    assert os.listdir(tmp_path / "tmp") == []
+
+    expected = tmp_path / "expected"
+    expected.mkdir()
+    shard_csv(dataset, str(expected), 2)
+    stored = [
+        d["sha256"]
+        for srv in (server, other_server)
+        for d in srv.state.datasets.values()
+    ]
+    assert sorted(stored) == sorted(digests(expected))
+
+
+def test_parts_of_a_failed_node_go_to_the_next_one(server, cfg, dataset, tmp_path):
+    dead = start_server()
+    dead.shutdown()
+    dead.server_close()
+    server.state.cluster = [server_url(server), server_url(dead)]
+    client = DistributedClient(server_url(server), tmp_dir=str(tmp_path / "tmp"))
+    uploaded = client.upload_dataset(dataset, shards=2)
+    assert {part["node"] for part in uploaded["shards"]} == {server_url(server)}
+    assert len(server.state.datasets) == 4
+
+
+def test_jobs_keep_the_split_of_the_shards(server, cfg, dataset, tmp_path):
+    client = DistributedClient(server_url(server), tmp_dir=str(tmp_path / "tmp"))
+    dataset_id = client.upload_dataset(dataset, shards=2, seed=1)["dataset_id"]
+    with pytest.raises(ValueError):
+        client.create_job(dataset_id, "regression", ["A"], seed=2)
+    job = client.create_job(dataset_id, "regression", ["A"], seed=1)
+    assert client.get_job_status(job["training_id"])["status"] == "completed"
+
+
+def test_small_files_go_whole_to_the_coordinator(server, cfg, dataset, tmp_path):
+    client = DistributedClient(server_url(server), tmp_dir=str(tmp_path / "tmp"))
+    uploaded = client.upload_dataset(dataset)
+    assert "shards" not in uploaded
+    assert len(server.state.datasets) == 1
+    assert server.state.logical == {}
@@ -0,0 +1,95 @@
+import base64, hashlib, os
+
+import pytest
+import requests
+
+from clients.centralized.downloader import (
+    ChecksumMismatch,
+    RangeDownloader,
+    expected_sha256,
+    file_sha256,
+)
+
+PART = 64 * 1024
+MODEL = "/api/jobs/j1/model"
+
+
+def interrupt_after(client, monkeypatch, parts: int):
+    """Range requests fail once `parts` of them went through"""
+    request = client._request
+    ranges = []
+
+    def limited(method, path, **kwargs):
+        if "Range" in kwargs.get("headers", {}):
+            ranges.append(kwargs["headers"]["Range"])
+            if len(ranges) > parts:
+                raise requests.ConnectionError("conexion perdida")
+        return request(method, path, **kwargs)
+
+    monkeypatch.setattr(client, "_request", limited)
+    return ranges
+
+
+def test_parts_are_fetched_in_parallel(server, client, tmp_path):
+    output = str(tmp_path / "model.pkl")
+    downloader = RangeDownloader(client, part_size=PART, workers=4)
+    assert downloader.download(MODEL, output) == output
+    assert file_sha256(output) == server.state.model_sha256
+    # one HEAD and 16 parts of 64 KiB
+    assert server.state.requests["model"] == 17
+    assert not os.path.exists(f"{output}.part")
+    assert not os.path.exists(f"{output}.part.json")
+
+
+def test_interrupted_download_resumes_missing_parts(
+    server, client, tmp_path, monkeypatch
+):
+    output = str(tmp_path / "model.pkl")
+    downloader = RangeDownloader(client, part_size=PART, workers=1)
+    interrupt_after(client, monkeypatch, 5)
+    with pytest.raises(requests.ConnectionError):
+        downloader.download(MODEL, output)
+    assert os.path.exists(f"{output}.part.json")
+    assert not os.path.exists(output)
+
+    monkeypatch.undo()
+    ranges = interrupt_after(client, monkeypatch, 16)
+    downloader.download(MODEL, output)
+    assert len(ranges) == 11
+    assert f"bytes=0-{PART - 1}" not in ranges
+    assert file_sha256(output) == server.state.model_sha256
+
+
+def test_changed_model_starts_over(server, client, tmp_path, monkeypatch):
+    output = str(tmp_path / "model.pkl")
+    downloader = RangeDownloader(client, part_size=PART, workers=1)
+    interrupt_after(client, monkeypatch, 5)
+    with pytest.raises(requests.ConnectionError):
+        downloader.download(MODEL, output)
+
+    # a new model means a new ETag, the saved parts don't belong to it
+    server.state.model = os.urandom(len(server.state.model))
+    server.state.model_sha256 = hashlib.sha256(server.state.model).hexdigest()
+    monkeypatch.undo()
+    ranges = interrupt_after(client, monkeypatch, 16)
+    downloader.download(MODEL, output)
+    assert len(ranges) == 16
+    assert file_sha256(output) == server.state.model_sha256
+
+
+def test_checksum_mismatch_discards_the_download(server, client, tmp_path):
+    output = str(tmp_path / "model.pkl")
+    server.state.model_sha256 = "0" * 64
+    with pytest.raises(ChecksumMismatch):
+        RangeDownloader(client, part_size=PART).download(MODEL, output)
+    assert os.listdir(tmp_path) == []
+
+
+def test_checksum_headers():
+    digest = hashlib.sha256(b"model").digest()
+    header = "sha-256=" + base64.b64encode(digest).decode()
+    assert expected_sha256({"Digest": f"md5=abc, {header}"}) == digest.hex()
+    assert expected_sha256({"X-Checksum-Sha256": digest.hex().upper()}) == (
+        digest.hex()
+    )
+    assert expected_sha256({}) is None
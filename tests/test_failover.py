@@ -0,0 +1,65 @@
+import socket
+import requests
+
+import clients.centralized.http_client as http_client
+from benchmarks.stand_in_server import start_server, server_url
+from clients.centralized.node_selector import NodeSelector
+
+
+def dead_url() -> str:
+    # a port nothing listens on once the socket is closed
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_nodes_are_ranked_by_latency(server):
+    slow = start_server(latency=0.05)
+    try:
+        urls = [server_url(slow), server_url(server), dead_url()]
+        nodes = NodeSelector(urls, requests.Session(), health_interval=0).start()
+        assert nodes.ranked() == [server_url(server), server_url(slow)]
+        assert nodes.primary() == server_url(server)
+    finally:
+        slow.shutdown()
+        slow.server_close()
+
+
+def test_all_nodes_failed_falls_back_to_the_oldest_failure():
+    urls = [dead_url(), dead_url()]
+    nodes = NodeSelector(urls, requests.Session(), health_interval=0)
+    nodes.mark_failed(urls[1])
+    nodes.mark_failed(urls[0])
+    assert nodes.ranked() == []
+    assert nodes.primary() == urls[1]
+
+
+def test_requests_fail_over_to_the_next_node(cfg):
+    servers = {}
+    for _ in range(2):
+        srv = start_server()
+        servers[server_url(srv)] = srv
+    cfg["servers"] = list(servers)
+    cfg["nodes"] = {"health_interval": 0}
+    client = http_client.HttpClient()
+    assert client.wait_ready(5)
+    primary = client.server
+    servers[primary].shutdown()
+    servers[primary].server_close()
+
+    response = client.create_job("d", "regression", ["A"])
+    assert client.server != primary
+    assert response["training_id"] in servers[client.server].state.trainings
+    for srv in servers.values():
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_unreachable_nodes_are_skipped_at_start(server, cfg):
+    cfg["servers"] = [dead_url(), server_url(server)]
+    cfg["nodes"] = {"health_interval": 0}
+    client = http_client.HttpClient()
+    assert client.wait_ready(5)
+    assert client.server == server_url(server)
+    assert client.get_models("regression") is not None
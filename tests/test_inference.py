@@ -0,0 +1,118 @@
+import os, pickle
+
+import pandas as pd
+import pytest
+
+import clients.centralized.inference as inference
+from clients.centralized.artifacts import ModelUnavailable, select_model
+from clients.centralized.inference import InferenceEngine, ModelCache
+
+
+class SumModel:
+    feature_names_in_ = ["x", "y"]
+
+    def predict(self, frame):
+        return (frame["x"] + frame["y"]).to_numpy()
+
+
+class Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class ArtifactClient:
+    """Serves a pickled {"sum": SumModel} artifact and server predictions"""
+
+    def __init__(self, tmp_path, artifact=b""):
+        self.cfg = {
+            "inference": {
+                "model_dir": str(tmp_path / "models"),
+                "output_dir": str(tmp_path / "predictions"),
+                "batch_rows": 10,
+                "workers": 1,
+            }
+        }
+        self.artifact = artifact or pickle.dumps({"sum": SumModel()})
+        self.downloads = 0
+        self.remote = []
+
+    def download_model(self, job_id, path):
+        self.downloads += 1
+        with open(path, "wb") as f:
+            f.write(self.artifact)
+        return path
+
+    def _request(self, method, path, **kwargs):
+        self.remote.append(path)
+        return Response({"predictions": [1, 2]})
+
+
+@pytest.fixture(autouse=True)
+def model_cache(monkeypatch):
+    monkeypatch.setattr(inference, "_cache", None)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"x": range(25), "y": [2] * 25}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_artifact_is_downloaded_and_loaded_once(tmp_path, dataset):
+    client = ArtifactClient(tmp_path)
+    engine = InferenceEngine(client)
+    first = engine.predict("j1", "sum", dataset)
+    second = InferenceEngine(client).predict("j1", "sum", dataset)
+    assert client.downloads == 1
+    assert first["source"] == second["source"] == "local"
+    assert first["rows"] == 25
+    # a new file per call, scored in batch_rows chunks
+    assert first["output_path"] != second["output_path"]
+    scored = pd.read_csv(first["output_path"])
+    assert scored["prediction"].tolist() == [x + 2 for x in range(25)]
+
+
+def test_unusable_artifacts_fall_back_to_the_server(tmp_path, dataset):
+    client = ArtifactClient(tmp_path, artifact=b"not a pickle")
+    engine = InferenceEngine(client)
+    result = engine.predict("j1", "sum", dataset)
+    assert result == {"predictions": [1, 2], "source": "server"}
+    assert client.remote == ["/api/v1/training/train/j1/predict"]
+    # neither the broken artifact nor an empty output is left behind
+    assert not os.path.exists(engine.artifact_path("j1"))
+    assert os.listdir(engine.output_dir) == []
+
+
+def test_missing_model_without_fallback_raises(tmp_path, dataset):
+    client = ArtifactClient(tmp_path)
+    client.cfg["inference"]["server_fallback"] = False
+    with pytest.raises(ModelUnavailable):
+        InferenceEngine(client).predict("j1", "other", dataset)
+    assert client.remote == []
+
+
+def test_least_recently_used_models_are_evicted():
+    cache = ModelCache(max_bytes=100)
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    assert cache.get("a") == "A"
+    cache.put("c", "C", 40)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+    # one artifact larger than the cache is still kept
+    cache.put("big", "BIG", 500)
+    assert cache.get("big") == "BIG" and cache.get("a") is None
+
+
+def test_select_model():
+    model = SumModel()
+    assert select_model(model, "any") is model
+    assert select_model({"sum": model}, "sum") is model
+    with pytest.raises(ModelUnavailable):
+        select_model({"sum": model}, "other")
+    with pytest.raises(ModelUnavailable):
+        select_model(object(), "sum")
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+import requests
+
+import clients.centralized.http_client as http_client
+import clients.centralized.instrumentation as instrumentation
+from benchmarks.stand_in_server import server_url
+from clients.centralized.instrumentation import (
+    Histogram,
+    PrometheusExporter,
+    SpanExporter,
+    endpoint_of,
+)
+
+
+@pytest.fixture
+def instrumented(server, cfg, monkeypatch, tmp_path):
+    monkeypatch.setattr(instrumentation, "_instrumentation", None)
+    cfg["instrumentation"] = {
+        "enabled": True,
+        "jsonl_path": str(tmp_path / "requests.jsonl"),
+    }
+    return http_client.HttpClient(server_url(server))
+
+
+def test_ids_are_grouped_into_one_endpoint():
+    path = "/api/v1/training/train/0b6f1c2e-8a4e-4b59-9d0e-3c1f0a9e7b21/status"
+    assert endpoint_of("GET", path) == "GET /api/v1/training/train/{id}/status"
+    assert endpoint_of("GET", "/api/jobs/42/model?x=1") == "GET /api/jobs/{id}/model"
+
+
+def test_hooks_see_every_request(server, instrumented, tmp_path):
+    inst = instrumented.instrumentation
+    started, ended = [], []
+    inst.before(lambda record: started.append(record.endpoint))
+    inst.after(lambda record: ended.append(record))
+
+    @inst.after
+    def broken(record):
+        raise RuntimeError("hooks never break a request")
+
+    job_id = instrumented.create_job("d", "regression", ["A"])["training_id"]
+    instrumented.get_job_status(job_id)
+    assert started == [
+        "POST /api/v1/training/train",
+        "GET /api/v1/training/train/{id}/status",
+    ]
+    create, status = ended
+    assert (create.status, status.status) == (200, 200)
+    assert create.bytes_sent > 0 and status.bytes_received > 0
+    assert status.server == server_url(server)
+    # the first request opened the connection, the second reused it
+    assert create.connect > 0 and status.connect == 0
+    assert status.ttfb > 0 and status.duration >= status.ttfb
+
+    lines = (tmp_path / "requests.jsonl").read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [create.id, status.id]
+
+
+def test_errors_are_recorded_per_endpoint(instrumented):
+    with pytest.raises(requests.HTTPError):
+        instrumented.get_job_status("0b6f1c2e-8a4e-4b59-9d0e-3c1f0a9e7b21")
+    stats = instrumented.instrumentation.endpoints[
+        "GET /api/v1/training/train/{id}/status"
+    ]
+    assert (stats.requests, stats.errors) == (1, 1)
+
+    text = PrometheusExporter(instrumented.instrumentation).render()
+    labels = 'method="GET",route="/api/v1/training/train/{id}/status"'
+    assert f"distai_request_errors_total{{{labels}}} 1" in text
+    assert f'distai_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+
+
+def test_spans_have_an_event_per_timed_phase(instrumented):
+    spans = SpanExporter()
+    instrumented.instrumentation.after(spans)
+    instrumented.get_models("regression")
+    (span,) = spans.spans
+    assert span["name"] == "GET /api/v1/training/models/regression"
+    assert span["status"] == "OK"
+    names = [event["name"] for event in span["events"]]
+    assert {"connect", "send", "ttfb"} <= set(names)
+    assert span["end_time_unix_nano"] > span["start_time_unix_nano"]
+
+
+def test_histogram_quantiles_are_bucket_bounds():
+    histogram = Histogram()
+    for value in [0.001] * 90 + [0.3] * 9 + [20.0]:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(0.95) == 0.5
+    assert histogram.quantile(1.0) == float("inf")
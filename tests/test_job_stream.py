@@ -0,0 +1,133 @@
+import time
+
+from clients.centralized.job_stream import JobStream, parse_sse
+
+
+def wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_parse_sse():
+    lines = [
+        ": keep-alive",
+        "",
+        "id: 1",
+        "event: progress",
+        'data: {"a":',
+        "data: 1}",
+        "",
+        "retry: 500",
+        "data:no space",
+        "",
+        "unknown: field",
+        "id: 2",
+        "",
+    ]
+    events = list(parse_sse(lines))
+    assert [(e.id, e.event, e.data) for e in events] == [
+        ("1", "progress", ['{"a":', "1}"]),
+        (None, "message", ["no space"]),
+        ("2", "message", []),
+    ]
+    assert events[1].retry == 500
+
+
+def follow(client, server, **options):
+    """Two trainings, the second tracked while the stream is open"""
+    server.state.training_seconds = 1.5
+    jobs = [client.create_job("d", "regression", ["A"])["training_id"] for _ in "ab"]
+    stream = JobStream(client, reconnect=0.1, **options)
+    events, changes = [], []
+    stream.listen(events.append)
+    stream.subscribe(lambda job_id, old, new: changes.append((job_id, new)))
+    stream.track(jobs[0])
+    stream.start()
+    assert wait_for(lambda: stream.mode is not None)
+    stream.track(jobs[1])
+    try:
+        assert wait_for(lambda: not stream.pending())
+    finally:
+        stream.stop()
+    assert stream.statuses() == {job_id: "completed" for job_id in jobs}
+    return stream, jobs, events, changes
+
+
+def test_progress_is_streamed(server, client):
+    stream, jobs, events, changes = follow(client, server)
+    assert stream.mode == "stream"
+    assert {e["training_id"] for e in events} == set(jobs)
+    assert any(0 < e["progress"] < 1 for e in events)
+    assert stream.latest(jobs[1])["status"] == "completed"
+    assert (jobs[1], "completed") in changes
+
+
+def test_servers_without_events_are_polled(server, client):
+    server.state.stream_events = False
+    stream, jobs, events, changes = follow(client, server, max_reconnect=1)
+    assert stream.mode == "poll"
+    assert {(job_id, "completed") for job_id in jobs} <= set(changes)
+
+
+def test_dropped_stream_resumes_after_the_last_event(server, client):
+    server.state.training_seconds = 1.5
+    job = client.create_job("d", "regression", ["A"])["training_id"]
+    stream = JobStream(client, reconnect=0.1)
+    ids = []
+    stream.listen(lambda e: ids.append(stream.last_event_id))
+    stream.track(job)
+    stream.start()
+    try:
+        assert wait_for(lambda: len(ids) >= 2)
+        # the server side of the connection goes away
+        stream._interrupt()
+        assert wait_for(lambda: not stream.pending())
+    finally:
+        stream.stop()
+    assert len(ids) == len(set(ids))
+    assert ids == sorted(ids, key=int)
+
+
+def test_many_trainings_share_one_stream(server, client):
+    # their ids joined are longer than a request line may be
+    jobs = [
+        client.create_job("d", "regression", ["A"])["training_id"] for _ in range(2000)
+    ]
+    stream = JobStream(client)
+    stream.track_many(jobs)
+    stream.start()
+    try:
+        assert wait_for(lambda: not stream.pending())
+    finally:
+        stream.stop()
+    assert stream.mode == "stream"
+    assert server.state.requests["events"] == 1
+
+
+def test_reconnect_delay_starts_over_after_a_stream(client):
+    stream = JobStream(client, reconnect=0.01, max_reconnect=1)
+    waits, calls = [], []
+
+    def fake_stream(job_ids):
+        calls.append(job_ids)
+        if len(calls) == 3:
+            stream.connections += 1
+        if len(calls) == 5:
+            stream._stop.set()
+            return True
+        raise OSError("conexion rechazada")
+
+    def wait(delay):
+        waits.append(delay)
+        return False
+
+    stream._stream = fake_stream
+    stream._stop.wait = wait
+    stream.track("job")
+    stream.start()
+    stream._thread.join(5)
+    assert waits == [0.01, 0.02, 0.01, 0.02]
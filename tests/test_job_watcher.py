@@ -0,0 +1,80 @@
+import time
+
+import requests
+
+from clients.centralized.job_watcher import JobWatcher
+
+
+class FailingClient:
+    """Every status call fails, as during a server outage"""
+
+    cfg = {}
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_jobs_status(self, job_ids):
+        self.calls += 1
+        raise requests.ConnectionError("servidor caido")
+
+
+def test_failing_batches_back_off():
+    client = FailingClient()
+    watcher = JobWatcher(client, min_interval=0.05, max_interval=0.2, backoff=2)
+    watcher.track_many(["a", "b", "c"])
+    watcher.start()
+    time.sleep(1.0)
+    watcher.stop()
+    # 0.1, 0.2, 0.2, ... apart instead of as fast as the loop turns
+    assert 3 <= client.calls <= 10
+    assert watcher.pending() == ["a", "b", "c"]
+
+
+def create_jobs(client, count: int):
+    return [
+        client.create_job("d", "regression", ["A"])["training_id"] for _ in range(count)
+    ]
+
+
+def test_jobs_are_polled_in_batches(server, client):
+    jobs = create_jobs(client, 250)
+    watcher = JobWatcher(client, batch_size=100)
+    changes = []
+    watcher.subscribe(lambda job_id, old, new: changes.append((job_id, old, new)))
+    watcher.track_many(jobs)
+    assert watcher.poll() == {job_id: "completed" for job_id in jobs}
+    assert server.state.requests["bulk_status"] == 3
+    assert "status" not in server.state.requests
+    assert sorted(changes) == sorted((job_id, None, "completed") for job_id in jobs)
+    # finished trainings aren't polled again
+    assert watcher.pending() == []
+    assert watcher.poll(force=True) == {}
+    assert server.state.requests["bulk_status"] == 3
+
+
+def test_single_calls_without_the_bulk_endpoint(server, client):
+    client.bulk_status = False
+    jobs = create_jobs(client, 5)
+    watcher = JobWatcher(client)
+    watcher.track_many(jobs)
+    assert watcher.poll() == {job_id: "completed" for job_id in jobs}
+    assert server.state.requests["status"] == 5
+    assert "bulk_status" not in server.state.requests
+
+
+def test_unchanged_jobs_wait_longer(server, client):
+    server.state.training_seconds = 100
+    (job_id,) = create_jobs(client, 1)
+    watcher = JobWatcher(client, min_interval=1, max_interval=3, backoff=2)
+    watcher.track(job_id)
+    assert watcher.poll() == {job_id: "pending"}
+    assert watcher._jobs[job_id].interval == 1
+    # not due yet
+    assert watcher.poll() == {}
+    assert server.state.requests["bulk_status"] == 1
+    intervals = []
+    for _ in range(3):
+        watcher.poll(force=True)
+        intervals.append(watcher._jobs[job_id].interval)
+    assert intervals == [2, 3, 3]
+    assert watcher.statuses() == {job_id: "pending"}
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from storage.local_store import LocalStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalStore(str(tmp_path / "tables" / "distai.db"))
+
+
+def trainings(id, models, status="pending", dataset_id="d1"):
+    return [
+        {
+            "id": id,
+            "model": m,
+            "task": "regression",
+            "status": status,
+            "dataset_id": dataset_id,
+        }
+        for m in models
+    ]
+
+
+def plan(store, query, params=()):
+    rows = store._conn().execute(f"EXPLAIN QUERY PLAN {query}", params)
+    return " ".join(row["detail"] for row in rows)
+
+
+def test_journal_is_wal(store):
+    mode = store._conn().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_status_and_dataset_lookups_use_indexes(store):
+    assert "trainings_status" in plan(
+        store, "SELECT id FROM trainings WHERE status = ?", ("pending",)
+    )
+    assert "trainings_dataset" in plan(
+        store, "SELECT id FROM trainings WHERE dataset_id = ?", ("d1",)
+    )
+
+
+def test_trainings_keep_one_row_per_model(store):
+    store.add_trainings(trainings("t1", ["A", "B"]))
+    store.add_trainings(trainings("t2", ["A"]))
+    # same training and model again replaces the row
+    store.add_trainings(trainings("t1", ["A"], status="running"))
+    assert store.training_ids() == ["t1", "t2"]
+    assert sorted(store.training_models("t1")) == ["A", "B"]
+    assert [t["model"] for t in store.trainings(status="running")] == ["A"]
+
+    store.update_statuses({"t1": "completed", "t2": "failed"})
+    assert store.training_statuses() == {"t1": "completed", "t2": "failed"}
+    assert len(store.trainings(status="completed")) == 2
+
+
+def test_readers_are_not_blocked_by_a_writer(store):
+    store.add_dataset("d1", "iris")
+    writer = store._conn()
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO datasets (id, name) VALUES ('d2', 'wine')")
+    seen = []
+    # a reader in another thread gets its own connection and the last commit
+    reader = threading.Thread(target=lambda: seen.extend(store.dataset_ids()))
+    reader.start()
+    reader.join(5)
+    writer.commit()
+    assert seen == ["d1"]
+    assert store.has_dataset("d2")
+
+
+def test_concurrent_writers_wait_for_each_other(store):
+    def write(n):
+        for i in range(20):
+            store.add_trainings(trainings(f"t{n}-{i}", ["A"]))
+            store.add_dataset(f"d{n}-{i}", "data")
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(store.training_ids()) == 160
+    assert len(store.dataset_ids()) == 160
+
+
+def test_csv_tables_are_migrated_once(store, tmp_path):
+    datasets = tmp_path / "datasets.csv"
+    datasets.write_text("id,name\nd1,iris\n,\n")
+    old = tmp_path / "trainings.csv"
+    # old rows were written as id,task,model,status under this header
+    old.write_text(
+        "id,model,task,status\nt1,regression,A,completed\nt2,B,regression,running\n"
+    )
+    store.migrate_csv(str(datasets), str(old), ["regression"])
+    assert store.datasets() == [{"id": "d1", "name": "iris"}]
+    rows = {t["id"]: t for t in store.trainings()}
+    assert (rows["t1"]["model"], rows["t1"]["task"]) == ("A", "regression")
+    assert (rows["t2"]["model"], rows["t2"]["task"]) == ("B", "regression")
+
+    datasets.write_text("id,name\nd2,wine\n")
+    store.migrate_csv(str(datasets), str(old), ["regression"])
+    assert store.dataset_ids() == ["d1"]
@@ -0,0 +1,77 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from clients.centralized.prediction_pipeline import (
+    ParallelPredictor,
+    column_dtypes,
+    split_csv,
+)
+
+
+class SumModel:
+    """x + y, picklable from the worker processes"""
+
+    feature_names_in_ = ["x", "y"]
+
+    def predict(self, frame):
+        return (frame["x"] + frame["y"]).to_numpy()
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / "model.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"sum": SumModel()}, f)
+    return str(path)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """2000 rows: `note` is empty at the start and `count` has gaps later"""
+    path = tmp_path / "data.csv"
+    with open(path, "w") as f:
+        f.write("x,y,count,note\n")
+        for i in range(2000):
+            count = "" if i > 1000 and i % 7 == 0 else i
+            note = f"n{i}" if i >= 1500 else ""
+            f.write(f"{i},{i % 3},{count},{note}\n")
+    return str(path)
+
+
+def test_ranges_cover_the_file_on_line_boundaries(dataset):
+    header, ranges = split_csv(dataset, 1024)
+    assert header == b"x,y,count,note\n"
+    assert len(ranges) > 10
+    with open(dataset, "rb") as f:
+        data = f.read()
+    assert b"".join(data[start:end] for start, end in ranges) == data[len(header) :]
+    assert all(data[end - 1 : end] == b"\n" for _, end in ranges)
+
+
+def test_first_range_types_keep_missing_values():
+    chunk = pd.DataFrame({"n": [1, 2], "empty": [None, None], "flag": [True, False]})
+    dtypes = column_dtypes(chunk)
+    assert dtypes == {"n": "Int64", "empty": "string", "flag": "boolean"}
+    later = pd.DataFrame({"n": [None, 3], "empty": ["a", None], "flag": [None, True]})
+    cast = later.astype(dtypes)
+    assert cast["n"].isna().tolist() == [True, False]
+    # missing, not the text "nan"
+    assert cast["empty"].isna().tolist() == [False, True]
+
+
+@pytest.mark.parametrize("suffix", ["csv", "parquet"])
+def test_parallel_scoring_keeps_rows_and_types(artifact, dataset, tmp_path, suffix):
+    output = str(tmp_path / f"out.{suffix}")
+    rows = ParallelPredictor(artifact, "sum", workers=3).run(dataset, output, 4096)
+    assert rows == 2000
+    if suffix == "csv":
+        scored = pd.read_csv(output)
+    else:
+        scored = pd.read_parquet(output)
+        assert str(scored["count"].dtype) == "Int64"
+    assert scored["x"].tolist() == list(range(2000))
+    assert (scored["prediction"] == scored["x"] + scored["y"]).all()
+    assert scored["note"].isna().sum() == 1500
+    assert scored["note"].iloc[-1] == "n1999"
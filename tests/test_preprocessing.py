@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clients.centralized.preprocessing import DatasetPreprocessor
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame(
+        {
+            "small": [i % 100 for i in range(1000)],
+            "wide": [i * 100 for i in range(1000)],
+            "half": [i / 2 for i in range(1000)],
+            "tenth": [i / 10 for i in range(1000)],
+            "color": ["red", "green", "blue", "red"] * 250,
+            "name": [f"n{i}" for i in range(1000)],
+        }
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+def prepare(tmp_path, source, **options):
+    options = {"chunk_rows": 300, "max_categories": 10, **options}
+    preprocessor = DatasetPreprocessor(output_dir=str(tmp_path / "out"), **options)
+    return preprocessor.prepare(source)
+
+
+def test_columns_get_the_smallest_exact_type(tmp_path, dataset):
+    prepared = prepare(tmp_path, dataset)
+    assert prepared["rows"] == 1000
+    assert prepared["columns"] == {
+        "small": "int8",
+        "wide": "int32",
+        "half": "float32",
+        # 0.1 isn't a float32, the column keeps float64
+        "tenth": "float64",
+        "color": "category",
+        "name": "object",
+    }
+
+
+def test_parquet_holds_the_same_values(tmp_path, dataset):
+    prepared = prepare(tmp_path, dataset)
+    assert prepared["format"] == "parquet"
+    written = pd.read_parquet(prepared["path"])
+    source = pd.read_csv(dataset)
+    assert written["color"].dtype == "category"
+    for column in source.columns:
+        assert written[column].astype(source[column].dtype).equals(source[column])
+    assert prepared["bytes"] < pd.read_csv(dataset).memory_usage(deep=True).sum()
+
+
+def test_types_cover_every_chunk(tmp_path):
+    path = tmp_path / "mixed.csv"
+    # ints in the first chunk, a float and a large int in the last one
+    values = [str(i % 10) for i in range(10)] + ["2.5", "100000"]
+    path.write_text("v\n" + "\n".join(values) + "\n")
+    prepared = prepare(tmp_path, str(path), chunk_rows=5)
+    assert prepared["columns"] == {"v": "float32"}
+    assert pd.read_parquet(prepared["path"])["v"].tolist()[-2:] == [2.5, 100000.0]
+
+
+def test_float32_can_be_turned_off(tmp_path, dataset):
+    prepared = prepare(tmp_path, dataset, float32=False)
+    assert prepared["columns"]["half"] == "float64"
+
+
+@pytest.mark.parametrize("content", ["", "a,b\n"])
+def test_files_without_rows_are_not_converted(tmp_path, content):
+    path = tmp_path / "empty.csv"
+    path.write_text(content)
+    prepared = prepare(tmp_path, str(path))
+    assert prepared["path"] is None and prepared["rows"] == 0
+    assert list(tmp_path.glob("out/*")) == []
+
+
+def test_csv_output_keeps_only_the_selected_columns(tmp_path, dataset):
+    preprocessor = DatasetPreprocessor(format="csv", chunk_rows=300)
+    output = str(tmp_path / "small.csv")
+    prepared = preprocessor.prepare(dataset, output, columns=["small", "half"])
+    written = pd.read_csv(output)
+    assert list(written.columns) == ["small", "half"]
+    assert len(written) == prepared["rows"] == 1000
+    assert np.allclose(written["half"], pd.read_csv(dataset)["half"])
@@ -0,0 +1,102 @@
+import time
+import pytest
+
+import clients.centralized.http_client as http_client
+import clients.centralized.response_cache as response_cache
+from benchmarks.stand_in_server import server_url
+from clients.centralized.response_cache import CacheEntry, DiskTier, ResponseCache
+
+
+@pytest.fixture
+def cached_client(server, cfg, monkeypatch):
+    """Client with its own process wide cache, kept under tmp_path"""
+    monkeypatch.setattr(response_cache, "_caches", {})
+    cfg["response_cache"] = {"enabled": True, "ttls": {"models": 60, "status": 0}}
+    return http_client.HttpClient(server_url(server))
+
+
+def statuses(client, monkeypatch) -> list:
+    """Status codes of the responses the client gets from now on"""
+    codes = []
+    request = client._request
+
+    def record(*args, **kwargs):
+        r = request(*args, **kwargs)
+        codes.append(r.status_code)
+        return r
+
+    monkeypatch.setattr(client, "_request", record)
+    return codes
+
+
+def test_fresh_entries_are_served_without_a_request(server, cached_client):
+    first = cached_client.get_models("regression")
+    assert cached_client.get_models("regression") == first
+    assert server.state.requests["models"] == 1
+
+
+def test_stale_entries_are_revalidated_with_their_etag(
+    server, cached_client, monkeypatch
+):
+    job = cached_client.create_job("d", "regression", ["A"])["training_id"]
+    server.state.training_seconds = 60
+    codes = statuses(cached_client, monkeypatch)
+    first = cached_client.get_job_status(job)
+    assert cached_client.get_job_status(job) == first
+    assert codes == [200, 304]
+
+
+def test_finished_results_outlive_the_process(server, cached_client, monkeypatch):
+    job = cached_client.create_job("d", "regression", ["A"])["training_id"]
+    results = cached_client.get_results(job)
+    assert results["status"] == "completed"
+
+    # a new process: empty memory, same disk tier
+    monkeypatch.setattr(response_cache, "_caches", {})
+    client = http_client.HttpClient(server_url(server))
+    assert client.get_results(job) == results
+    assert server.state.requests["results"] == 1
+
+
+def test_users_do_not_share_cached_responses(server, cached_client, monkeypatch):
+    job = cached_client.create_job("d", "regression", ["A"])["training_id"]
+    results = cached_client.get_results(job)
+    other = http_client.HttpClient(server_url(server), username="user2")
+    assert other.response_cache is not cached_client.response_cache
+    assert other.response_cache.disk.path != cached_client.response_cache.disk.path
+    assert other.get_results(job) == results
+    assert server.state.requests["results"] == 2
+
+    # nor through the disk tier in a new process
+    monkeypatch.setattr(response_cache, "_caches", {})
+    other = http_client.HttpClient(server_url(server), username="user2")
+    assert (
+        other.response_cache.get(f"user1:/api/v1/training/train/{job}/results") is None
+    )
+
+
+def test_only_permanent_entries_go_to_disk(tmp_path):
+    cache = ResponseCache({"status": 60}, disk=DiskTier(str(tmp_path / "r.db")))
+    cache.put("/running", "status", {"status": "running"})
+    cache.put("/done", "status", {"status": "completed"}, permanent=True)
+    disk = DiskTier(str(tmp_path / "r.db"))
+    assert disk.get("/running") is None
+    assert disk.get("/done").value == {"status": "completed"}
+
+
+def test_expired_rows_are_pruned_on_open(tmp_path):
+    path = str(tmp_path / "r.db")
+    DiskTier(path).put("/old", CacheEntry({"a": 1}, None, time.time() - 1))
+    DiskTier(path).put("/later", CacheEntry({"a": 2}, None, time.time() + 60))
+    disk = DiskTier(path)
+    assert disk.get("/old") is None
+    assert disk.get("/later").value == {"a": 2}
+
+
+def test_entries_expire_after_their_ttl():
+    cache = ResponseCache({"status": 0, "models": 60})
+    cache.put("/s", "status", {"status": "running"}, etag='"e1"')
+    cache.put("/m", "models", {"models": []})
+    entry = cache.get("/s")
+    assert not entry.fresh() and entry.etag == '"e1"'
+    assert cache.get("/m").fresh()
@@ -0,0 +1,87 @@
+import analytics.results_table as results_table
+import clients.centralized.http_client as http_client
+import clients.centralized.response_cache as response_cache
+from analytics.results_table import ResultsTable, get_results_table
+from benchmarks.stand_in_server import server_url
+from clients.centralized.response_cache import DiskTier, ResponseCache
+from clients.centralized.wire_format import columnar
+
+
+def results(training_id, dataset_id, **models):
+    return {
+        "training_id": training_id,
+        "dataset_id": dataset_id,
+        "train_type": "regression",
+        "status": "completed",
+        "results": [
+            {"model_name": name, "status": "completed", "metrics": metrics}
+            for name, metrics in models.items()
+        ],
+    }
+
+
+RESULTS = [
+    results("t1", "d1", A={"r2": 0.9, "mse": 2.0}, B={"r2": 0.7, "mse": 1.0}),
+    results("t2", "d1", C={"r2": 0.95, "mse": 3.0}),
+    # results negotiated as Arrow come as columns
+    columnar(results("t3", "d2", A={"r2": 0.5, "mse": 4.0}, B={})),
+]
+
+
+def test_rows_are_one_per_metric():
+    table = ResultsTable()
+    assert table.ingest(RESULTS) == 8
+    # the same training again adds nothing
+    assert table.ingest(RESULTS[:1]) == 0
+    assert table.metrics() == ["mse", "r2"]
+    assert len(table.filter(dataset_id="d1")) == 6
+    assert len(table.filter(model=["A", "B"], metric="r2")) == 3
+    wide = table.wide(dataset_id="d2")
+    assert wide.loc[("t3", "d2", "regression", "A")].to_dict() == {
+        "mse": 4.0,
+        "r2": 0.5,
+    }
+
+
+def test_leaderboard_knows_which_metrics_are_better_lower():
+    table = ResultsTable()
+    table.ingest(RESULTS)
+    best_r2 = table.leaderboard("r2")
+    assert best_r2[["dataset_id", "model"]].values.tolist() == [
+        ["d1", "C"],
+        ["d2", "A"],
+    ]
+    best_mse = table.leaderboard("mse", top=2, dataset_id="d1")
+    assert best_mse["model"].tolist() == ["B", "A"]
+    ranks = table.rank("r2")
+    assert ranks[ranks["dataset_id"] == "d1"]["model"].tolist() == ["C", "A", "B"]
+    assert ranks["rank"].tolist() == [1, 2, 3, 1]
+
+
+def test_refresh_reads_only_new_cached_results(tmp_path):
+    cache = ResponseCache({"results": 60}, disk=DiskTier(str(tmp_path / "r.db")))
+    table = ResultsTable(cache)
+    cache.put("user1:/train/t1/results", "results", RESULTS[0], permanent=True)
+    # running trainings aren't final and stay out of the table
+    cache.put("user1:/train/t9/results", "results", {"training_id": "t9"})
+    assert table.refresh() == 4
+    assert table.refresh() == 0
+    cache.put("user1:/train/t2/results", "results", RESULTS[1], permanent=True)
+    assert table.refresh() == 2
+    assert sorted(table.frame["training_id"].unique()) == ["t1", "t2"]
+
+
+def test_table_is_fed_by_the_client(server, cfg, monkeypatch):
+    monkeypatch.setattr(response_cache, "_caches", {})
+    monkeypatch.setattr(results_table, "_tables", {})
+    cfg["response_cache"] = {"enabled": True}
+    cfg["store_path"] = "data/tables/distai.db"
+    client = http_client.HttpClient(server_url(server))
+    job = client.create_job("d", "regression", ["A", "B"])["training_id"]
+    metrics = client.get_results(job)["results"]
+    table = get_results_table(cfg, client.username)
+    assert set(table.frame["training_id"]) == {job}
+    assert set(table.frame["model"]) == {"A", "B"}
+    assert len(table.frame) == sum(len(m["metrics"]) for m in metrics)
+    # another user has a table of their own
+    assert get_results_table(cfg, "user2").frame.empty
@@ -0,0 +1,33 @@
+import pytest
+import requests
+
+from clients.centralized.session import get_session
+
+
+def test_sessions_are_shared_per_settings(cfg):
+    assert get_session(cfg) is get_session(cfg)
+    assert get_session(cfg, retries=0) is not get_session(cfg)
+
+
+def test_reads_are_retried(server, client):
+    server.state.failure_rate = 1.0
+    with pytest.raises(requests.HTTPError):
+        client.get_job_status("missing")
+    # the first attempt and 2 retries
+    assert server.state.failures == 3
+
+
+def test_posts_without_key_are_not_retried(server, client):
+    server.state.failure_rate = 1.0
+    with pytest.raises(requests.HTTPError):
+        client.create_job("d", "regression", ["A"])
+    assert server.state.failures == 1
+
+
+def test_idempotency_key_returns_the_same_training(server, client):
+    first = client.create_job("d", "regression", ["A"], idempotency_key="k1")
+    again = client.create_job("d", "regression", ["A"], idempotency_key="k1")
+    other = client.create_job("d", "regression", ["A"], idempotency_key="k2")
+    assert first["training_id"] == again["training_id"]
+    assert other["training_id"] != first["training_id"]
+    assert len(server.state.trainings) == 2
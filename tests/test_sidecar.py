@@ -0,0 +1,135 @@
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import clients.sidecar.daemon as sidecar_daemon
+from benchmarks.stand_in_server import server_url
+from clients.centralized.job_stream import JobStream
+from clients.sidecar.daemon import Singleflight, SidecarDaemon
+from clients.sidecar.protocol import SidecarError, decode_error, encode_error
+from clients.sidecar.sidecar_client import SidecarClient
+
+# relative to the test directory, Unix socket paths are short
+SOCKET = "sidecar.sock"
+
+
+def wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def daemon(server, cfg, monkeypatch):
+    cfg["servers"] = [server_url(server)]
+    monkeypatch.setattr(sidecar_daemon, "load_config", lambda: cfg)
+    daemon = SidecarDaemon(SOCKET).start()
+    yield daemon
+    daemon.stop()
+
+
+def test_singleflight_shares_one_call():
+    flight, release = Singleflight(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {"value": len(calls)}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "key", slow) for _ in range(8)]
+        assert wait_for(lambda: flight.executed + flight.shared == 8)
+        release.set()
+        results = [future.result() for future in futures]
+    assert results == [{"value": 1}] * 8
+    assert (flight.executed, flight.shared) == (1, 7)
+    # once it finished the next call runs again
+    assert flight.do("key", lambda: "again") == "again"
+
+
+def test_singleflight_shares_the_exception():
+    flight, release = Singleflight(), threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("fallo")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flight.do, "key", failing) for _ in range(4)]
+        assert wait_for(lambda: flight.executed + flight.shared == 4)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="fallo"):
+                future.result()
+    assert flight.executed == 1
+
+
+def test_identical_calls_of_sessions_are_coalesced(server, cfg, daemon):
+    sessions = [SidecarClient(SOCKET, cfg).connect() for _ in range(6)]
+    server.state.latency = 0.5
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda s: s.get_models("regression"), sessions))
+    assert all(result == results[0] for result in results)
+    assert server.state.requests["models"] == 1
+    assert daemon.flight.shared == 5
+
+
+def test_errors_keep_their_type():
+    response = requests.Response()
+    response.status_code = 404
+    error = decode_error(
+        encode_error(requests.HTTPError("no existe", response=response))
+    )
+    assert type(error) is requests.HTTPError
+    assert error.response.status_code == 404
+    assert type(decode_error(encode_error(KeyError("x")))) is KeyError
+    error = decode_error(encode_error(SidecarError("propio", "Custom")))
+    assert isinstance(error, SidecarError)
+    assert error.kind == "SidecarError"
+
+
+def test_sessions_share_one_upstream_stream(server, cfg, daemon):
+    server.state.training_seconds = 1.0
+    first, second = (SidecarClient(SOCKET, cfg) for _ in range(2))
+    job_id = first.create_job("d", "regression", ["A"])["training_id"]
+    streams = [JobStream(first, reconnect=0.1), JobStream(second, reconnect=0.1)]
+    try:
+        for stream in streams:
+            stream.track(job_id)
+            stream.start()
+        assert wait_for(lambda: all(not stream.pending() for stream in streams))
+    finally:
+        for stream in streams:
+            stream.stop()
+    assert all(stream.mode == "sidecar" for stream in streams)
+    assert all(stream.statuses() == {job_id: "completed"} for stream in streams)
+    assert server.state.requests["events"] == 1
+
+
+def test_stream_resyncs_after_a_daemon_restart(server, cfg, daemon):
+    server.state.training_seconds = 2.0
+    session = SidecarClient(SOCKET, cfg)
+    job_id = session.create_job("d", "regression", ["A"])["training_id"]
+    stream = JobStream(session, reconnect=0.1)
+    stream.track(job_id)
+    stream.start()
+    try:
+        assert wait_for(lambda: stream._relay_epoch is not None)
+        epoch = stream._relay_epoch
+        daemon.stop()
+        restarted = SidecarDaemon(SOCKET).start()
+        try:
+            assert wait_for(lambda: not stream.pending())
+        finally:
+            restarted.stop()
+    finally:
+        stream.stop()
+    # the new daemon counts events from 0, the stream read a new snapshot
+    assert stream._relay_epoch not in (None, epoch)
+    assert stream.statuses() == {job_id: "completed"}
@@ -0,0 +1,50 @@
+import requests
+
+from clients.centralized.sweep import SweepRunner, expand_sweep
+
+GRID = {"RandomForestRegressor": {"n_estimators": [10, 50], "max_depth": [3]}}
+
+
+def specs(namespace: str = "") -> list:
+    return expand_sweep(
+        ["d1", "d2"],
+        ["regression"],
+        ["LinearRegression", "RandomForestRegressor"],
+        GRID,
+        namespace=namespace,
+    )
+
+
+def test_keys_identify_the_spec():
+    first, again = specs(), specs()
+    # per dataset: the plain models together, one job per grid combination
+    assert len(first) == 2 * 3
+    keys = [s["idempotency_key"] for s in first]
+    assert keys == [s["idempotency_key"] for s in again]
+    assert len(set(keys)) == len(keys)
+    assert not set(keys) & {s["idempotency_key"] for s in specs("other")}
+
+
+def test_resubmitted_sweep_creates_no_duplicates(server, client):
+    runner = SweepRunner(client, rate=0, backoff_factor=0)
+    first = runner.run(specs())
+    again = runner.run(specs())
+    assert [r["training_id"] for r in first] == [r["training_id"] for r in again]
+    assert len(server.state.trainings) == len(first)
+
+
+def test_lost_responses_are_retried_without_duplicates(server, client, monkeypatch):
+    create_job, lost = client.create_job, set()
+
+    def lose_first_response(**spec):
+        response = create_job(**spec)
+        if spec["idempotency_key"] not in lost:
+            # the server created the training but the answer never arrived
+            lost.add(spec["idempotency_key"])
+            raise requests.ConnectionError("connection reset")
+        return response
+
+    monkeypatch.setattr(client, "create_job", lose_first_response)
+    results = SweepRunner(client, rate=0, backoff_factor=0).run(specs())
+    assert all(r["training_id"] for r in results)
+    assert len(server.state.trainings) == len(results)
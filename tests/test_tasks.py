@@ -0,0 +1,80 @@
+import threading, time
+
+import pytest
+
+from GUI.streamlit.tasks import BackgroundTasks
+
+
+@pytest.fixture
+def tasks():
+    pool = BackgroundTasks(max_workers=2)
+    yield pool
+    pool.shutdown()
+
+
+def wait(task, timeout=5):
+    task.future.result(timeout)
+    # the done callback runs right after the result is set
+    deadline = time.monotonic() + timeout
+    while task.finished is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_a_running_key_is_not_submitted_twice(tasks):
+    release = threading.Event()
+    calls = []
+
+    def upload(task, name):
+        calls.append(name)
+        release.wait(5)
+        return name
+
+    first = tasks.submit("upload", "Subiendo", upload, "a.csv")
+    assert tasks.submit("upload", "Subiendo", upload, "b.csv") is first
+    assert tasks.running("upload", "profile")
+    release.set()
+    wait(first)
+    assert first.result() == "a.csv" and calls == ["a.csv"]
+    assert not tasks.running("upload")
+
+    # a finished key is replaced by the next submit
+    second = tasks.submit("upload", "Subiendo", upload, "b.csv")
+    wait(second)
+    assert second is not first and tasks.get("upload") is second
+    assert second.result() == "b.csv"
+
+
+def test_progress_and_errors_are_kept_on_the_task(tasks):
+    step = threading.Event()
+
+    def work(task):
+        task.report(0.5, "mitad")
+        step.wait(5)
+        raise ValueError("fallo")
+
+    task = tasks.submit("train", "Entrenando", work)
+    deadline = time.monotonic() + 5
+    while task.progress is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (task.progress, task.message) == (0.5, "mitad")
+    assert task.result() is None and task.error() is None
+    step.set()
+    with pytest.raises(ValueError):
+        wait(task)
+    assert isinstance(task.error(), ValueError)
+    assert task.finished is not None and task.elapsed() >= 0
+    assert tasks.pop("train") is task and tasks.get("train") is None
+
+
+def test_work_runs_off_the_calling_thread(tasks):
+    release = threading.Event()
+    started = time.monotonic()
+    for key in ("a", "b", "c"):
+        tasks.submit(key, key, lambda task: release.wait(5))
+    # submitting never waits for the calls, the third one queues
+    assert time.monotonic() - started < 0.5
+    assert tasks.running("a", "b", "c")
+    assert not tasks.get("c").future.running()
+    release.set()
+    for key in ("a", "b", "c"):
+        wait(tasks.get(key))
@@ -0,0 +1,110 @@
+import base64, json, multiprocessing, os, threading, time
+
+import pytest
+
+from clients.centralized.token_manager import TokenManager, TokenStore, jwt_expiry
+
+
+def counting_fetch(log: str, expires_in: float = 3600):
+    """Token request that appends a line to `log` for every call"""
+
+    def fetch():
+        with open(log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.05)
+        return {"token": f"token-{os.getpid()}-{time.time()}", "expires_in": expires_in}
+
+    return fetch
+
+
+def fetches(log) -> int:
+    return len(open(log).read().splitlines()) if os.path.exists(log) else 0
+
+
+def refresh_in_process(path: str, log: str, start, results):
+    manager = TokenManager(TokenStore(path), "user1")
+    manager.seed("rejected")
+    start.wait(10)
+    results.put(manager.refresh(counting_fetch(log), stale="rejected"))
+
+
+def test_processes_share_one_refresh(tmp_path):
+    path, log = str(tmp_path / "token.json"), str(tmp_path / "fetches")
+    ctx = multiprocessing.get_context("spawn")
+    start, results = ctx.Event(), ctx.Queue()
+    processes = [
+        ctx.Process(target=refresh_in_process, args=(path, log, start, results))
+        for _ in range(4)
+    ]
+    for p in processes:
+        p.start()
+    start.set()
+    tokens = [results.get(timeout=30) for _ in processes]
+    for p in processes:
+        p.join(10)
+    # the first one asked the server, the others adopted the stored token
+    assert fetches(log) == 1
+    assert len(set(tokens)) == 1
+    assert TokenStore(path).get("user1")["token"] == tokens[0]
+
+
+def test_threads_after_a_401_wait_for_one_refresh(tmp_path):
+    log = str(tmp_path / "fetches")
+    manager = TokenManager(TokenStore(str(tmp_path / "token.json")), "user1")
+    manager.seed("rejected")
+    fetch = counting_fetch(log)
+    tokens = []
+    threads = [
+        threading.Thread(
+            target=lambda: tokens.append(manager.refresh(fetch, "rejected"))
+        )
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert fetches(log) == 1
+    assert len(set(tokens)) == 1 and manager.refreshes == 1
+
+
+def test_tokens_close_to_expiry_are_refreshed_in_background(tmp_path):
+    log = str(tmp_path / "fetches")
+    manager = TokenManager(TokenStore(str(tmp_path / "token.json")), "user1")
+    first = manager.get(counting_fetch(log, expires_in=1))
+    # half of a 1s lifetime later the token is still handed out...
+    time.sleep(0.6)
+    assert manager.get(counting_fetch(log)) == first
+    manager._background.join(5)
+    # ...while a new one is fetched
+    assert fetches(log) == 2
+    assert manager.get(counting_fetch(log)) != first
+
+
+def test_failed_requests_are_not_repeated_right_away(tmp_path):
+    calls = []
+    manager = TokenManager(
+        TokenStore(str(tmp_path / "token.json")), "user1", retry_failed=60
+    )
+    fetch = lambda: calls.append(1)
+    assert manager.get(fetch) is None
+    assert manager.get(fetch) is None
+    assert len(calls) == 1
+
+
+def test_store_ignores_foreign_content(tmp_path):
+    path = tmp_path / "token.json"
+    path.write_text("[1, 2]")
+    assert TokenStore(str(path)).get("user1") is None
+    path.write_text('{"user1": {"token": ""}}')
+    assert TokenStore(str(path)).get("user1") is None
+
+
+@pytest.mark.parametrize(
+    "claims, expected",
+    [({"exp": 1700000000}, 1700000000.0), ({"sub": "user1"}, None)],
+)
+def test_jwt_expiry(claims, expected):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=")
+    assert jwt_expiry(f"header.{payload.decode()}.signature") == expected
+    assert jwt_expiry("opaque-token") is None
@@ -0,0 +1,61 @@
+import hashlib, io, os
+import pytest
+
+from clients.centralized.uploader import ChunkedUploader
+
+CHUNK = 4096
+
+
+def buffer(data: bytes, name: str = "data.csv") -> io.BytesIO:
+    b = io.BytesIO(data)
+    b.name, b.size = name, len(data)
+    return b
+
+
+def interrupted(client, source, sent: int):
+    """Upload that drops the connection after `sent` chunks"""
+    uploader = ChunkedUploader(client, chunk_size=CHUNK, workers=1)
+    send, calls = uploader._send_chunk, []
+
+    def flaky(*args):
+        if len(calls) == sent:
+            raise OSError("connection dropped")
+        calls.append(args[1])
+        send(*args)
+
+    uploader._send_chunk = flaky
+    with pytest.raises(OSError):
+        uploader.upload(source)
+
+
+def sha256(server, response) -> str:
+    return server.state.datasets[response["dataset_id"]]["sha256"]
+
+
+def test_interrupted_upload_resumes(server, client, tmp_path):
+    data = os.urandom(10 * CHUNK)
+    path = tmp_path / "data.csv"
+    path.write_bytes(data)
+    interrupted(client, str(path), sent=3)
+
+    response = ChunkedUploader(client, chunk_size=CHUNK, workers=1).upload(str(path))
+    assert sha256(server, response) == hashlib.sha256(data).hexdigest()
+    # 3 chunks before the drop, the other 7 after it
+    assert server.state.requests["upload_chunk"] == 10
+    assert server.state.requests["upload_init"] == 1
+    assert os.listdir(tmp_path / "data/tmp/uploads") == []
+
+
+def test_buffers_resume_by_content(server, client):
+    first, second = os.urandom(6 * CHUNK), os.urandom(6 * CHUNK)
+    interrupted(client, buffer(first), sent=2)
+
+    # same name and size, other content: a new upload
+    response = ChunkedUploader(client, chunk_size=CHUNK).upload(buffer(second))
+    assert sha256(server, response) == hashlib.sha256(second).hexdigest()
+    assert server.state.requests["upload_init"] == 2
+
+    response = ChunkedUploader(client, chunk_size=CHUNK).upload(buffer(first))
+    assert sha256(server, response) == hashlib.sha256(first).hexdigest()
+    assert server.state.requests["upload_init"] == 2
+    assert server.state.requests["upload_chunk"] == 2 + 6 + 4
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+import requests
+
+import clients.centralized.http_client as http_client
+from benchmarks.stand_in_server import start_server, server_url
+from clients.centralized.wire_format import (
+    ARROW,
+    JSON,
+    WireFormat,
+    columnar,
+    nested,
+    results_from_arrow,
+    results_to_arrow,
+)
+
+RESULTS = {
+    "training_id": "t1",
+    "status": "completed",
+    "results": [
+        {"model_name": "A", "status": "completed", "metrics": {"r2": 0.9, "mse": 1.5}},
+        {"model_name": "B", "status": "failed", "metrics": {}},
+        {"model_name": "C", "status": "completed", "metrics": {"r2": 0.7}},
+    ],
+}
+
+
+def response(content: bytes, content_type: str) -> requests.Response:
+    r = requests.Response()
+    r.status_code = 200
+    r.headers["Content-Type"] = content_type
+    r._content = content
+    return r
+
+
+@pytest.fixture
+def json_server():
+    srv = start_server(wire_formats=("json",))
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_columnar_round_trip():
+    columns = columnar(RESULTS)
+    assert columns["training_id"] == "t1"
+    assert columns["columns"]["model_name"] == ["A", "A", "B", "C"]
+    assert columns["columns"]["metric"] == ["r2", "mse", None, "r2"]
+    assert columns["columns"]["value"] == [0.9, 1.5, None, 0.7]
+    # already columnar or already nested payloads are left as they are
+    assert columnar(columns) is columns
+    assert nested(RESULTS) is RESULTS
+    assert nested(columns) == RESULTS
+
+
+def test_arrow_round_trip():
+    decoded = results_from_arrow(results_to_arrow(RESULTS))
+    assert decoded == columnar(RESULTS)
+    assert nested(decoded) == RESULTS
+
+
+def test_decode_by_content_type():
+    wire = WireFormat({})
+    arrow = response(results_to_arrow(RESULTS), ARROW)
+    assert wire.decode(arrow) == columnar(RESULTS)
+    body = json.dumps(RESULTS).encode()
+    assert wire.decode(response(body, f"{JSON}; charset=utf-8")) == RESULTS
+    # servers without a Content-Type are read as JSON
+    assert wire.decode(response(body, "")) == RESULTS
+
+
+def test_arrow_is_only_offered_for_tables():
+    wire = WireFormat({"wire_format": {"formats": ["arrow", "json"]}})
+    assert wire.headers(tabular=True)["Accept"] == f"{ARROW}, {JSON};q=0.9"
+    assert wire.headers()["Accept"] == JSON
+
+
+def fetch_results(client, models: int):
+    """Results of a finished training and the response they came in"""
+    seen = []
+    decode = client.wire.decode
+    client.wire.decode = lambda r: seen.append(r) or decode(r)
+    job_id = client.create_job("d", "regression", [f"M{i}" for i in range(models)])
+    results = client.get_results(job_id["training_id"])
+    return results, seen[-1]
+
+
+def shape(results):
+    """Results without the ids and metric values, which differ per training"""
+    models = [
+        {**model, "metrics": sorted(model["metrics"])} for model in results["results"]
+    ]
+    out = {k: v for k, v in results.items() if k not in ("training_id", "results")}
+    return {**out, "results": models}
+
+
+def test_formats_are_negotiated(server, json_server, client, cfg):
+    arrow, r = fetch_results(client, 3)
+    assert r.headers["Content-Type"] == ARROW
+    other = http_client.HttpClient(server_url(json_server))
+    plain, r = fetch_results(other, 3)
+    assert r.headers["Content-Type"] == JSON
+    assert shape(arrow) == shape(plain)
+    assert [m["model_name"] for m in arrow["results"]] == ["M0", "M1", "M2"]
+
+
+def test_large_responses_are_compressed(json_server, cfg):
+    cfg["wire_format"] = {"encodings": ["gzip"]}
+    client = http_client.HttpClient(server_url(json_server))
+    results, r = fetch_results(client, 50)
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert len(results["results"]) == 50
@@ -0,0 +1,106 @@
+import json, threading, time
+import pytest
+
+from clients.centralized.workflow import WorkflowRunner
+
+
+@pytest.fixture
+def workflow(tmp_path):
+    paths = []
+    for i in range(2):
+        path = tmp_path / f"d{i}.csv"
+        path.write_text(f"x,y\n{i},1\n")
+        paths.append(str(path))
+    return {
+        "name": "test",
+        "task": "regression",
+        "models": ["A"],
+        "stages": ["upload", "train", "wait"],
+        "datasets": paths,
+    }
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def errors(results) -> list:
+    """Stage that failed per chain, in chain order"""
+    return [
+        results[key]["error"] and results[key]["error"]["stage"]
+        for key in sorted(results)
+    ]
+
+
+def test_finished_stages_are_checkpointed(client, workflow, tmp_path):
+    checkpoint = str(tmp_path / "wf.json")
+    results = WorkflowRunner(client, workflow, checkpoint).run()
+    assert set(errors(results)) == {None}
+    with open(checkpoint) as f:
+        chains = json.load(f)["chains"]
+    assert all(set(c["stages"]) == {"upload", "train", "wait"} for c in chains.values())
+
+
+def test_rerun_only_does_what_is_left(server, client, workflow, tmp_path):
+    checkpoint = str(tmp_path / "wf.json")
+    runner = WorkflowRunner(client, workflow, checkpoint)
+    train = runner.train
+
+    def fail_second(chain, done):
+        if chain["key"].startswith("1:"):
+            raise RuntimeError("server busy")
+        return train(chain, done)
+
+    runner.train = fail_second
+    assert errors(runner.run()) == [None, "train"]
+
+    results = WorkflowRunner(client, workflow, checkpoint).run()
+    assert set(errors(results)) == {None}
+    # uploads and the first training were not done again
+    assert server.state.requests["upload"] == 2
+    assert server.state.requests["train"] == 2
+
+
+def test_checkpoint_errors_fail_the_chain(client, workflow, tmp_path):
+    runner = WorkflowRunner(client, workflow, str(tmp_path / "wf.json"))
+    done = runner.checkpoint.done
+
+    def disk_full(key, stage, result):
+        if stage == "train":
+            raise OSError("disk full")
+        done(key, stage, result)
+
+    runner.checkpoint.done = disk_full
+    assert set(errors(runner.run())) == {"train"}
+
+
+def test_stop_ends_the_run(server, client, workflow, tmp_path):
+    server.state.training_seconds = 60
+    runner = WorkflowRunner(client, workflow, str(tmp_path / "wf.json"))
+    threading.Timer(1.0, runner.stop).start()
+    start = time.monotonic()
+    results = runner.run()
+    assert time.monotonic() - start < 10
+    assert all(r["error"] for r in results.values())
+    # every chain is still accounted for
+    assert wait_for(lambda: runner._pending == 0)
+
+
+def test_failed_training_is_retried(server, client, workflow, tmp_path):
+    checkpoint = str(tmp_path / "wf.json")
+    server.state.training_failure_rate = 1.0
+    assert errors(WorkflowRunner(client, workflow, checkpoint).run()) == ["wait"] * 2
+    failed = set(server.state.trainings)
+
+    server.state.training_failure_rate = 0.0
+    results = WorkflowRunner(client, workflow, checkpoint).run()
+    assert set(errors(results)) == {None}
+    # new trainings, not the failed ones handed back for the same key
+    retried = {r["stages"]["train"]["training_id"] for r in results.values()}
+    assert not retried & failed
+    assert server.state.requests["upload"] == 2